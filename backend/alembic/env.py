@@ -14,7 +14,8 @@ from app.db.base_class import Base
 from app.models.user import User
 from app.models.project import Project
 from app.models.task import Task
-from app.models.task_run import TaskRun
+from app.models.task_run import TaskRun, TaskRunGroup
+from app.models.task_run_stats import TaskRunStats
 from app.models.node import Node
 
 from app.core.config import settings
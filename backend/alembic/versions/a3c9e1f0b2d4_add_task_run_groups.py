@@ -0,0 +1,43 @@
+"""Add task run groups for fan-out execution
+
+Revision ID: a3c9e1f0b2d4
+Revises: 72ab59438695
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c9e1f0b2d4'
+down_revision: Union[str, Sequence[str], None] = '72ab59438695'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('cp_task_run_groups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('run_mode', sa.String(length=20), nullable=True, comment='触发方式：scheduled / manual'),
+    sa.Column('node_count', sa.Integer(), nullable=False, comment='扇出的目标节点数'),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['task_id'], ['cp_tasks.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_cp_task_run_groups_task_id'), 'cp_task_run_groups', ['task_id'], unique=False)
+    op.add_column('cp_task_runs', sa.Column('group_id', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_cp_task_runs_group_id'), 'cp_task_runs', ['group_id'], unique=False)
+    op.create_foreign_key('fk_cp_task_runs_group_id', 'cp_task_runs', 'cp_task_run_groups', ['group_id'], ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('fk_cp_task_runs_group_id', 'cp_task_runs', type_='foreignkey')
+    op.drop_index(op.f('ix_cp_task_runs_group_id'), table_name='cp_task_runs')
+    op.drop_column('cp_task_runs', 'group_id')
+    op.drop_index(op.f('ix_cp_task_run_groups_task_id'), table_name='cp_task_run_groups')
+    op.drop_table('cp_task_run_groups')
@@ -0,0 +1,48 @@
+"""Add normalized node tag table and task tag match mode
+
+Revision ID: a8c3e5f7d219
+Revises: f2a6d8c4b157
+Create Date: 2026-10-18 16:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c3e5f7d219'
+down_revision: Union[str, Sequence[str], None] = 'f2a6d8c4b157'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    node_tags = op.create_table('cp_node_tags',
+    sa.Column('node_id', sa.Integer(), nullable=False),
+    sa.Column('tag', sa.String(length=100), nullable=False, comment='标签（小写）'),
+    sa.ForeignKeyConstraint(['node_id'], ['cp_nodes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('node_id', 'tag')
+    )
+    op.create_index('ix_cp_node_tags_tag_node', 'cp_node_tags', ['tag', 'node_id'], unique=False)
+
+    with op.batch_alter_table('cp_tasks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('target_tag_match', sa.Enum('ANY', 'ALL', name='tag_match_mode_enum'), server_default='ALL', nullable=False, comment='标签匹配方式：ANY 任意一个 / ALL 全部'))
+
+    # 按 Node.tags 回填已有节点的标签（与 app.utils.tools.parse_tags 的规则一致）
+    conn = op.get_bind()
+    rows = []
+    for node_id, tags in conn.execute(sa.text("SELECT id, tags FROM cp_nodes WHERE tags IS NOT NULL")):
+        for tag in sorted({t.strip().lower() for t in tags.split(",") if t.strip()}):
+            rows.append({"node_id": node_id, "tag": tag})
+    if rows:
+        op.bulk_insert(node_tags, rows)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('cp_tasks', schema=None) as batch_op:
+        batch_op.drop_column('target_tag_match')
+    op.drop_index('ix_cp_node_tags_tag_node', table_name='cp_node_tags')
+    op.drop_table('cp_node_tags')
@@ -0,0 +1,27 @@
+"""Add covering index for task run statistics
+
+Revision ID: b7d2f4a81c3e
+Revises: a3c9e1f0b2d4
+Create Date: 2026-10-18 10:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2f4a81c3e'
+down_revision: Union[str, Sequence[str], None] = 'a3c9e1f0b2d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_cp_task_runs_task_status_start', 'cp_task_runs', ['task_id', 'status', 'start_time'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cp_task_runs_task_status_start', table_name='cp_task_runs')
@@ -0,0 +1,27 @@
+"""Add bundle hash to projects
+
+Revision ID: b7e3d9a2c614
+Revises: a8c3e5f7d219
+Create Date: 2026-10-18 18:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3d9a2c614'
+down_revision: Union[str, Sequence[str], None] = 'a8c3e5f7d219'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('cp_projects', sa.Column('bundle_hash', sa.String(length=64), nullable=True, comment='当前部署包的内容哈希（SHA-256）'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('cp_projects', 'bundle_hash')
@@ -0,0 +1,44 @@
+"""Add task run statistics rollup table
+
+Revision ID: c4e8a2d6f913
+Revises: b7d2f4a81c3e
+Create Date: 2026-10-18 11:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a2d6f913'
+down_revision: Union[str, Sequence[str], None] = 'b7d2f4a81c3e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 历史执行的汇总由 d3f7a1c9e842 回填
+    op.create_table('cp_task_run_stats',
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('total_runs', sa.Integer(), nullable=False, comment='已结束的执行次数'),
+    sa.Column('success_runs', sa.Integer(), nullable=False, comment='成功次数'),
+    sa.Column('failure_runs', sa.Integer(), nullable=False, comment='失败次数（含手动停止）'),
+    sa.Column('stopped_runs', sa.Integer(), nullable=False, comment='手动停止次数'),
+    sa.Column('duration_sum', sa.Float(), nullable=False, comment='执行时长总和（秒）'),
+    sa.Column('duration_sketch', sa.JSON(), nullable=True, comment='执行时长分位数草图（对数分桶）'),
+    sa.Column('items_scraped', sa.BigInteger(), nullable=False, comment='累计抓取条数'),
+    sa.Column('requests_count', sa.BigInteger(), nullable=False, comment='累计请求数'),
+    sa.Column('last_run_id', sa.Integer(), nullable=True, comment='最近一次结束的执行 ID'),
+    sa.Column('last_run_status', sa.String(length=20), nullable=True, comment='最近一次结束的执行状态'),
+    sa.Column('last_run_time', sa.DateTime(), nullable=True, comment='最近一次结束的执行开始时间'),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['task_id'], ['cp_tasks.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('task_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('cp_task_run_stats')
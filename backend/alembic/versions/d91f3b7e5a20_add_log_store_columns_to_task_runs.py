@@ -0,0 +1,29 @@
+"""Add log store pointer columns to task runs
+
+Revision ID: d91f3b7e5a20
+Revises: c4e8a2d6f913
+Create Date: 2026-10-18 12:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd91f3b7e5a20'
+down_revision: Union[str, Sequence[str], None] = 'c4e8a2d6f913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('cp_task_runs', sa.Column('log_path', sa.String(length=255), nullable=True, comment='压缩日志归档路径（相对 LOG_STORE_DIR）'))
+    op.add_column('cp_task_runs', sa.Column('log_size', sa.BigInteger(), nullable=True, comment='原始日志字节数'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('cp_task_runs', 'log_size')
+    op.drop_column('cp_task_runs', 'log_path')
@@ -0,0 +1,33 @@
+"""Add composite indexes for keyset pagination
+
+Revision ID: e5b1c7d3a904
+Revises: d91f3b7e5a20
+Create Date: 2026-10-18 14:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b1c7d3a904'
+down_revision: Union[str, Sequence[str], None] = 'd91f3b7e5a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_cp_task_runs_start_id', 'cp_task_runs', ['start_time', 'id'], unique=False)
+    op.create_index('ix_cp_task_runs_task_start_id', 'cp_task_runs', ['task_id', 'start_time', 'id'], unique=False)
+    op.create_index('ix_cp_tasks_project_created_id', 'cp_tasks', ['project_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_cp_nodes_registered_id', 'cp_nodes', ['registered_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cp_nodes_registered_id', table_name='cp_nodes')
+    op.drop_index('ix_cp_tasks_project_created_id', table_name='cp_tasks')
+    op.drop_index('ix_cp_task_runs_task_start_id', table_name='cp_task_runs')
+    op.drop_index('ix_cp_task_runs_start_id', table_name='cp_task_runs')
@@ -0,0 +1,31 @@
+"""Add indexes for hot task run and node query paths
+
+Revision ID: f2a6d8c4b157
+Revises: e5b1c7d3a904
+Create Date: 2026-10-18 15:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a6d8c4b157'
+down_revision: Union[str, Sequence[str], None] = 'e5b1c7d3a904'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_cp_task_runs_status_start', 'cp_task_runs', ['status', 'start_time'], unique=False)
+    op.create_index('ix_cp_nodes_status', 'cp_nodes', ['status'], unique=False)
+    op.create_index('ix_cp_nodes_physical_host_name', 'cp_nodes', ['physical_host_name'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cp_nodes_physical_host_name', table_name='cp_nodes')
+    op.drop_index('ix_cp_nodes_status', table_name='cp_nodes')
+    op.drop_index('ix_cp_task_runs_status_start', table_name='cp_task_runs')
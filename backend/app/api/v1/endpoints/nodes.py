@@ -1,28 +1,70 @@
 # /backend/app/api/v1/endpoints/nodes.py
 
-from fastapi import APIRouter, Depends, Form, HTTPException, Body
+from fastapi import APIRouter, Depends, Form, HTTPException, Body, Query, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import select
-from typing import List
+from typing import List, Optional
 
 from app import deps
 from app import models, schemas
-from app.models.node import Node, NodeStatus
+from app.models.node import NodeOS
 from app.crud import node as crud_node
+from app.services.heartbeat_buffer import heartbeat_buffer
+from app.services.node_cache import online_node_cache
+from app.utils.keyset import NEXT_CURSOR_HEADER
+from app.utils.projection import encode_rows, parse_fields
 
 router = APIRouter()
 
 
 # --- 🔐 私有接口：需要登录 ---
 @router.get("/", response_model=schemas.ApiResponse[List[schemas.NodeOut]])
-def read_nodes(
+async def read_nodes(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: models.User = Depends(deps.get_current_active_user)
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 返回的游标"),
+    view: Optional[str] = Query(None, description="summary：返回精简视图（NodeSummary）"),
+    fields: Optional[str] = Query(None, description="逗号分隔的字段列表，只返回这些字段"),
+    response: Response,
+    current_user: models.User = Depends(deps.get_current_active_user_async)
 ):
-    nodes = crud_node.get_multi(db, skip=skip, limit=limit)
+    """
+    获取节点列表（按注册时间倒序，游标分页）
+
+    - 还有下一页时响应头 `X-Next-Cursor` 返回游标，作为下一次请求的 `cursor` 参数
+    - 传 `view=summary` 或 `fields` 时只查询所需的列，直接编码为 JSON
+    - `skip` 仅为兼容旧客户端保留（OFFSET 分页）
+    """
+    try:
+        columns = parse_fields(
+            fields, view,
+            allowed=schemas.NodeOut.model_fields,
+            summary=list(schemas.NodeSummary.model_fields)
+        )
+        if skip:
+            next_cursor = None
+            nodes = await crud_node.get_offset_page_async(
+                db, sort="registered_at", skip=skip, limit=limit, fields=columns
+            )
+        else:
+            nodes, next_cursor = await crud_node.get_page_async(
+                db, sort="registered_at", cursor=cursor, limit=limit, fields=columns
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    if columns:
+        rows = encode_rows(nodes)
+        return JSONResponse(
+            content={"success": True, "data": rows, "message": None, "total": len(rows)},
+            headers=headers
+        )
+
+    response.headers.update(headers)
     return schemas.ApiResponse(
         success=True,
         data=nodes,
@@ -39,41 +81,8 @@ def read_physical_hosts(
     """
     获取所有物理主机列表
     """
-    # 查询所有有physical_host_name的节点并去重
-    stmt = select(Node.physical_host_name).where(
-        Node.physical_host_name.isnot(None)
-    ).distinct()
-    result = db.execute(stmt)
-    physical_hosts = result.scalars().all()
-    
-    # 为每个物理主机获取详细信息
-    hosts_info = []
-    for host_name in physical_hosts:
-        # 获取该物理主机上的所有节点
-        nodes_stmt = select(Node).where(Node.physical_host_name == host_name)
-        nodes_result = db.execute(nodes_stmt)
-        nodes = nodes_result.scalars().all()
-        
-        # 获取物理主机的总资源（假设第一个非容器节点是物理主机）
-        physical_node = None
-        logical_nodes = []
-        for node in nodes:
-            if not node.container_id and not node.physical_host_id:
-                physical_node = node
-            else:
-                logical_nodes.append(node)
-                
-        host_info = {
-            "physical_host_name": host_name,
-            "total_nodes": len(nodes),
-            "logical_nodes": len(logical_nodes),
-            "cpu_cores": physical_node.cpu_cores if physical_node else None,
-            "memory_gb": physical_node.memory_gb if physical_node else None,
-            "disk_gb": physical_node.disk_gb if physical_node else None,
-            "online_nodes": len([n for n in nodes if n.status == NodeStatus.ONLINE]),
-            "offline_nodes": len([n for n in nodes if n.status == NodeStatus.OFFLINE])
-        }
-        hosts_info.append(host_info)
+    # 一条按物理主机分组的聚合查询（与资源检查共用）
+    hosts_info = crud_node.get_physical_host_inventory(db)
     
     return schemas.ApiResponse(
         success=True,
@@ -152,6 +161,7 @@ def create_node(
     
     try:
         db_node = crud_node.create(db, obj_in=node_in)
+        online_node_cache.invalidate()
         return schemas.ApiResponse(
             success=True,
             data=db_node,
@@ -186,6 +196,7 @@ def update_node(
     
     try:
         updated_node = crud_node.update(db, db_obj=db_node, obj_in=node_in)
+        online_node_cache.invalidate()
         return schemas.ApiResponse(
             success=True,
             data=updated_node,
@@ -219,6 +230,7 @@ def delete_node(
     
     try:
         crud_node.remove(db, id=node_id)
+        online_node_cache.invalidate()
         return schemas.ApiResponse(
             success=True,
             data={"node_id": node_id},
@@ -233,20 +245,28 @@ def delete_node(
 
 
 # --- 🌐 公开接口：Worker 自动上报，无需认证 ---
-@router.post("/heartbeat", response_model=schemas.ApiResponse[schemas.NodeOut])
+@router.post("/heartbeat", response_model=schemas.ApiResponse[dict])
 def node_heartbeat(
     *,
     hostname: str = Form(...),
     ip: str = Form(...),
     os: str = Form(None),  # ✅ 新增：接收操作系统类型
+    os_version: str = Form(None),
+    python_version: str = Form(None),
+    version: str = Form(None),  # Worker 版本
+    cpu_cores: str = Form(None),
+    memory_gb: float = Form(None),
+    tags: str = Form(None),
+    max_concurrency: int = Form(None),
     physical_host_id: str = Form(None),  # 物理主机ID
     physical_host_name: str = Form(None),  # 物理主机名
     container_id: str = Form(None),  # 容器ID
     instance_name: str = Form(None),  # 实例名称
-    db: Session = Depends(deps.get_db)
 ):
     """
     Worker 定期上报心跳，无需认证
+
+    心跳先写入内存缓冲区，由后台线程批量落库，请求本身不访问数据库
     """
     try:
         # ✅ 如果未提供 os，可以根据 hostname 或其他逻辑推断（可选）
@@ -258,22 +278,30 @@ def node_heartbeat(
                 os = "LINUX"
             else:
                 os = "UNKNOWN"  # 或者直接报错
+        os = os.upper()
+        if os not in NodeOS.__members__:
+            os = "UNKNOWN"
 
-        # 准备节点数据
-        node_data = {
-            "hostname": hostname,
-            "ip_address": ip,
-            "os": os,
-            "physical_host_id": physical_host_id,
-            "physical_host_name": physical_host_name,
-            "container_id": container_id,
-            "instance_name": instance_name
-        }
-
-        db_node = crud_node.register_or_update(db, **node_data)
+        heartbeat_buffer.submit(
+            hostname,
+            ip_address=ip,
+            os=NodeOS(os),
+            os_version=os_version,
+            python_version=python_version,
+            version=version,
+            # 旧版 Worker 上报的是 CPU 型号字符串，只接受整数核心数
+            cpu_cores=int(cpu_cores) if cpu_cores and cpu_cores.isdigit() else None,
+            memory_gb=memory_gb,
+            tags=tags,
+            max_concurrency=max_concurrency,
+            physical_host_id=physical_host_id,
+            physical_host_name=physical_host_name,
+            container_id=container_id,
+            instance_name=instance_name
+        )
         return schemas.ApiResponse(
             success=True,
-            data=db_node
+            data={"hostname": hostname, "accepted": True}
         )
     except Exception as e:
         return schemas.ApiResponse(
@@ -302,6 +330,7 @@ def node_offline(
             )
         
         crud_node.mark_offline(db, hostname=hostname)
+        online_node_cache.invalidate()
         db.refresh(db_node)
         return schemas.ApiResponse(
             success=True,
@@ -332,6 +361,7 @@ def mark_node_offline(
         )
 
     crud_node.mark_offline(db, hostname=db_node.hostname)
+    online_node_cache.invalidate()
     return schemas.ApiResponse(
         success=True,
         data={"node_id": node_id, "status": "OFFLINE"},
@@ -1,6 +1,7 @@
 # /backend/app/api/v1/endpoints/projects.py
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, Form, status
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import os
@@ -10,6 +11,8 @@ from app import deps, models, schemas
 from app.crud import project as crud_project
 from app.services.project import project_service
 from app.core.config import settings
+from app.utils.bundle import bundle_path, is_valid_hash
+from app.utils.delta import ensure_manifest, iter_object_ranges, objects_dir, validate_ranges
 
 router = APIRouter()
 
@@ -179,6 +182,8 @@ def delete_project(
         shutil.rmtree(project.package_path)
     
     project = crud_project.remove(db, id=project_id)
+    if project is not None:
+        project_service.remove_bundles(db, project)
     return project
 
 
@@ -206,8 +211,10 @@ def sync_project_to_nodes(
     
     try:
         # 调用项目服务同步项目到节点
-        project_service.sync_project_to_nodes(project.name, node_hostnames)
-        return {"success": True, "message": f"Project {project.name} synced to nodes successfully"}
+        result = project_service.sync_project_to_nodes(db, project, node_hostnames)
+        return {"success": True, "message": f"Project {project.name} synced to nodes successfully", **result}
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Project directory not found")
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -215,6 +222,49 @@ def sync_project_to_nodes(
         )
 
 
+# --- 🌐 Worker 接口：按内容哈希拉取部署包（不需要登录，需携带 Worker 令牌 X-Worker-Token） ---
+@router.get("/bundles/{bundle_hash}", dependencies=[Depends(deps.verify_worker_token)])
+def download_bundle(bundle_hash: str):
+    """
+    下载项目部署包（tar.gz），仅限携带 Worker 令牌的请求
+    """
+    path = bundle_path(settings.BUNDLES_DIR, bundle_hash)
+    if not is_valid_hash(bundle_hash) or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Bundle not found")
+    return FileResponse(path, media_type="application/gzip", filename=os.path.basename(path))
+
+
+@router.get(
+    "/bundles/{bundle_hash}/manifest", response_model=dict, dependencies=[Depends(deps.verify_worker_token)]
+)
+def get_bundle_manifest(bundle_hash: str):
+    """
+    获取部署包的清单（每个文件的哈希与大文件的分块签名），供 Worker 增量拉取
+    """
+    if not is_valid_hash(bundle_hash):
+        raise HTTPException(status_code=404, detail="Bundle not found")
+    try:
+        return ensure_manifest(
+            settings.BUNDLES_DIR, bundle_hash,
+            block_size=settings.BUNDLE_DELTA_BLOCK_SIZE, min_file_size=settings.BUNDLE_DELTA_MIN_FILE_SIZE
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Bundle not found")
+
+
+@router.post("/objects/ranges", dependencies=[Depends(deps.verify_worker_token)])
+def read_bundle_objects(body: schemas.BundleObjectRanges):
+    """
+    按顺序读取文件对象的片段并拼接返回（增量拉取变化的文件和块）
+    """
+    root = objects_dir(settings.BUNDLES_DIR)
+    try:
+        validate_ranges(root, body.ranges)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(iter_object_ranges(root, body.ranges), media_type="application/octet-stream")
+
+
 @router.get("/{project_id}/files", response_model=List[str])
 def get_project_files(
     *,
@@ -1,14 +1,37 @@
 # /backend/app/api/v1/endpoints/task_runs.py
 
-from fastapi import APIRouter, Depends, HTTPException
+import datetime
+import logging
+import os
+from typing import Any, List, Optional
+
+from celery import states
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
 
 from app import deps
 from app import models, schemas
 from app.crud import task_run as crud_task_run
+from app.crud import task_run_group as crud_task_run_group
+from app.crud import task_run_stats as crud_task_run_stats
 from app.crud import task as crud_task
 from app.crud import project as crud_project
+from app.core.celery_app import celery
+from app.core.config import settings
+from app.core.redis_client import get_redis
+from app.models.task_run import TaskRunStatus
+from app.db.session import SessionLocal
+from app.services.log_stream import follow_run_log, format_sse, single_log_event, stored_log_events
+from app.tasks.supervisor import request_cancel
+from app.utils.keyset import NEXT_CURSOR_HEADER
+from app.utils.log_store import LogStoreImport, LogStoreReader, get_store_path, store_exists
+from app.utils.projection import encode_rows, parse_fields
+from app.utils.run_logs import get_run_log_path, read_log_range, read_log_tail
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     tags=["task-runs"],
@@ -16,22 +39,75 @@ router = APIRouter(
 )
 
 
+def _load_log_path(run_id: int) -> Optional[str]:
+    """重新读取执行记录的日志归档路径（日志流跟踪期间不持有请求级会话）"""
+    with SessionLocal() as db:
+        run = crud_task_run.get(db, id=run_id)
+        return run.log_path if run else None
+
+
+def _run_exists(run_id: int) -> bool:
+    with SessionLocal() as db:
+        return crud_task_run.get(db, id=run_id) is not None
+
+
+def _parse_run_fields(fields: Optional[str], view: Optional[str]) -> Optional[List[str]]:
+    """解析执行记录列表的字段投影参数，返回 None 表示返回完整记录"""
+    try:
+        return parse_fields(
+            fields, view,
+            allowed=schemas.TaskRunOut.model_fields,
+            summary=list(schemas.TaskRunSummary.model_fields)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _page_response(response: Response, rows: List[Any], next_cursor: Optional[str], *, projected: bool):
+    """返回一页数据，下一页游标放在 X-Next-Cursor 响应头中"""
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    if projected:
+        return JSONResponse(content=encode_rows(rows), headers=headers)
+    if headers:
+        response.headers.update(headers)
+    return rows
+
+
 @router.get("/", response_model=List[schemas.TaskRunOut])
-def read_task_runs(
+async def read_task_runs(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: models.User = Depends(deps.get_current_active_user)
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 返回的游标"),
+    view: Optional[str] = Query(None, description="summary：返回精简视图（TaskRunSummary）"),
+    fields: Optional[str] = Query(None, description="逗号分隔的字段列表，只返回这些字段"),
+    response: Response,
+    current_user: models.User = Depends(deps.get_current_active_user_async)
 ):
     """
-    获取任务执行记录列表（分页）
+    获取任务执行记录列表（按开始时间倒序，游标分页）
 
     - **权限**：登录用户可访问
     - **用途**：监控面板、任务历史
+    - 还有下一页时响应头 `X-Next-Cursor` 返回游标，作为下一次请求的 `cursor` 参数
+    - 传 `view=summary` 或 `fields` 时只查询所需的列，不返回日志等大字段
+    - `skip` 仅为兼容旧客户端保留（OFFSET 分页，深翻页较慢）
     """
-    runs = crud_task_run.get_multi(db, skip=skip, limit=limit)
-    return runs
+    columns = _parse_run_fields(fields, view)
+    if skip:
+        rows = await crud_task_run.get_offset_page_async(
+            db, sort="start_time", skip=skip, limit=limit, fields=columns
+        )
+        return JSONResponse(content=encode_rows(rows)) if columns else rows
+
+    try:
+        rows, next_cursor = await crud_task_run.get_page_async(
+            db, sort="start_time", cursor=cursor, limit=limit, fields=columns
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _page_response(response, rows, next_cursor, projected=bool(columns))
 
 
 @router.get("/{run_id}", response_model=schemas.TaskRunOut)
@@ -59,14 +135,22 @@ def read_task_runs_by_task(
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 返回的游标"),
+    view: Optional[str] = Query(None, description="summary：返回精简视图（TaskRunSummary）"),
+    fields: Optional[str] = Query(None, description="逗号分隔的字段列表，只返回这些字段"),
+    response: Response,
     current_user: models.User = Depends(deps.get_current_active_user)
 ):
     """
-    获取某个任务的所有执行记录（按时间倒序）
+    获取某个任务的所有执行记录（按时间倒序，游标分页）
 
     - **权限**：登录用户可访问
     - **用途**：任务详情页 → 历史执行记录
+    - 还有下一页时响应头 `X-Next-Cursor` 返回游标，作为下一次请求的 `cursor` 参数
+    - 传 `view=summary` 或 `fields` 时只查询所需的列，不返回日志等大字段
     """
+    columns = _parse_run_fields(fields, view)
+
     # 先检查任务是否存在且用户有权限访问
     task = crud_task.get(db, id=task_id)
     if not task:
@@ -77,9 +161,22 @@ def read_task_runs_by_task(
     if not project or project.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    # 查询执行记录
-    runs = crud_task_run.get_multi_by_task(db, task_id=task_id, skip=skip, limit=limit)
-    return runs
+    # 查询执行记录（skip 仅为兼容旧客户端保留）
+    if skip:
+        if columns:
+            rows = crud_task_run.get_multi_by_task_fields(
+                db, task_id=task_id, fields=columns, skip=skip, limit=limit
+            )
+            return JSONResponse(content=encode_rows(rows))
+        return crud_task_run.get_multi_by_task(db, task_id=task_id, skip=skip, limit=limit)
+
+    try:
+        rows, next_cursor = crud_task_run.get_page_by_task(
+            db, task_id=task_id, cursor=cursor, limit=limit, fields=columns
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _page_response(response, rows, next_cursor, projected=bool(columns))
 
 
 @router.get("/celery/{celery_task_id}", response_model=schemas.TaskRunOut)
@@ -101,6 +198,53 @@ def read_task_run_by_celery_id(
     return run
 
 
+@router.get("/groups/{group_id}", response_model=schemas.TaskRunGroupOut)
+def read_task_run_group(
+    *,
+    group_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user)
+):
+    """
+    获取扇出执行分组的汇总状态
+
+    - **权限**：任务所属项目的所有者
+    - **用途**：MULTIPLE / TAG_BASED 任务的多节点执行进度
+    """
+    group = crud_task_run_group.get(db, id=group_id)
+    if not group:
+        raise HTTPException(status_code=404, detail="Task run group not found")
+
+    project = crud_project.get(db, id=group.task.project_id) if group.task else None
+    if not project or project.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
+    return crud_task_run_group.get_summary(db, group=group)
+
+
+@router.get("/groups/{group_id}/runs", response_model=List[schemas.TaskRunOut])
+def read_task_run_group_runs(
+    *,
+    group_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user)
+):
+    """
+    获取扇出执行分组下各节点的子执行记录
+
+    - **权限**：任务所属项目的所有者
+    """
+    group = crud_task_run_group.get(db, id=group_id)
+    if not group:
+        raise HTTPException(status_code=404, detail="Task run group not found")
+
+    project = crud_project.get(db, id=group.task.project_id) if group.task else None
+    if not project or project.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
+    return group.runs
+
+
 @router.delete("/{run_id}", response_model=schemas.TaskRunOut)
 def delete_task_run(
     *,
@@ -119,19 +263,99 @@ def delete_task_run(
         raise HTTPException(status_code=404, detail="Task run not found")
 
     db.delete(run)
+    db.flush()
+    # 同一事务内同步执行统计汇总
+    crud_task_run_stats.remove_run(db, task_run=run)
     db.commit()
     return run
 
 
+@router.post("/{run_id}/stop", response_model=schemas.TaskRunOut)
+def stop_task_run(
+    *,
+    run_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user)
+):
+    """
+    停止正在执行（或排队中）的任务
+
+    - 通过 Redis 向 Worker 发送取消信号，Worker 立即终止脚本进程
+    - 同时撤销 Celery 任务，尚未开始执行的任务不会再被执行；排队中的记录直接标记为手动停止
+    """
+    run = crud_task_run.get(db, id=run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Task run not found")
+
+    # 检查用户权限
+    task = crud_task.get(db, id=run.task_id)
+    project = crud_project.get(db, id=task.project_id)
+    if project.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
+    if run.status not in (TaskRunStatus.PENDING, TaskRunStatus.RUNNING):
+        raise HTTPException(status_code=400, detail="Task run is not running")
+
+    try:
+        request_cancel(get_redis(), run.celery_task_id)
+        celery.control.revoke(run.celery_task_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to stop task run: {str(e)}")
+
+    # 被撤销的排队任务不会再有 Worker 来结束它的记录
+    if run.status == TaskRunStatus.PENDING and crud_task_run.stop_pending(
+        db, run=run, end_time=datetime.datetime.utcnow()
+    ):
+        db.refresh(run)
+        try:
+            crud_task_run_stats.record_run(db, task_run=run)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to update task run stats for run {run.id}: {e}")
+
+    return run
+
+
+@router.put("/{run_id}/log/archive", dependencies=[Depends(deps.verify_worker_token)])
+async def upload_task_run_log_archive(run_id: int, request: Request):
+    """
+    【Worker 专用】上传执行结束后压缩归档的日志（需携带 Worker 令牌 X-Worker-Token）
+
+    - 主服务与 Worker 不在同一台机器时，日志接口只能读取上传到这里的归档
+    - 校验归档格式后原子写入日志存储，路径与 Worker 记录的 log_path 一致
+    """
+    if not await run_in_threadpool(_run_exists, run_id):
+        raise HTTPException(status_code=404, detail="Task run not found")
+
+    upload = LogStoreImport(get_store_path(run_id))
+    try:
+        async for chunk in request.stream():
+            upload.write(chunk)
+    except BaseException:
+        upload.abort()
+        raise
+    try:
+        log_size = await run_in_threadpool(upload.commit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"id": run_id, "log_path": upload.store_path, "log_size": log_size}
+
+
 @router.get("/{run_id}/log", response_model=schemas.TaskRunLog)
 def get_task_run_log(
     *,
     run_id: int,
+    offset: Optional[int] = Query(None, ge=0, description="起始字节偏移；不传时返回日志末尾"),
+    limit: Optional[int] = Query(None, gt=0, description="最多返回的字节数"),
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_active_user)
 ):
     """
-    获取任务执行日志
+    获取任务执行日志（按字节范围读取）
+
+    - 不传 offset 时返回日志末尾 limit 字节
+    - 返回的 offset / log_size 可用于继续向前或向后翻页
     """
     run = crud_task_run.get(db, id=run_id)
     if not run:
@@ -143,21 +367,50 @@ def get_task_run_log(
     if project.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
+    log_file = get_run_log_path(project.name, task.entrypoint or "run.py", run.celery_task_id)
+    limit = min(limit or settings.LOG_READ_MAX_BYTES, settings.LOG_READ_MAX_BYTES)
+
+    if store_exists(run.log_path):
+        # 已归档：只解压请求范围涉及的块
+        with LogStoreReader(run.log_path) as reader:
+            size = reader.size
+            start = offset if offset is not None else max(size - limit, 0)
+            data = reader.read_range(start, start + limit)
+    elif os.path.exists(log_file):
+        # 仍在执行（或归档失败）：直接读取原始日志文件
+        size = os.path.getsize(log_file)
+        start = offset if offset is not None else max(size - limit, 0)
+        data = read_log_range(log_file, start, start + limit)
+    else:
+        # 归档功能上线前的历史执行，或归档只在 Worker 本地：日志末尾保存在数据库中
+        return schemas.TaskRunLog(
+            id=run.id,
+            log_content=run.log_output or ""
+        )
+
     return schemas.TaskRunLog(
         id=run.id,
-        log_content=run.log_output or ""
+        log_content=data.decode("utf-8", errors="replace"),
+        offset=start,
+        log_size=size
     )
 
 
-@router.get("/{run_id}/log/stream", response_model=schemas.TaskRunLog)
+@router.get("/{run_id}/log/stream")
 def stream_task_run_log(
     *,
     run_id: int,
+    offset: int = 0,
+    last_event_id: Optional[str] = Header(None),
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_active_user)
 ):
     """
-    实时流式获取任务执行日志（模拟实现）
+    实时流式获取任务执行日志（Server-Sent Events）
+
+    - 按字节偏移量跟踪 Worker 写入的日志文件，只推送新增内容
+    - 断线重连时通过 `Last-Event-ID` 头或 `offset` 参数从上次位置继续
+    - 跟踪期间不占用数据库会话，任务是否结束通过 Celery 结果后端判断
     """
     run = crud_task_run.get(db, id=run_id)
     if not run:
@@ -168,10 +421,47 @@ def stream_task_run_log(
     project = crud_project.get(db, id=task.project_id)
     if project.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    return schemas.TaskRunLog(
-        id=run.id,
-        log_content=run.log_output or ""
+
+    if last_event_id and last_event_id.isdigit():
+        offset = int(last_event_id)
+
+    log_file = get_run_log_path(project.name, task.entrypoint or "run.py", run.celery_task_id)
+    already_finished = run.status in (TaskRunStatus.SUCCESS, TaskRunStatus.FAILURE)
+
+    if already_finished and not os.path.exists(log_file):
+        if store_exists(run.log_path):
+            events = stored_log_events(run.log_path, offset=max(offset, 0))
+        else:
+            events = single_log_event(run.log_output or "")
+    else:
+        celery_task_id = run.celery_task_id
+
+        async def is_finished() -> bool:
+            if already_finished:
+                return True
+            state = await run_in_threadpool(lambda: celery.AsyncResult(celery_task_id).state)
+            return state in states.READY_STATES
+
+        async def archived_events(from_offset: int):
+            # 跟踪期间任务结束并且原始日志已被归档：重新读取归档路径
+            log_path = await run_in_threadpool(_load_log_path, run_id)
+            if store_exists(log_path):
+                async for event in stored_log_events(log_path, offset=from_offset):
+                    yield event
+            else:
+                yield format_sse("finished", event="end")
+
+        events = follow_run_log(
+            log_file,
+            offset=max(offset, 0),
+            is_finished=is_finished,
+            fallback=archived_events
+        )
+
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 
@@ -196,6 +486,16 @@ def export_task_run_data(
     if project.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
+    # 日志末尾依次从日志归档、原始日志文件读取，都不存在时回退到数据库快照
+    log_file = get_run_log_path(project.name, task.entrypoint or "run.py", run.celery_task_id)
+    if store_exists(run.log_path):
+        with LogStoreReader(run.log_path) as reader:
+            log_output = reader.read_tail()
+    elif os.path.exists(log_file):
+        log_output = read_log_tail(log_file)
+    else:
+        log_output = run.log_output
+
     # 构造导出数据
     export_data = {
         "id": run.id,
@@ -213,7 +513,8 @@ def export_task_run_data(
         "exit_code": run.exit_code,
         "manually_stopped": run.manually_stopped,
         "worker_node": run.worker_node,
-        "log_output": run.log_output
+        "log_size": run.log_size,
+        "log_output": log_output
     }
     
     return schemas.TaskRunExport(
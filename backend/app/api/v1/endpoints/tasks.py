@@ -1,8 +1,9 @@
 # /backend/app/api/v1/endpoints/tasks.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app import deps
 from app import models, schemas
@@ -10,7 +11,8 @@ from app.services.scheduler import scheduler_service
 from app.crud import project as crud_project
 from app.crud import task as crud_task
 from app.crud import task_run as crud_task_run
-from app.tasks.crawler_tasks import run_generic_script
+from app.crud import task_run_stats as crud_task_run_stats
+from app.utils.keyset import NEXT_CURSOR_HEADER
 
 router = APIRouter()
 
@@ -82,10 +84,15 @@ def read_tasks(
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 返回的游标"),
+    response: Response,
     current_user: models.User = Depends(deps.get_current_active_user)
 ):
     """
     获取当前用户有权限的任务列表（仅限自己项目下的任务）
+
+    - 按创建时间倒序，游标分页：还有下一页时响应头 `X-Next-Cursor` 返回游标
+    - `skip` 仅为兼容旧客户端保留（OFFSET 分页）
     """
     # 获取当前用户的所有项目 ID
     user_projects = crud_project.get_multi_by_owner(db, owner_id=current_user.id)
@@ -95,7 +102,16 @@ def read_tasks(
         return []
 
     # 查询这些项目下的所有任务
-    tasks = crud_task.get_multi_by_project_ids(db, project_ids=project_ids, skip=skip, limit=limit)
+    if skip:
+        return crud_task.get_multi_by_project_ids(db, project_ids=project_ids, skip=skip, limit=limit)
+    try:
+        tasks, next_cursor = crud_task.get_page_by_project_ids(
+            db, project_ids=project_ids, cursor=cursor, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return tasks
 
 
@@ -234,30 +250,15 @@ def run_task_now(
     
     # 提交任务到 Celery 立即执行
     try:
-        project_name = db_task.project.name
-        entrypoint = db_task.entrypoint or "run.py"
-        args = db_task.args or {}
-        env = {"RUN_MODE": "manual"}
+        # 按任务的分发模式投递到节点 / 标签 / 默认队列；MULTIPLE / TAG_BASED 会扇出到每个目标节点
+        dispatched = scheduler_service.dispatch(db, db_task, run_mode="manual")
+        if not dispatched.celery_task_ids:
+            raise HTTPException(status_code=409, detail="No target nodes available for this task")
         
-        celery_task = run_generic_script.delay(
-            original_task_id=db_task.id,
-            project_name=project_name,
-            entrypoint=entrypoint,
-            args=args,
-            env=env
-        )
-        
-        # 创建任务执行记录
-        task_run_in = schemas.TaskRunCreate(
-            task_id=task_id,
-            celery_task_id=celery_task.id,
-            worker_node="manual_trigger",
-            status="PENDING"  # 添加必需的 status 字段
-        )
-        task_run = crud_task_run.create(db, obj_in=task_run_in)
-        
-        db.commit()
-        return task_run
+        # 执行记录已在调度时创建（扇出时每个子执行一条），返回第一条
+        return crud_task_run.get(db, id=dispatched.run_ids[0])
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to run task: {str(e)}")
 
@@ -274,72 +275,35 @@ def get_task_statistics(
     """
     _check_task_project_permission(db, task_id=task_id, user=current_user)
     
-    # 获取任务执行统计
-    stmt = crud_task_run.select().where(crud_task_run.model.task_id == task_id)
-    result = db.execute(stmt)
-    runs = list(result.scalars().all())
-    
-    total_runs = len(runs)
-    success_runs = len([r for r in runs if r.status == "SUCCESS"])
-    failed_runs = len([r for r in runs if r.status == "FAILURE"])
+    # 读取任务执行统计汇总（执行结束时增量维护，不扫描执行记录）
+    stats = crud_task_run_stats.get_summary(db, task_id=task_id)
     
-    # 计算成功率
-    success_rate = (success_runs / total_runs * 100) if total_runs > 0 else 0
-    
-    # 获取最近一次执行时间
-    last_run_time = max([r.start_time for r in runs if r.start_time], default=None) if runs else None
+    # 计算成功率（按已结束的执行计算）
+    finished_runs = stats["finished_runs"]
+    success_rate = (stats["success_runs"] / finished_runs * 100) if finished_runs > 0 else 0
     
     return {
         "task_id": task_id,
-        "total_runs": total_runs,
-        "success_runs": success_runs,
-        "failed_runs": failed_runs,
-        "success_rate": round(success_rate, 2),
-        "last_run_time": last_run_time
+        **stats,
+        "success_rate": round(success_rate, 2)
     }
 
 
 @router.get("/stats/overview", response_model=dict)
-def get_tasks_overview_statistics(
+async def get_tasks_overview_statistics(
     *,
-    db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user)
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: models.User = Depends(deps.get_current_active_user_async)
 ):
     """
     获取任务概览统计信息：需权限校验
     """
-    # 获取当前用户的所有项目
-    stmt = crud_project.select().where(crud_project.model.owner_id == current_user.id)
-    result = db.execute(stmt)
-    user_projects = list(result.scalars().all())
-    project_ids = [p.id for p in user_projects]
-    
-    if not project_ids:
-        return {
-            "total_projects": 0,
-            "total_tasks": 0,
-            "total_runs": 0,
-            "success_rate": 0
-        }
-    
-    # 获取任务统计
-    stmt = crud_task.select().where(crud_task.model.project_id.in_(project_ids))
-    result = db.execute(stmt)
-    tasks = list(result.scalars().all())
-    
-    # 获取任务执行统计
-    stmt = crud_task_run.select().where(crud_task_run.model.task_id.in_([t.id for t in tasks]))
-    result = db.execute(stmt)
-    runs = list(result.scalars().all())
-    
-    total_runs = len(runs)
-    success_runs = len([r for r in runs if r.status == "SUCCESS"])
-    success_rate = (success_runs / total_runs * 100) if total_runs > 0 else 0
+    overview = await crud_task_run_stats.get_overview_async(db, owner_id=current_user.id)
+    finished_runs = overview["finished_runs"]
+    success_rate = (overview["success_runs"] / finished_runs * 100) if finished_runs > 0 else 0
     
     return {
-        "total_projects": len(user_projects),
-        "total_tasks": len(tasks),
-        "total_runs": total_runs,
+        **overview,
         "success_rate": round(success_rate, 2)
     }
 
@@ -1,5 +1,7 @@
 # /backend/app/core/celery_app.py
 
+from typing import Iterable, List
+
 from celery import Celery
 from app.core.config import settings
 
@@ -14,10 +16,29 @@ celery = Celery(
     ]
 )
 
+# 默认共享队列：未指定节点的任务投递到这里，所有 Worker 都会消费
+DEFAULT_QUEUE = "celery"
+
 celery.conf.update(
+    task_default_queue=DEFAULT_QUEUE,
+    task_create_missing_queues=True,  # 节点 / 标签队列在首次投递或订阅时自动声明
     task_serializer='json',
     accept_content=['json'],
     result_serializer='json',
     timezone='Asia/Shanghai',
     enable_utc=False,
-)
\ No newline at end of file
+)
+
+def node_queue_name(hostname: str) -> str:
+    """节点专属队列名：调度器按节点定向投递，Worker 启动时订阅本机队列"""
+    return f"node.{hostname}"
+
+
+def tag_queue_name(tag: str) -> str:
+    """标签队列名：带该标签的所有 Worker 共同消费"""
+    return f"tag.{tag}"
+
+
+def worker_queue_names(hostname: str, tags: Iterable[str]) -> List[str]:
+    """Worker 需要订阅的全部专属队列：本节点队列 + 每个标签的队列"""
+    return [node_queue_name(hostname)] + [tag_queue_name(tag) for tag in sorted(tags)]
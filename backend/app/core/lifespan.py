@@ -3,8 +3,9 @@ from loguru import logger
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from sqlalchemy import text
-from app.db.session import SessionLocal, engine
+from app.db.session import SessionLocal, dispose_async_engine, engine
 from app.services.scheduler import scheduler_service
+from app.services.heartbeat_buffer import heartbeat_buffer
 
 
 @asynccontextmanager
@@ -28,6 +29,9 @@ async def lifespan(app: FastAPI):
         logger.error(f"❌ 数据库连接失败: {e}")
         raise
 
+    # 启动心跳批量写入
+    heartbeat_buffer.start()
+
     # 启动定时调度器
     try:
         scheduler_service.start()
@@ -46,6 +50,12 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"❌ 调度器关闭失败: {e}")
 
+    try:
+        heartbeat_buffer.shutdown()
+    except Exception as e:
+        logger.error(f"❌ 心跳缓冲区关闭失败: {e}")
+
     # 关闭引擎
     engine.dispose()
+    await dispose_async_engine()
     logger.info("✅ 数据库引擎已关闭")
\ No newline at end of file
@@ -0,0 +1,41 @@
+# /backend/app/core/redis_client.py
+import os
+import threading
+from typing import Optional
+
+import redis
+
+from app.core.config import settings
+
+# 每个进程一个连接池；fork 之后子进程不能复用父进程的连接
+_client: Optional[redis.Redis] = None
+_client_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+def get_redis() -> redis.Redis:
+    """
+    获取当前进程共享的 Redis 客户端（带连接池，懒加载）
+    检测到进程号变化（prefork 子进程）时自动重建
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _lock:
+            if _client is None or _client_pid != pid:
+                pool = redis.ConnectionPool.from_url(settings.REDIS_URL, decode_responses=True)
+                _client = redis.Redis(connection_pool=pool)
+                _client_pid = pid
+    return _client
+
+
+def _reset_after_fork():
+    """fork 后丢弃继承自父进程的客户端，下次使用时重新创建"""
+    global _client, _client_pid, _lock
+    _client = None
+    _client_pid = None
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -2,6 +2,7 @@ from .crud_node import node
 from .crud_task import task
 from .crud_user import user
 from .crud_project import project
-from .crud_task_run import task_run
+from .crud_task_run import task_run, task_run_group
+from .crud_task_run_stats import task_run_stats
 from .git_credential import git_credential
 from .crud_workflow import workflow, workflow_task, task_dependency
\ No newline at end of file
@@ -1,13 +1,15 @@
 # /backend/app/crud/base.py
 
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union, cast
+from typing import Any, Dict, Generic, List, Optional, Sequence, Tuple, Type, TypeVar, Union, cast
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy import Delete, Select, delete, select
+from sqlalchemy import Delete, RowMapping, Select, delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.db.base_class import Base
+from app.utils.keyset import build_page, decode_cursor, keyset_order_by, keyset_statements
 
 # --- 泛型类型定义 ---
 ModelType = TypeVar("ModelType", bound=Base)
@@ -34,6 +36,134 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         # 显式转换为 List，避免类型错误
         return list(result.scalars().all())
 
+    async def get_multi_async(
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100
+    ) -> List[ModelType]:
+        """get_multi 的异步版本"""
+        stmt: Select[tuple[ModelType]] = select(self.model).offset(skip).limit(limit)
+        result = await db.execute(stmt)
+        return list(result.scalars().all())
+
+    def fields_stmt(self, fields: Sequence[str]) -> Select:
+        """只查询指定列的语句（列表页投影，不加载完整 ORM 对象）"""
+        return select(*(getattr(self.model, name) for name in fields))
+
+    def get_multi_fields(
+        self, db: Session, *, fields: Sequence[str], skip: int = 0, limit: int = 100
+    ) -> List[RowMapping]:
+        """获取多个对象的指定列（支持分页）"""
+        stmt = self.fields_stmt(fields).offset(skip).limit(limit)
+        return list(db.execute(stmt).mappings().all())
+
+    async def get_multi_fields_async(
+        self, db: AsyncSession, *, fields: Sequence[str], skip: int = 0, limit: int = 100
+    ) -> List[RowMapping]:
+        """get_multi_fields 的异步版本"""
+        stmt = self.fields_stmt(fields).offset(skip).limit(limit)
+        result = await db.execute(stmt)
+        return list(result.mappings().all())
+
+    def _page_statements(
+        self, *, sort: str, cursor: Optional[str], limit: int,
+        fields: Optional[Sequence[str]], filters: Sequence[Any]
+    ) -> Tuple[List[Select], bool]:
+        """生成键集分页的查询语句；第二个返回值表示结果是 ORM 对象（True）还是列映射（False）"""
+        if fields:
+            fields = list(fields) + [name for name in (sort, "id") if name not in fields]
+            stmt = self.fields_stmt(fields)
+        else:
+            stmt = select(self.model)
+        for condition in filters:
+            stmt = stmt.where(condition)
+        statements = keyset_statements(
+            stmt,
+            sort_column=getattr(self.model, sort),
+            id_column=self.model.id,  # type: ignore
+            cursor=decode_cursor(cursor) if cursor else None,
+            limit=limit,
+            nullable=self.model.__table__.c[sort].nullable,
+        )
+        return statements, not fields
+
+    def page_order_by(self, sort: str) -> List[Any]:
+        """按 (sort, id) 倒序的 ORDER BY，与键集分页的顺序一致"""
+        return keyset_order_by(
+            getattr(self.model, sort),
+            self.model.id,  # type: ignore
+            nullable=self.model.__table__.c[sort].nullable,
+        )
+
+    def _offset_page_statement(
+        self, *, sort: str, skip: int, limit: int,
+        fields: Optional[Sequence[str]], filters: Sequence[Any]
+    ) -> Tuple[Select, bool]:
+        """OFFSET 分页的查询语句（排序与键集分页一致）；第二个返回值含义同 _page_statements"""
+        stmt = self.fields_stmt(fields) if fields else select(self.model)
+        for condition in filters:
+            stmt = stmt.where(condition)
+        return stmt.order_by(*self.page_order_by(sort)).offset(skip).limit(limit), not fields
+
+    def get_offset_page(
+        self, db: Session, *, sort: str, skip: int = 0, limit: int = 100,
+        fields: Optional[Sequence[str]] = None, filters: Sequence[Any] = ()
+    ) -> List[Any]:
+        """
+        OFFSET 分页（仅为兼容传 skip 的旧客户端保留）：按 (sort, id) 倒序，与 get_page 的翻页顺序一致
+        传 fields 时只查询这些列，返回列映射
+        """
+        stmt, entities = self._offset_page_statement(
+            sort=sort, skip=skip, limit=limit, fields=fields, filters=filters
+        )
+        result = db.execute(stmt)
+        return list(result.scalars().all() if entities else result.mappings().all())
+
+    async def get_offset_page_async(
+        self, db: AsyncSession, *, sort: str, skip: int = 0, limit: int = 100,
+        fields: Optional[Sequence[str]] = None, filters: Sequence[Any] = ()
+    ) -> List[Any]:
+        """get_offset_page 的异步版本"""
+        stmt, entities = self._offset_page_statement(
+            sort=sort, skip=skip, limit=limit, fields=fields, filters=filters
+        )
+        result = await db.execute(stmt)
+        return list(result.scalars().all() if entities else result.mappings().all())
+
+    def get_page(
+        self, db: Session, *, sort: str, cursor: Optional[str] = None, limit: int = 100,
+        fields: Optional[Sequence[str]] = None, filters: Sequence[Any] = ()
+    ) -> Tuple[List[Any], Optional[str]]:
+        """
+        键集分页：按 (sort, id) 倒序返回一页数据和下一页游标（没有下一页时为 None）
+        传 fields 时只查询这些列（外加 sort 和 id），返回列映射
+        :raises ValueError: 游标格式不正确
+        """
+        statements, entities = self._page_statements(
+            sort=sort, cursor=cursor, limit=limit, fields=fields, filters=filters
+        )
+        rows: List[Any] = []
+        for stmt in statements:
+            result = db.execute(stmt)
+            rows.extend(result.scalars().all() if entities else result.mappings().all())
+            if len(rows) > limit:
+                break
+        return build_page(rows, limit=limit, sort_key=sort)
+
+    async def get_page_async(
+        self, db: AsyncSession, *, sort: str, cursor: Optional[str] = None, limit: int = 100,
+        fields: Optional[Sequence[str]] = None, filters: Sequence[Any] = ()
+    ) -> Tuple[List[Any], Optional[str]]:
+        """get_page 的异步版本"""
+        statements, entities = self._page_statements(
+            sort=sort, cursor=cursor, limit=limit, fields=fields, filters=filters
+        )
+        rows: List[Any] = []
+        for stmt in statements:
+            result = await db.execute(stmt)
+            rows.extend(result.scalars().all() if entities else result.mappings().all())
+            if len(rows) > limit:
+                break
+        return build_page(rows, limit=limit, sort_key=sort)
+
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
         """根据 Pydantic Schema 创建新对象"""
         obj_in_data = jsonable_encoder(obj_in)
@@ -1,11 +1,14 @@
 # /app/crud/crud_node.py
 import datetime
-from typing import Optional
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 from sqlalchemy.orm import Session
-from sqlalchemy import select, update, func
+from sqlalchemy import and_, bindparam, case, delete, insert, select, update, func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from app.crud.base import CRUDBase
-from app.models.node import Node, NodeStatus
+from app.models.node import Node, NodeStatus, NodeTag
 from app.schemas.node import NodeCreate, NodeUpdate
+from app.utils.tools import parse_tags
 
 
 class CRUDNode(CRUDBase[Node, NodeCreate, NodeUpdate]):
@@ -14,6 +17,78 @@ class CRUDNode(CRUDBase[Node, NodeCreate, NodeUpdate]):
         result = db.execute(stmt)
         return result.scalar_one_or_none()
 
+    def get_online(self, db: Session) -> List[Node]:
+        """所有在线节点"""
+        stmt = select(self.model).where(self.model.status == NodeStatus.ONLINE)
+        return list(db.execute(stmt).scalars().all())
+
+    def get_online_by_ids(self, db: Session, *, ids: Sequence[int]) -> List[Node]:
+        """指定 ID 中处于在线状态的节点（一条 IN 查询），按 ids 中的顺序返回"""
+        if not ids:
+            return []
+        stmt = select(self.model).where(
+            self.model.id.in_(ids),
+            self.model.status == NodeStatus.ONLINE
+        )
+        position = {node_id: i for i, node_id in reversed(list(enumerate(ids)))}
+        return sorted(db.execute(stmt).scalars().all(), key=lambda node: position[node.id])
+
+    def get_online_by_tags(self, db: Session, *, tags: Iterable[str], match_all: bool = True) -> List[Node]:
+        """
+        拥有目标标签的在线节点（通过 cp_node_tags 的 (tag, node_id) 索引查找）
+        :param match_all: True 要求拥有全部标签，False 拥有任意一个即可
+        """
+        tags = sorted(set(tags))
+        if not tags:
+            return []
+        tagged = select(NodeTag.node_id).where(NodeTag.tag.in_(tags))
+        if match_all and len(tags) > 1:
+            tagged = tagged.group_by(NodeTag.node_id).having(func.count(NodeTag.tag) == len(tags))
+        stmt = select(self.model).where(
+            self.model.id.in_(tagged),
+            self.model.status == NodeStatus.ONLINE
+        )
+        return list(db.execute(stmt).scalars().all())
+
+    def set_tags(self, db: Session, *, tags_by_node: Dict[int, Optional[str]]) -> None:
+        """按 Node.tags 字符串重建这些节点在 cp_node_tags 中的标签行（不提交）"""
+        if not tags_by_node:
+            return
+        db.execute(delete(NodeTag).where(NodeTag.node_id.in_(list(tags_by_node))))
+        rows = [
+            {"node_id": node_id, "tag": tag}
+            for node_id, tags in tags_by_node.items()
+            for tag in sorted(parse_tags(tags))
+        ]
+        if rows:
+            db.execute(insert(NodeTag), rows)
+
+    def set_tags_by_hostname(self, db: Session, *, tags_by_hostname: Dict[str, Optional[str]]) -> None:
+        """set_tags 的按主机名版本，用于批量 upsert 之后（不提交）"""
+        if not tags_by_hostname:
+            return
+        stmt = select(self.model.id, self.model.hostname).where(
+            self.model.hostname.in_(list(tags_by_hostname))
+        )
+        self.set_tags(db, tags_by_node={
+            row.id: tags_by_hostname[row.hostname] for row in db.execute(stmt)
+        })
+
+    def create(self, db: Session, *, obj_in: NodeCreate) -> Node:
+        node = super().create(db, obj_in=obj_in)
+        if node.tags:
+            self.set_tags(db, tags_by_node={node.id: node.tags})
+            db.commit()
+        return node
+
+    def update(self, db: Session, *, db_obj: Node, obj_in: Union[NodeUpdate, Dict[str, Any]]) -> Node:
+        old_tags = db_obj.tags
+        node = super().update(db, db_obj=db_obj, obj_in=obj_in)
+        if parse_tags(node.tags) != parse_tags(old_tags):
+            self.set_tags(db, tags_by_node={node.id: node.tags})
+            db.commit()
+        return node
+
     def register_or_update(self, db, *, hostname: str, ip_address: str, os: str, 
                           physical_host_id: str = None, physical_host_name: str = None,
                           container_id: str = None, instance_name: str = None):
@@ -47,6 +122,118 @@ class CRUDNode(CRUDBase[Node, NodeCreate, NodeUpdate]):
         db.refresh(node)
         return node
 
+    def bulk_upsert(self, db: Session, *, rows: List[Dict[str, Any]]) -> None:
+        """
+        批量注册/更新节点：INSERT ... ON DUPLICATE KEY UPDATE（按 hostname 去重）
+        只更新每行实际提供的字段；字段集合相同的行合并为一条语句
+        """
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+
+        dialect = db.get_bind().dialect.name
+        for columns, group in groups.items():
+            update_columns = [c for c in columns if c != "hostname"]
+            if dialect == "sqlite":
+                stmt = sqlite_insert(self.model).values(group)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["hostname"],
+                    set_={c: stmt.excluded[c] for c in update_columns}
+                )
+            else:
+                stmt = mysql_insert(self.model).values(group)
+                stmt = stmt.on_duplicate_key_update(
+                    **{c: stmt.inserted[c] for c in update_columns}
+                )
+            db.execute(stmt)
+
+    def touch_many(self, db: Session, *, hostnames: List[str], at: datetime.datetime) -> int:
+        """批量刷新心跳时间并置为在线（静态字段未变化的节点只需这一条 UPDATE）"""
+        if not hostnames:
+            return 0
+        stmt = update(self.model).where(
+            self.model.hostname.in_(hostnames)
+        ).values(
+            status=NodeStatus.ONLINE,
+            last_heartbeat=at
+        )
+        result = db.execute(stmt)
+        return result.rowcount
+
+    def revive_many(self, db: Session, *, hostnames: List[str]) -> int:
+        """把其中不在线的节点置为在线，返回发生状态变化的节点数（不提交）"""
+        if not hostnames:
+            return 0
+        stmt = update(self.model).where(
+            self.model.hostname.in_(hostnames),
+            self.model.status != NodeStatus.ONLINE
+        ).values(
+            status=NodeStatus.ONLINE
+        )
+        return db.execute(stmt).rowcount
+
+    def get_physical_host_inventory(
+        self, db: Session, *, physical_host_name: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        物理主机清单：按 physical_host_name 分组的一条聚合查询
+        - 没有 container_id 和 physical_host_id 的节点视为物理主机本身，提供总资源
+        - 其余节点为逻辑节点，累计其占用的资源
+        :param physical_host_name: 只查询指定物理主机
+        """
+        model = self.model
+        is_physical = and_(model.container_id.is_(None), model.physical_host_id.is_(None))
+
+        def physical(column):
+            return func.max(case((is_physical, column)))
+
+        def logical_sum(column):
+            return func.coalesce(func.sum(case((is_physical, 0), else_=func.coalesce(column, 0))), 0)
+
+        def count_if(condition):
+            return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+        stmt = (
+            select(
+                model.physical_host_name,
+                func.count(model.id).label("total_nodes"),
+                count_if(~is_physical).label("logical_nodes"),
+                count_if(is_physical).label("physical_nodes"),
+                physical(model.cpu_cores).label("cpu_cores"),
+                physical(model.memory_gb).label("memory_gb"),
+                physical(model.disk_gb).label("disk_gb"),
+                logical_sum(model.cpu_cores).label("used_cpu_cores"),
+                logical_sum(model.memory_gb).label("used_memory_gb"),
+                logical_sum(model.disk_gb).label("used_disk_gb"),
+                count_if(model.status == NodeStatus.ONLINE).label("online_nodes"),
+                count_if(model.status == NodeStatus.OFFLINE).label("offline_nodes"),
+            )
+            .where(model.physical_host_name.isnot(None))
+            .group_by(model.physical_host_name)
+            .order_by(model.physical_host_name)
+        )
+        if physical_host_name is not None:
+            stmt = stmt.where(model.physical_host_name == physical_host_name)
+
+        # MySQL 的 SUM 返回 Decimal，统一转换为 int / float
+        return [
+            {
+                "physical_host_name": row.physical_host_name,
+                "total_nodes": int(row.total_nodes),
+                "logical_nodes": int(row.logical_nodes),
+                "has_physical_node": int(row.physical_nodes) > 0,
+                "cpu_cores": int(row.cpu_cores) if row.cpu_cores is not None else None,
+                "memory_gb": float(row.memory_gb) if row.memory_gb is not None else None,
+                "disk_gb": float(row.disk_gb) if row.disk_gb is not None else None,
+                "used_cpu_cores": int(row.used_cpu_cores),
+                "used_memory_gb": float(row.used_memory_gb),
+                "used_disk_gb": float(row.used_disk_gb),
+                "online_nodes": int(row.online_nodes),
+                "offline_nodes": int(row.offline_nodes),
+            }
+            for row in db.execute(stmt)
+        ]
+
     def check_resources_available(self, db: Session, physical_host_name: str, 
                                  required_cpu_cores: int = 0,
                                  required_memory_gb: float = 0.0,
@@ -64,44 +251,20 @@ class CRUDNode(CRUDBase[Node, NodeCreate, NodeUpdate]):
         Returns:
             dict: 资源检查结果
         """
-        # 获取该物理主机上的所有逻辑节点
-        stmt = select(self.model).where(
-            self.model.physical_host_name == physical_host_name
-        )
-        result = db.execute(stmt)
-        logical_nodes = result.scalars().all()
-        
-        # 计算已使用的资源
-        total_cpu_cores = 0
-        total_memory_gb = 0.0
-        total_disk_gb = 0.0
-        
-        for node in logical_nodes:
-            if node.cpu_cores:
-                total_cpu_cores += node.cpu_cores
-            if node.memory_gb:
-                total_memory_gb += node.memory_gb
-            if node.disk_gb:
-                total_disk_gb += node.disk_gb
+        inventory = self.get_physical_host_inventory(db, physical_host_name=physical_host_name)
+        host = inventory[0] if inventory else None
                 
-        # 获取物理主机的总资源（假设第一个节点包含物理主机信息）
-        physical_node = None
-        for node in logical_nodes:
-            if not node.container_id and not node.physical_host_id:
-                physical_node = node
-                break
-                
-        if not physical_node:
+        if not host or not host["has_physical_node"]:
             return {
                 "available": False,
                 "reason": "未找到物理主机信息",
                 "details": {}
             }
             
-        # 检查资源是否足够
-        available_cpu = (physical_node.cpu_cores or 0) - total_cpu_cores
-        available_memory = (physical_node.memory_gb or 0.0) - total_memory_gb
-        available_disk = (physical_node.disk_gb or 0.0) - total_disk_gb
+        # 检查资源是否足够：物理主机总资源减去已有逻辑节点占用的资源
+        available_cpu = (host["cpu_cores"] or 0) - host["used_cpu_cores"]
+        available_memory = (host["memory_gb"] or 0.0) - host["used_memory_gb"]
+        available_disk = (host["disk_gb"] or 0.0) - host["used_disk_gb"]
         
         is_available = (
             available_cpu >= required_cpu_cores and
@@ -119,7 +282,7 @@ class CRUDNode(CRUDBase[Node, NodeCreate, NodeUpdate]):
                 "available_cpu": available_cpu,
                 "available_memory": available_memory,
                 "available_disk": available_disk,
-                "total_logical_nodes": len(logical_nodes)
+                "total_logical_nodes": host["logical_nodes"]
             }
         }
 
@@ -146,4 +309,59 @@ class CRUDNode(CRUDBase[Node, NodeCreate, NodeUpdate]):
         db.commit()
 
 
-node = CRUDNode(Node)
\ No newline at end of file
+    def get_status_snapshot(self, db: Session) -> List[Tuple[str, NodeStatus]]:
+        """获取全部节点的 (hostname, status)，用于心跳巡检（不分页，只查两列）"""
+        stmt = select(self.model.hostname, self.model.status)
+        result = db.execute(stmt)
+        return [(row.hostname, row.status) for row in result]
+
+    def mark_online_many(self, db: Session, *, hostnames: List[str]) -> int:
+        """批量标记节点在线（不提交，由调用方统一提交）"""
+        if not hostnames:
+            return 0
+        stmt = update(self.model).where(
+            self.model.hostname.in_(hostnames)
+        ).values(
+            status=NodeStatus.ONLINE,
+            last_heartbeat=func.now()
+        )
+        return db.execute(stmt).rowcount
+
+    def mark_offline_many(self, db: Session, *, hostnames: List[str]) -> int:
+        """批量标记节点离线（不提交，由调用方统一提交）"""
+        if not hostnames:
+            return 0
+        stmt = update(self.model).where(
+            self.model.hostname.in_(hostnames)
+        ).values(
+            status=NodeStatus.OFFLINE
+        )
+        return db.execute(stmt).rowcount
+
+
+    def update_metrics_many(self, db: Session, *, metrics: List[Dict[str, Any]]) -> None:
+        """
+        批量写入节点负载（一条 executemany UPDATE，不提交，由调用方统一提交）
+        :param metrics: [{"hostname", "cpu_usage", "memory_usage", "current_concurrency"}, ...]
+        """
+        if not metrics:
+            return
+        stmt = update(self.model).where(
+            self.model.hostname == bindparam("b_hostname")
+        ).values(
+            cpu_usage=bindparam("b_cpu_usage"),
+            memory_usage=bindparam("b_memory_usage"),
+            current_concurrency=bindparam("b_current_concurrency")
+        )
+        db.connection().execute(stmt, [
+            {
+                "b_hostname": m["hostname"],
+                "b_cpu_usage": m.get("cpu_usage"),
+                "b_memory_usage": m.get("memory_usage"),
+                "b_current_concurrency": m.get("current_concurrency") or 0,
+            }
+            for m in metrics
+        ])
+
+
+node = CRUDNode(Node)
@@ -100,6 +100,11 @@ class CRUDProject(CRUDBase[Project, ProjectCreate, ProjectUpdate]):
             db.commit()
         return obj
 
+    def get_bundle_hashes(self, db: Session) -> set:
+        """所有项目当前使用的部署包哈希"""
+        stmt = select(self.model.bundle_hash).where(self.model.bundle_hash.is_not(None)).distinct()
+        return set(db.execute(stmt).scalars())
+
     def get_statistics(self, db: Session) -> Dict[str, Any]:
         """获取项目统计信息"""
         total = db.execute(select(func.count(self.model.id))).scalar() or 0
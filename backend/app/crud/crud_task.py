@@ -1,6 +1,6 @@
 # /backend/app/crud/crud_task.py
 
-from typing import Any, Dict, List, Optional, cast
+from typing import Any, Dict, List, Optional, Tuple, cast
 
 from sqlalchemy.orm import Session
 from sqlalchemy import Select, select, delete, or_, and_
@@ -51,6 +51,15 @@ class CRUDTask(CRUDBase[Task, TaskCreate, TaskUpdate]):
         result = db.execute(stmt)
         return cast(List[Task], result.scalars().all())
 
+    def get_page_by_project_ids(
+        self, db: Session, *, project_ids: List[int], cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[Task], Optional[str]]:
+        """多个项目下的任务，按 (created_at, id) 倒序键集分页"""
+        return self.get_page(
+            db, sort="created_at", cursor=cursor, limit=limit,
+            filters=[self.model.project_id.in_(project_ids)]
+        )
+
     def get_enabled_tasks(self, db: Session) -> List[Task]:
         """获取所有启用中的定时任务（用于调度器）"""
         stmt: Select[tuple[Task]] = (
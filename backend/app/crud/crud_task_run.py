@@ -1,13 +1,15 @@
 # /app/crud/crud_task_run.py
 
-from typing import Optional, List, cast
+from datetime import datetime
+from typing import Any, Dict, Optional, List, Sequence, Tuple, cast
 
-from sqlalchemy import select, func
+from sqlalchemy import RowMapping, delete, select, func, update
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import Select
 from app.crud.base import CRUDBase
-from app.models.task_run import TaskRun, TaskRunStatus
-from app.schemas.task_run import TaskRunCreate, TaskRunUpdate
+from app.crud.crud_task_run_stats import ACTIVE_STATUSES
+from app.models.task_run import TaskRun, TaskRunGroup, TaskRunStatus
+from app.schemas.task_run import TaskRunCreate, TaskRunUpdate, TaskRunGroupCreate
 
 
 class CRUDTaskRun(CRUDBase[TaskRun, TaskRunCreate, TaskRunUpdate]):
@@ -17,38 +19,190 @@ class CRUDTaskRun(CRUDBase[TaskRun, TaskRunCreate, TaskRunUpdate]):
         return result.scalar_one_or_none()
 
     def get_multi_by_task(self, db: Session, *, task_id: int, skip: int = 0, limit: int = 100) -> List[TaskRun]:
-        """获取某个任务的所有执行记录（按时间倒序）"""
+        """获取某个任务的所有执行记录（按 (start_time, id) 倒序）"""
         stmt: Select[tuple[TaskRun]] = (
             select(self.model)
             .where(self.model.task_id == task_id)
+            .order_by(*self.page_order_by("start_time"))
             .offset(skip)
             .limit(limit)
-            .order_by(self.model.start_time.desc())
         )
         result = db.execute(stmt)
         return cast(List[TaskRun], result.scalars().all())
 
-    def start_run(self, db: Session, *, task_id: int, celery_task_id: str, worker_node: str) -> TaskRun:
-        db_obj = self.model(
-            task_id=task_id,
-            celery_task_id=celery_task_id,
-            status=TaskRunStatus.RUNNING,
-            start_time=func.now(),
-            worker_node=worker_node
+    def get_multi_by_task_fields(
+        self, db: Session, *, task_id: int, fields: Sequence[str], skip: int = 0, limit: int = 100
+    ) -> List[RowMapping]:
+        """get_multi_by_task 的投影版本：只查询指定列"""
+        stmt = (
+            self.fields_stmt(fields)
+            .where(self.model.task_id == task_id)
+            .order_by(*self.page_order_by("start_time"))
+            .offset(skip)
+            .limit(limit)
+        )
+        return list(db.execute(stmt).mappings().all())
+
+    def get_page_by_task(
+        self, db: Session, *, task_id: int, cursor: Optional[str] = None, limit: int = 100,
+        fields: Optional[Sequence[str]] = None
+    ) -> Tuple[List[Any], Optional[str]]:
+        """某个任务的执行记录，按 (start_time, id) 倒序键集分页"""
+        return self.get_page(
+            db, sort="start_time", cursor=cursor, limit=limit, fields=fields,
+            filters=[self.model.task_id == task_id]
+        )
+
+    def create_pending(
+        self, db: Session, *, task_id: int, celery_task_ids: Sequence[str], group_id: Optional[int] = None
+    ) -> List[int]:
+        """
+        调度时为每个预先生成的 Celery 任务 ID 创建一条 PENDING 执行记录（一次提交）
+        之后 Worker 只按 celery_task_id 更新这条记录，不再另行插入
+        :return: 新记录的 ID，与 celery_task_ids 顺序一致
+        """
+        db_objs = [
+            self.model(task_id=task_id, celery_task_id=celery_task_id, status=TaskRunStatus.PENDING, group_id=group_id)
+            for celery_task_id in celery_task_ids
+        ]
+        db.add_all(db_objs)
+        db.flush()
+        ids = [db_obj.id for db_obj in db_objs]
+        db.commit()
+        return ids
+
+    def start_run(
+        self, db: Session, *, celery_task_id: str, task_id: int, worker_node: Optional[str],
+        start_time: datetime, group_id: Optional[int] = None, run_id: Optional[int] = None
+    ) -> int:
+        """
+        PENDING → RUNNING：一条 UPDATE（按 celery_task_id），已结束（如排队时被停止）的记录保持不变
+        记录不存在时（未经调度器直接投递的任务）补建一条
+        :param run_id: 调度时已知的记录 ID，传入时不再查询
+        :return: 执行记录 ID
+        """
+        values = {"status": TaskRunStatus.RUNNING, "start_time": start_time, "worker_node": worker_node}
+        result = db.execute(
+            update(self.model)
+            .where(self.model.celery_task_id == celery_task_id, self.model.status.in_(ACTIVE_STATUSES))
+            .values(**values)
+        )
+        if result.rowcount == 0 or run_id is None:
+            run_id = db.execute(
+                select(self.model.id).where(self.model.celery_task_id == celery_task_id)
+            ).scalar_one_or_none()
+        if run_id is None:
+            db_obj = self.model(task_id=task_id, celery_task_id=celery_task_id, group_id=group_id, **values)
+            db.add(db_obj)
+            db.flush()
+            run_id = db_obj.id
+        db.commit()
+        return run_id
+
+    def finish_run(self, db: Session, *, celery_task_id: str, values: Dict[str, Any]) -> bool:
+        """
+        RUNNING → 结束状态：一条 UPDATE（按 celery_task_id），只更新尚未结束的记录
+        :return: 本次是否把记录推进到了结束状态（用于只计入一次任务统计）
+        """
+        result = db.execute(
+            update(self.model)
+            .where(self.model.celery_task_id == celery_task_id, self.model.status.in_(ACTIVE_STATUSES))
+            .values(**values)
+        )
+        db.commit()
+        return result.rowcount > 0
+
+    def stop_pending(self, db: Session, *, run: TaskRun, end_time: datetime) -> bool:
+        """
+        PENDING → FAILURE（手动停止）：撤销后 Worker 不会再执行，由这里直接结束记录
+        只更新仍在排队的记录；Worker 已经开始执行时返回 False，由 Worker 按取消信号结束
+        """
+        values = {
+            "status": TaskRunStatus.FAILURE,
+            "end_time": end_time,
+            "manually_stopped": True,
+            "log_output": "[INFO] Task was manually stopped before it started.",
+        }
+        result = db.execute(
+            update(self.model)
+            .where(self.model.id == run.id, self.model.status == TaskRunStatus.PENDING)
+            .values(**values)
         )
-        db.add(db_obj)
         db.commit()
-        db.refresh(db_obj)
-        return db_obj
-
-    def finish_run(self, db: Session, *, celery_task_id: str, status: TaskRunStatus, log_output: str = None) -> None:
-        db_obj = self.get_by_celery_id(db, celery_task_id=celery_task_id)
-        if not db_obj:
-            return
-        db_obj.status = status
-        db_obj.end_time = func.now()
-        db_obj.log_output = log_output
+        return result.rowcount > 0
+
+    def remove_unstarted(self, db: Session, *, ids: Sequence[int]) -> None:
+        """删除尚未被 Worker 领取的记录（投递到 Celery 失败时回滚调度）"""
+        db.execute(
+            delete(self.model)
+            .where(self.model.id.in_(ids), self.model.status == TaskRunStatus.PENDING)
+        )
         db.commit()
 
 
-task_run = CRUDTaskRun(TaskRun)
\ No newline at end of file
+class CRUDTaskRunGroup(CRUDBase[TaskRunGroup, TaskRunGroupCreate, TaskRunGroupCreate]):
+    def get_summary(self, db: Session, *, group: TaskRunGroup) -> Dict[str, Any]:
+        """
+        聚合分组下所有子执行记录的状态（一条 GROUP BY 查询，不加载子记录本身）
+        尚未被 Worker 登记的目标节点按 PENDING 计算
+        """
+        stmt = (
+            select(
+                TaskRun.status,
+                func.count(TaskRun.id),
+                func.coalesce(func.sum(TaskRun.items_scraped), 0),
+                func.coalesce(func.sum(TaskRun.requests_count), 0),
+                func.min(TaskRun.start_time),
+                func.max(TaskRun.end_time),
+            )
+            .where(TaskRun.group_id == group.id)
+            .group_by(TaskRun.status)
+        )
+        counts = {status.value: 0 for status in TaskRunStatus}
+        items_scraped = requests_count = 0
+        start_time = end_time = None
+        for status, count, items, requests, first_start, last_end in db.execute(stmt):
+            key = status.value if isinstance(status, TaskRunStatus) else str(status)
+            counts[key] = count
+            items_scraped += int(items)
+            requests_count += int(requests)
+            if first_start is not None and (start_time is None or first_start < start_time):
+                start_time = first_start
+            if last_end is not None and (end_time is None or last_end > end_time):
+                end_time = last_end
+
+        counts[TaskRunStatus.PENDING.value] += max(group.node_count - sum(counts.values()), 0)
+        status = self.aggregate_status(counts)
+        return {
+            "id": group.id,
+            "task_id": group.task_id,
+            "run_mode": group.run_mode,
+            "node_count": group.node_count,
+            "created_at": group.created_at,
+            "status": status,
+            "status_counts": counts,
+            "items_scraped": items_scraped,
+            "requests_count": requests_count,
+            "start_time": start_time,
+            "end_time": end_time if status in (TaskRunStatus.SUCCESS.value, TaskRunStatus.FAILURE.value) else None,
+        }
+
+    @staticmethod
+    def aggregate_status(counts: Dict[str, int]) -> str:
+        """
+        分组状态：
+        - 有子记录仍在执行（或排队中）→ RUNNING；全部排队中 → PENDING
+        - 全部结束且都成功 → SUCCESS，否则 → FAILURE
+        """
+        pending = counts.get(TaskRunStatus.PENDING.value, 0)
+        running = counts.get(TaskRunStatus.RUNNING.value, 0)
+        finished = counts.get(TaskRunStatus.SUCCESS.value, 0) + counts.get(TaskRunStatus.FAILURE.value, 0)
+        if pending or running:
+            return TaskRunStatus.PENDING.value if not running and not finished else TaskRunStatus.RUNNING.value
+        if counts.get(TaskRunStatus.FAILURE.value, 0):
+            return TaskRunStatus.FAILURE.value
+        return TaskRunStatus.SUCCESS.value
+
+
+task_run = CRUDTaskRun(TaskRun)
+task_run_group = CRUDTaskRunGroup(TaskRunGroup)
\ No newline at end of file
@@ -0,0 +1,285 @@
+# /app/crud/crud_task_run_stats.py
+
+from typing import Any, Dict, Iterable, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import select, func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.crud.base import CRUDBase
+from app.models.project import Project
+from app.models.task import Task
+from app.models.task_run import TaskRun, TaskRunStatus
+from app.models.task_run_stats import TaskRunStats
+from app.utils.sketch import DurationSketch
+
+FINISHED_STATUSES = (TaskRunStatus.SUCCESS, TaskRunStatus.FAILURE)
+ACTIVE_STATUSES = (TaskRunStatus.PENDING, TaskRunStatus.RUNNING)
+
+
+def _run_duration(duration_seconds, start_time, end_time) -> Optional[float]:
+    """执行时长：优先使用记录的 duration_seconds，否则由起止时间计算"""
+    if duration_seconds is not None:
+        return duration_seconds
+    if start_time and end_time:
+        return max((end_time - start_time).total_seconds(), 0.0)
+    return None
+
+
+class _Accumulator:
+    """单个任务的汇总值，增量更新和重建共用同一套累加逻辑"""
+
+    def __init__(self, stats: Optional[TaskRunStats] = None):
+        self.total_runs = 0
+        self.success_runs = 0
+        self.failure_runs = 0
+        self.stopped_runs = 0
+        self.duration_sum = 0.0
+        self.sketch = DurationSketch()
+        self.items_scraped = 0
+        self.requests_count = 0
+        self.last_run_id = None
+        self.last_run_status = None
+        self.last_run_time = None
+        if stats is not None:
+            self.total_runs = stats.total_runs or 0
+            self.success_runs = stats.success_runs or 0
+            self.failure_runs = stats.failure_runs or 0
+            self.stopped_runs = stats.stopped_runs or 0
+            self.duration_sum = stats.duration_sum or 0.0
+            self.sketch = DurationSketch.from_dict(stats.duration_sketch)
+            self.items_scraped = stats.items_scraped or 0
+            self.requests_count = stats.requests_count or 0
+            self.last_run_id = stats.last_run_id
+            self.last_run_status = stats.last_run_status
+            self.last_run_time = stats.last_run_time
+
+    def add(self, *, run_id, status, manually_stopped, start_time, end_time,
+            duration_seconds, items_scraped, requests_count) -> None:
+        status = status.value if isinstance(status, TaskRunStatus) else str(status)
+        self.total_runs += 1
+        if status == TaskRunStatus.SUCCESS.value:
+            self.success_runs += 1
+        else:
+            self.failure_runs += 1
+        if manually_stopped:
+            self.stopped_runs += 1
+
+        duration = _run_duration(duration_seconds, start_time, end_time)
+        if duration is not None:
+            self.duration_sum += duration
+            self.sketch.add(duration)
+
+        self.items_scraped += items_scraped or 0
+        self.requests_count += requests_count or 0
+
+        run_time = start_time or end_time
+        if self.last_run_time is None or (run_time is not None and run_time >= self.last_run_time):
+            self.last_run_id = run_id
+            self.last_run_status = status
+            self.last_run_time = run_time
+
+    def values(self) -> Dict[str, Any]:
+        return {
+            "total_runs": self.total_runs,
+            "success_runs": self.success_runs,
+            "failure_runs": self.failure_runs,
+            "stopped_runs": self.stopped_runs,
+            "duration_sum": self.duration_sum,
+            "duration_sketch": self.sketch.to_dict(),
+            "items_scraped": self.items_scraped,
+            "requests_count": self.requests_count,
+            "last_run_id": self.last_run_id,
+            "last_run_status": self.last_run_status,
+            "last_run_time": self.last_run_time,
+        }
+
+
+class CRUDTaskRunStats(CRUDBase[TaskRunStats, BaseModel, BaseModel]):
+    """
+    任务执行统计汇总：执行结束时增量更新，读取时只访问 O(任务数) 行（只读）
+    上线前已有的历史执行由数据迁移根据 cp_task_runs 一次性回填；
+    之后新建的任务在首次执行结束时插入汇总行，读取时没有汇总行按零值返回
+    """
+
+    def record_run(self, db: Session, *, task_run: TaskRun) -> None:
+        """
+        把一次已结束的执行计入汇总（调用方负责提交）
+        先插入一行零值（已存在时忽略），再锁定汇总行读改写：
+        多个 Worker 同时结束同一任务的执行（包括该任务的首次执行）时不会死锁，也不会丢失更新
+        """
+        self._insert_empty(db, task_id=task_run.task_id)
+        stats = db.execute(
+            select(self.model).where(self.model.task_id == task_run.task_id).with_for_update()
+        ).scalar_one()
+
+        acc = _Accumulator(stats)
+        acc.add(
+            run_id=task_run.id,
+            status=task_run.status,
+            manually_stopped=task_run.manually_stopped,
+            start_time=task_run.start_time,
+            end_time=task_run.end_time,
+            duration_seconds=task_run.duration_seconds,
+            items_scraped=task_run.items_scraped,
+            requests_count=task_run.requests_count,
+        )
+        for field, value in acc.values().items():
+            setattr(stats, field, value)
+        db.flush()
+
+    def remove_run(self, db: Session, *, task_run: TaskRun) -> None:
+        """
+        删除执行记录后同步汇总（调用方在删除后、提交前调用）
+        时长草图和最近一次执行无法做减法，锁定汇总行后按 cp_task_runs 重建该任务的汇总
+        """
+        if task_run.status not in FINISHED_STATUSES:
+            return  # 未结束的执行没有计入汇总
+        self._insert_empty(db, task_id=task_run.task_id)
+        db.execute(
+            select(self.model.task_id).where(self.model.task_id == task_run.task_id).with_for_update()
+        )
+        self.rebuild(db, task_ids=[task_run.task_id])
+
+    def _insert_empty(self, db: Session, *, task_id: int) -> None:
+        """INSERT IGNORE 一行零值汇总，并发插入同一任务时只有一条生效"""
+        values = {"task_id": task_id, **_Accumulator().values()}
+        if db.get_bind().dialect.name == "sqlite":
+            stmt = sqlite_insert(self.model).values(**values).on_conflict_do_nothing(index_elements=["task_id"])
+        else:
+            stmt = mysql_insert(self.model).values(**values).prefix_with("IGNORE")
+        db.execute(stmt)
+
+    def rebuild(self, db: Session, *, task_ids: Iterable[int]) -> None:
+        """根据 cp_task_runs 重新计算指定任务的汇总（调用方负责提交）"""
+        task_ids = list(task_ids)
+        if not task_ids:
+            return
+        accumulators = {task_id: _Accumulator() for task_id in task_ids}
+        stmt = (
+            select(
+                TaskRun.task_id, TaskRun.id, TaskRun.status, TaskRun.manually_stopped,
+                TaskRun.start_time, TaskRun.end_time, TaskRun.duration_seconds,
+                TaskRun.items_scraped, TaskRun.requests_count,
+            )
+            .where(TaskRun.task_id.in_(task_ids), TaskRun.status.in_(FINISHED_STATUSES))
+            .execution_options(yield_per=10000)
+        )
+        for row in db.execute(stmt):
+            accumulators[row.task_id].add(
+                run_id=row.id,
+                status=row.status,
+                manually_stopped=row.manually_stopped,
+                start_time=row.start_time,
+                end_time=row.end_time,
+                duration_seconds=row.duration_seconds,
+                items_scraped=row.items_scraped,
+                requests_count=row.requests_count,
+            )
+
+        rows = [{"task_id": task_id, **acc.values()} for task_id, acc in accumulators.items()]
+        update_columns = [c for c in rows[0] if c != "task_id"]
+        if db.get_bind().dialect.name == "sqlite":
+            stmt = sqlite_insert(self.model).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["task_id"],
+                set_={c: stmt.excluded[c] for c in update_columns}
+            )
+        else:
+            stmt = mysql_insert(self.model).values(rows)
+            stmt = stmt.on_duplicate_key_update(**{c: stmt.inserted[c] for c in update_columns})
+        db.execute(stmt)
+
+    def get_summary(self, db: Session, *, task_id: int) -> Dict[str, Any]:
+        """单个任务的统计（读取汇总行 + 正在执行的次数）"""
+        stats = self.get(db, id=task_id)
+        if stats is None:
+            # 还没有执行结束过：按零值返回（不在读取时写入）
+            stats = self.model(task_id=task_id, **_Accumulator().values())
+
+        active_runs = db.execute(
+            select(func.count(TaskRun.id)).where(
+                TaskRun.task_id == task_id, TaskRun.status.in_(ACTIVE_STATUSES)
+            )
+        ).scalar_one()
+        return self.summarize(stats, active_runs=active_runs)
+
+    def get(self, db: Session, id: Any) -> Optional[TaskRunStats]:
+        """按 task_id 获取汇总行（汇总表以 task_id 为主键）"""
+        return db.get(self.model, id)
+
+    @staticmethod
+    def summarize(stats: TaskRunStats, *, active_runs: int = 0) -> Dict[str, Any]:
+        """把汇总行转换为接口返回的统计字段"""
+        sketch = DurationSketch.from_dict(stats.duration_sketch)
+        durations = sketch.count
+        return {
+            "total_runs": stats.total_runs + active_runs,
+            "finished_runs": stats.total_runs,
+            "active_runs": active_runs,
+            "success_runs": stats.success_runs,
+            "failed_runs": stats.failure_runs,
+            "stopped_runs": stats.stopped_runs,
+            "avg_duration_seconds": round(stats.duration_sum / durations, 2) if durations else None,
+            "p50_duration_seconds": _round(sketch.quantile(0.5)),
+            "p95_duration_seconds": _round(sketch.quantile(0.95)),
+            "items_scraped": stats.items_scraped,
+            "requests_count": stats.requests_count,
+            "last_run_id": stats.last_run_id,
+            "last_run_status": stats.last_run_status,
+            "last_run_time": stats.last_run_time,
+        }
+
+    async def get_overview_async(self, db: AsyncSession, *, owner_id: int) -> Dict[str, Any]:
+        """
+        某个用户名下的项目数、任务数和执行统计
+        只读取汇总行（O(任务数)）；没有汇总行的任务还没有执行结束过，不计入执行统计
+        """
+        owned_tasks = (
+            select(Task.id)
+            .join(Project, Task.project_id == Project.id)
+            .where(Project.owner_id == owner_id)
+        )
+        total_tasks = (await db.execute(
+            select(func.count()).select_from(owned_tasks.subquery())
+        )).scalar_one()
+        total_projects = (await db.execute(
+            select(func.count(Project.id)).where(Project.owner_id == owner_id)
+        )).scalar_one()
+        totals = (await db.execute(
+            select(
+                func.coalesce(func.sum(self.model.total_runs), 0),
+                func.coalesce(func.sum(self.model.success_runs), 0),
+                func.coalesce(func.sum(self.model.failure_runs), 0),
+                func.coalesce(func.sum(self.model.items_scraped), 0),
+                func.coalesce(func.sum(self.model.requests_count), 0),
+            ).where(self.model.task_id.in_(owned_tasks))
+        )).one()
+        active_runs = (await db.execute(
+            select(func.count(TaskRun.id)).where(
+                TaskRun.task_id.in_(owned_tasks), TaskRun.status.in_(ACTIVE_STATUSES)
+            )
+        )).scalar_one()
+
+        finished_runs, success_runs, failed_runs, items_scraped, requests_count = totals
+        return {
+            "total_projects": int(total_projects),
+            "total_tasks": int(total_tasks),
+            "total_runs": int(finished_runs) + int(active_runs),
+            "finished_runs": int(finished_runs),
+            "active_runs": int(active_runs),
+            "success_runs": int(success_runs),
+            "failed_runs": int(failed_runs),
+            "items_scraped": int(items_scraped),
+            "requests_count": int(requests_count),
+        }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+
+task_run_stats = CRUDTaskRunStats(TaskRunStats)
@@ -2,6 +2,7 @@
 
 from typing import Any, Dict, List, Optional, cast
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import Select, select, update, delete, or_
 from sqlalchemy.sql import func
@@ -9,6 +10,7 @@ from sqlalchemy.sql import func
 from app.crud.base import CRUDBase
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
+from app.services.user_cache import user_cache
 
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
@@ -23,6 +25,12 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         result = db.execute(stmt)
         return result.scalar_one_or_none()
 
+    async def get_by_username_async(self, db: AsyncSession, *, username: str) -> Optional[User]:
+        """get_by_username 的异步版本"""
+        stmt: Select[tuple[User]] = select(self.model).where(self.model.username == username)
+        result = await db.execute(stmt)
+        return result.scalar_one_or_none()
+
     def get_by_email(self, db: Session, *, email: str) -> Optional[User]:
         """根据邮箱获取用户（唯一）"""
         if not email:
@@ -122,7 +130,18 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             hashed_password = self._hash_password(password)
             update_data["hashed_password"] = hashed_password
 
-        return super().update(db, db_obj=db_obj, obj_in=update_data)
+        # 用户名可能被修改：按修改前的用户名失效
+        username = db_obj.username
+        db_obj = super().update(db, db_obj=db_obj, obj_in=update_data)
+        user_cache.invalidate(username)
+        return db_obj
+
+    def remove(self, db: Session, *, id: int) -> Optional[User]:
+        """删除用户"""
+        user = super().remove(db, id=id)
+        if user is not None:
+            user_cache.invalidate(user.username)
+        return user
 
     def authenticate(self, db: Session, *, username: str, password: str) -> Optional[User]:
         """
@@ -156,6 +175,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         db.add(user)
         db.commit()
         db.refresh(user)
+        user_cache.invalidate(user.username)
         return user
 
     def _hash_password(self, password: str) -> str:
@@ -182,6 +202,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         db.add(user)
         db.commit()
         db.refresh(user)
+        user_cache.invalidate(user.username)
         return user
 
     def revoke_superuser(self, db: Session, *, id: int) -> Optional[User]:
@@ -193,6 +214,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         db.add(user)
         db.commit()
         db.refresh(user)
+        user_cache.invalidate(user.username)
         return user
 
 
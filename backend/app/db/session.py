@@ -1,5 +1,8 @@
 # /app/db/session.py
+from typing import Optional
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
@@ -19,3 +22,38 @@ SessionLocal = sessionmaker(
     autoflush=False,
     bind=engine,
 )
+
+# 异步引擎：供高频只读接口使用
+# 懒加载，Celery Worker 等只使用同步引擎的进程不会创建异步连接池
+_async_engine: Optional[AsyncEngine] = None
+
+
+def get_async_engine() -> AsyncEngine:
+    """获取（首次调用时创建）异步引擎"""
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            settings.SQLALCHEMY_DATABASE_URL,
+            pool_pre_ping=True,
+            pool_size=settings.ASYNC_DB_POOL_SIZE,
+            max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+            echo=False,
+        )
+    return _async_engine
+
+
+async def dispose_async_engine() -> None:
+    """关闭异步引擎（如果已创建）"""
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+
+
+# 创建异步 Session 工厂（使用时通过 bind=get_async_engine() 绑定引擎）
+# expire_on_commit=False：提交后仍可读取对象属性，避免在异步上下文中触发隐式 IO
+AsyncSessionLocal = async_sessionmaker(
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
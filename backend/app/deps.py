@@ -1,17 +1,20 @@
 # /backend/app/api/deps.py
 
-from typing import Generator, Annotated
-from fastapi import Depends, HTTPException, status
+import hmac
+from typing import AsyncGenerator, Generator, Annotated, Optional
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.db.session import engine
+from app.db.session import AsyncSessionLocal, engine, get_async_engine
 from app import models
 from app.crud import user as crud_user
 from app.schemas.token import TokenPayload  # 确保路径正确
+from app.services.user_cache import user_cache
 
 # --- 1. OAuth2 密码流方案 ---
 oauth2_scheme = OAuth2PasswordBearer(
@@ -26,20 +29,22 @@ def get_db() -> Generator[Session, None, None]:
         yield db
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """为每个请求提供独立的异步数据库会话（高频只读接口使用）"""
+    async with AsyncSessionLocal(bind=get_async_engine()) as db:
+        yield db
+
+
 # --- 3. 获取当前活跃用户（核心依赖）---
-def get_current_active_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
-) -> models.User:
-    """
-    解码 JWT 并返回当前已认证且活跃的用户。
-    若 token 无效、过期、用户不存在或被禁用，则抛出相应异常。
-    """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+
+def _get_token_username(token: str) -> str:
+    """解码 JWT 并返回其中的用户名，token 无效或过期时抛出 401"""
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
@@ -51,8 +56,11 @@ def get_current_active_user(
         TokenPayload(sub=username)
     except (JWTError, ValidationError):
         raise credentials_exception
+    return username
+
 
-    user = crud_user.get_by_username(db, username=username)
+def _ensure_active_user(user) -> models.User:
+    """用户不存在时抛出 401，被禁用时抛出 403"""
     if not user:
         raise credentials_exception
 
@@ -65,6 +73,45 @@ def get_current_active_user(
     return user
 
 
+def get_current_active_user(
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+) -> models.User:
+    """
+    解码 JWT 并返回当前已认证且活跃的用户。
+    若 token 无效、过期、用户不存在或被禁用，则抛出相应异常。
+    用户信息优先从 user_cache 读取，未命中时查询数据库并写入缓存。
+    """
+    username = _get_token_username(token)
+    user = user_cache.get(username)
+    if user is not None:
+        # 缓存命中：挂到本请求的会话上（不发出 SQL），后续修改 / 懒加载与数据库加载的对象一致
+        user = db.merge(user, load=False)
+    else:
+        generation = user_cache.generation()
+        user = crud_user.get_by_username(db, username=username)
+        if user is not None:
+            user_cache.put(user, generation)
+    return _ensure_active_user(user)
+
+
+async def get_current_active_user_async(
+    db: AsyncSession = Depends(get_async_db),
+    token: str = Depends(oauth2_scheme)
+) -> models.User:
+    """get_current_active_user 的异步版本，与异步接口共用同一个请求级会话"""
+    username = _get_token_username(token)
+    user = user_cache.get(username)
+    if user is not None:
+        user = await db.merge(user, load=False)
+    else:
+        generation = user_cache.generation()
+        user = await crud_user.get_by_username_async(db, username=username)
+        if user is not None:
+            user_cache.put(user, generation)
+    return _ensure_active_user(user)
+
+
 # --- 4. 获取当前活跃超级用户 ---
 def get_current_active_superuser(
     current_user: models.User = Depends(get_current_active_user)
@@ -80,7 +127,21 @@ def get_current_active_superuser(
     return current_user
 
 
-# --- 5. 类型别名（推荐在路由中使用）---
+# --- 5. Worker 接口认证 ---
+def verify_worker_token(x_worker_token: Optional[str] = Header(None)) -> None:
+    """
+    校验 Worker 请求头中的共享令牌（项目部署包下载等接口，包中可能含有项目的凭据）。
+    主服务未配置 WORKER_API_TOKEN 时一律拒绝。
+    """
+    expected = settings.WORKER_API_TOKEN
+    if not expected or not x_worker_token or not hmac.compare_digest(x_worker_token, expected):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid worker token"
+        )
+
+
+# --- 6. 类型别名（推荐在路由中使用）---
 
 # 普通登录用户（已激活）
 CurrentUser = Annotated[models.User, Depends(get_current_active_user)]
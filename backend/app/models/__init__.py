@@ -1,7 +1,8 @@
-from .node import Node
+from .node import Node, NodeTag
 from .user import User
 from .task import Task
-from .task_run import TaskRun
+from .task_run import TaskRun, TaskRunGroup
+from .task_run_stats import TaskRunStats
 from .project import Project
 from .git_credentials import GitCredential
 from .workflow import Workflow, WorkflowTask, TaskDependency
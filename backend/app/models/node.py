@@ -2,7 +2,7 @@
 
 from typing import Optional, List
 from enum import Enum as PyEnum
-from sqlalchemy import Integer, String, DateTime, func, Enum as SqlEnum, Float, Text
+from sqlalchemy import Integer, String, DateTime, ForeignKey, Index, func, Enum as SqlEnum, Float, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base_class import Base
 
@@ -24,6 +24,14 @@ class NodeOS(str, PyEnum):
 
 class Node(Base):
     __tablename__ = "cp_nodes"
+    __table_args__ = (
+        # 节点列表的游标分页：按 (registered_at, id) 倒序
+        Index("ix_cp_nodes_registered_id", "registered_at", "id"),
+        # 调度器按在线状态筛选候选节点
+        Index("ix_cp_nodes_status", "status"),
+        # 物理主机清单 / 资源检查按物理主机分组、筛选
+        Index("ix_cp_nodes_physical_host_name", "physical_host_name"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     hostname: Mapped[str] = mapped_column(String(100), unique=True, index=True, nullable=False)
@@ -76,4 +84,27 @@ class Node(Base):
     physical_host_id: Mapped[Optional[str]] = mapped_column(String(100), comment="物理主机标识（如MAC地址）")
     physical_host_name: Mapped[Optional[str]] = mapped_column(String(100), comment="物理主机名")
     container_id: Mapped[Optional[str]] = mapped_column(String(100), comment="容器ID（如果是Docker容器）")
-    instance_name: Mapped[Optional[str]] = mapped_column(String(100), comment="实例名称（用户自定义）")
\ No newline at end of file
+    instance_name: Mapped[Optional[str]] = mapped_column(String(100), comment="实例名称（用户自定义）")
+
+    # 规范化的标签（由 tags 字段同步维护），用于按标签筛选节点
+    tag_links: Mapped[List["NodeTag"]] = relationship(
+        "NodeTag", back_populates="node", cascade="all, delete-orphan"
+    )
+
+
+class NodeTag(Base):
+    """
+    节点标签（每个节点的每个标签一行）
+
+    Node.tags 是逗号分隔的字符串，无法按标签走索引；这里按 parse_tags 的规则拆分保存，
+    TAG_BASED 分发通过 (tag, node_id) 索引直接找到拥有某些标签的节点。
+    """
+    __tablename__ = "cp_node_tags"
+    __table_args__ = (
+        Index("ix_cp_node_tags_tag_node", "tag", "node_id"),
+    )
+
+    node_id: Mapped[int] = mapped_column(Integer, ForeignKey("cp_nodes.id", ondelete="CASCADE"), primary_key=True)
+    tag: Mapped[str] = mapped_column(String(100), primary_key=True, comment="标签（小写）")
+
+    node: Mapped["Node"] = relationship("Node", back_populates="tag_links")
@@ -30,6 +30,7 @@ class Project(Base):
     entrypoint: Mapped[str] = mapped_column(String(100), default="run.py", comment="入口脚本")
     has_requirements: Mapped[bool] = mapped_column(Boolean, default=False, comment="是否有 requirements.txt")
     env_template: Mapped[Optional[dict]] = mapped_column(JSON, comment="环境变量模板")
+    bundle_hash: Mapped[Optional[str]] = mapped_column(String(64), comment="当前部署包的内容哈希（SHA-256）")
 
     # 关系
     owner: Mapped["User"] = relationship("User", back_populates="projects")
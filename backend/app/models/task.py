@@ -1,7 +1,7 @@
 # /app/models/task.py
 from typing import Optional, List
 from enum import Enum as PyEnum
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, JSON, ForeignKey, func, Enum as SqlEnum
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, JSON, ForeignKey, Index, func, Enum as SqlEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base_class import Base
 # 使用字符串引用避免循环导入
@@ -30,8 +30,17 @@ class TaskDistributionMode(str, PyEnum):
     MULTIPLE = "MULTIPLE"  # 指定多个节点
     TAG_BASED = "TAG_BASED"  # 基于标签分发
 
+class TagMatchMode(str, PyEnum):
+    """TAG_BASED 分发时的标签匹配方式"""
+    ANY = "ANY"  # 节点拥有任意一个目标标签
+    ALL = "ALL"  # 节点拥有全部目标标签
+
 class Task(Base):
     __tablename__ = "cp_tasks"
+    __table_args__ = (
+        # 任务列表的游标分页：按项目过滤，按 (created_at, id) 倒序
+        Index("ix_cp_tasks_project_created_id", "project_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
@@ -76,6 +85,12 @@ class Task(Base):
     target_node_ids: Mapped[Optional[list]] = mapped_column(JSON, comment="目标节点ID列表")
     # 基于标签分发时使用
     target_node_tags: Mapped[Optional[str]] = mapped_column(String(100), comment="目标节点标签")
+    target_tag_match: Mapped[TagMatchMode] = mapped_column(
+        SqlEnum(TagMatchMode, name="tag_match_mode_enum"),
+        default=TagMatchMode.ALL,
+        server_default=TagMatchMode.ALL.value,
+        comment="标签匹配方式：ANY 任意一个 / ALL 全部"
+    )
     
     # ✅ 节点绑定关系
     target_node: Mapped[Optional["Node"]] = relationship("Node", foreign_keys=[target_node_id])
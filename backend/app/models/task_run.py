@@ -2,7 +2,7 @@
 from typing import Optional
 
 from enum import Enum as PyEnum  # ✅ Python 枚举
-from sqlalchemy import Integer, String, DateTime, ForeignKey, Enum as SqlEnum, Text, Float, Boolean  # ✅ SQL 列类型
+from sqlalchemy import BigInteger, Integer, String, DateTime, ForeignKey, Enum as SqlEnum, Text, Float, Boolean, Index, func  # ✅ SQL 列类型
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base_class import Base
 
@@ -14,8 +14,34 @@ class TaskRunStatus(str, PyEnum):
     FAILURE = "FAILURE"
 
 
+class TaskRunGroup(Base):
+    """
+    扇出执行记录：MULTIPLE / TAG_BASED 模式下一次调度会在每个目标节点上各执行一次，
+    这些子 TaskRun 通过 group_id 归属到同一个分组，分组状态由子记录聚合得出
+    """
+    __tablename__ = "cp_task_run_groups"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    task_id: Mapped[int] = mapped_column(Integer, ForeignKey("cp_tasks.id"), nullable=False, index=True)
+    run_mode: Mapped[Optional[str]] = mapped_column(String(20), comment="触发方式：scheduled / manual")
+    node_count: Mapped[int] = mapped_column(Integer, default=0, comment="扇出的目标节点数")
+    created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
+
+    task: Mapped["Task"] = relationship("Task")
+    runs: Mapped[list["TaskRun"]] = relationship("TaskRun", back_populates="group")
+
+
 class TaskRun(Base):
     __tablename__ = "cp_task_runs"
+    __table_args__ = (
+        # 按 (task_id, status) 过滤的查询：统计汇总重建、统计某任务正在执行的次数
+        Index("ix_cp_task_runs_task_status_start", "task_id", "status", "start_time"),
+        # 按状态筛选执行记录（正在执行 / 排队中的执行等），按开始时间排序
+        Index("ix_cp_task_runs_status_start", "status", "start_time"),
+        # 执行记录列表的游标分页：按 (start_time, id) 倒序，全局 / 按任务
+        Index("ix_cp_task_runs_start_id", "start_time", "id"),
+        Index("ix_cp_task_runs_task_start_id", "task_id", "start_time", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     task_id: Mapped[int] = mapped_column(Integer, ForeignKey("cp_tasks.id"), nullable=False)
@@ -26,7 +52,9 @@ class TaskRun(Base):
     )
     start_time: Mapped[Optional[DateTime]] = mapped_column(DateTime)
     end_time: Mapped[Optional[DateTime]] = mapped_column(DateTime)
-    log_output: Mapped[Optional[str]] = mapped_column(Text)
+    log_output: Mapped[Optional[str]] = mapped_column(Text)  # 仅保存简短的错误信息；完整日志见 log_path
+    log_path: Mapped[Optional[str]] = mapped_column(String(255), comment="压缩日志归档路径（相对 LOG_STORE_DIR）")
+    log_size: Mapped[Optional[int]] = mapped_column(BigInteger, comment="原始日志字节数")
     worker_node: Mapped[Optional[str]] = mapped_column(String(100))
 
     # ✅ 新增字段
@@ -41,6 +69,10 @@ class TaskRun(Base):
     # TaskRun 增加 node_id
     node_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("cp_nodes.id"))
 
+    # 扇出执行时所属的分组
+    group_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("cp_task_run_groups.id"), index=True)
+
     node: Mapped["Node"] = relationship("Node")
+    group: Mapped[Optional["TaskRunGroup"]] = relationship("TaskRunGroup", back_populates="runs")
     # 关联到主任务
     task: Mapped["Task"] = relationship("Task", back_populates="runs")
\ No newline at end of file
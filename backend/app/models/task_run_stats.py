@@ -0,0 +1,30 @@
+# /backend/app/models/task_run_stats.py
+from typing import Optional
+
+from sqlalchemy import BigInteger, Integer, String, DateTime, Float, ForeignKey, JSON, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base_class import Base
+
+
+class TaskRunStats(Base):
+    """
+    任务执行统计汇总（每个任务一行）
+
+    每次执行结束时增量更新，仪表盘和统计接口只读这里，不再扫描 cp_task_runs。
+    只统计已结束的执行；正在执行 / 排队中的执行不计入。
+    """
+    __tablename__ = "cp_task_run_stats"
+
+    task_id: Mapped[int] = mapped_column(Integer, ForeignKey("cp_tasks.id", ondelete="CASCADE"), primary_key=True)
+    total_runs: Mapped[int] = mapped_column(Integer, default=0, comment="已结束的执行次数")
+    success_runs: Mapped[int] = mapped_column(Integer, default=0, comment="成功次数")
+    failure_runs: Mapped[int] = mapped_column(Integer, default=0, comment="失败次数（含手动停止）")
+    stopped_runs: Mapped[int] = mapped_column(Integer, default=0, comment="手动停止次数")
+    duration_sum: Mapped[float] = mapped_column(Float, default=0.0, comment="执行时长总和（秒）")
+    duration_sketch: Mapped[Optional[dict]] = mapped_column(JSON, comment="执行时长分位数草图（对数分桶）")
+    items_scraped: Mapped[int] = mapped_column(BigInteger, default=0, comment="累计抓取条数")
+    requests_count: Mapped[int] = mapped_column(BigInteger, default=0, comment="累计请求数")
+    last_run_id: Mapped[Optional[int]] = mapped_column(Integer, comment="最近一次结束的执行 ID")
+    last_run_status: Mapped[Optional[str]] = mapped_column(String(20), comment="最近一次结束的执行状态")
+    last_run_time: Mapped[Optional[DateTime]] = mapped_column(DateTime, comment="最近一次结束的执行开始时间")
+    updated_at: Mapped[Optional[DateTime]] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
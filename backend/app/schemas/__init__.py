@@ -1,8 +1,8 @@
 from .token import Token, TokenPayload, Msg
 from .user import UserBase, UserCreate, UserUpdate, UserUpdateMe, UserUpdatePassword, UserOut
 from .task import TaskBase, TaskCreate, TaskUpdate, TaskOut
-from .node import NodeBase, NodeCreate, NodeUpdate, NodeStatus, NodeOut
-from .task_run import TaskRunBase, TaskRunOut, TaskRunCreate, TaskRunUpdate, TaskRunLog, TaskRunExport
-from .project import Project, ProjectBase, ProjectUpdate, ProjectCreate, ProjectOut
+from .node import NodeBase, NodeCreate, NodeUpdate, NodeStatus, NodeOut, NodeSummary
+from .task_run import TaskRunBase, TaskRunOut, TaskRunSummary, TaskRunCreate, TaskRunUpdate, TaskRunLog, TaskRunExport, TaskRunGroupCreate, TaskRunGroupOut
+from .project import Project, ProjectBase, ProjectUpdate, ProjectCreate, ProjectOut, BundleObjectRanges
 from .git_credential import GitCredentialBase, GitCredentialCreate, GitCredentialUpdate, GitCredentialOut
 from .api_response import ApiResponse
\ No newline at end of file
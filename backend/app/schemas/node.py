@@ -71,4 +71,20 @@ class NodeOut(NodeBase):
     id: int
 
     class Config:
-        from_attributes = True  # Pydantic V2
\ No newline at end of file
+        from_attributes = True  # Pydantic V2
+
+
+class NodeSummary(BaseModel):
+    """节点列表的精简视图（`view=summary`）"""
+    id: int
+    hostname: str
+    ip_address: Optional[str] = None
+    status: NodeStatus
+    last_heartbeat: Optional[datetime] = None
+    cpu_usage: Optional[float] = None
+    memory_usage: Optional[float] = None
+    disk_usage: Optional[float] = None
+    max_concurrency: int = 4
+    current_concurrency: int = 0
+    tags: Optional[str] = None
+    physical_host_name: Optional[str] = None
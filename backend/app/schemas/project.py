@@ -1,6 +1,6 @@
 # schemas/project.py
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional, Tuple
 from datetime import datetime
 
 
@@ -29,6 +29,7 @@ class Project(ProjectBase):
     entrypoint: str
     has_requirements: bool
     env_template: Optional[dict] = None
+    bundle_hash: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -37,8 +38,14 @@ class Project(ProjectBase):
 class ProjectOut(ProjectBase):
     id: int
     package_path: Optional[str] = None
+    bundle_hash: Optional[str] = None
     created_at: datetime
     owner_id: int
 
     class Config:
         from_attributes = True
+
+
+class BundleObjectRanges(BaseModel):
+    # 增量传输：要读取的对象片段 (SHA-256, 偏移, 长度)，按顺序拼接返回
+    ranges: List[Tuple[str, int, int]]
@@ -2,7 +2,7 @@
 from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional, Dict, Any, List
-from app.models.task import TaskPriority, TaskDistributionMode
+from app.models.task import TaskPriority, TaskDistributionMode, TagMatchMode
 
 
 class TaskBase(BaseModel):
@@ -25,6 +25,7 @@ class TaskBase(BaseModel):
     target_node_id: Optional[int] = None
     target_node_ids: Optional[List[int]] = None
     target_node_tags: Optional[str] = None
+    target_tag_match: TagMatchMode = TagMatchMode.ALL
 
 
 class TaskCreate(TaskBase):
@@ -54,6 +55,7 @@ class TaskUpdate(TaskBase):
     target_node_id: Optional[int] = None
     target_node_ids: Optional[List[int]] = None
     target_node_tags: Optional[str] = None
+    target_tag_match: Optional[TagMatchMode] = None
 
 
 class TaskOut(TaskBase):
@@ -11,6 +11,7 @@ class TaskRunBase(BaseModel):
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
     log_output: Optional[str] = None
+    log_size: Optional[int] = None
     worker_node: Optional[str] = None
     exit_code: Optional[int] = None
     cpu_usage: Optional[float] = None
@@ -21,6 +22,7 @@ class TaskRunBase(BaseModel):
     result_size_mb: Optional[float] = None
     manually_stopped: bool = False
     node_id: Optional[int] = None
+    group_id: Optional[int] = None
 
 
 class TaskRunCreate(TaskRunBase):
@@ -31,6 +33,7 @@ class TaskRunUpdate(TaskRunBase):
     task_id: Optional[int] = None
     celery_task_id: Optional[str] = None
     status: Optional[str] = None
+    log_path: Optional[str] = None
 
 
 class TaskRunOut(TaskRunBase):
@@ -41,9 +44,29 @@ class TaskRunOut(TaskRunBase):
         from_attributes = True
 
 
+class TaskRunSummary(BaseModel):
+    """执行记录列表的精简视图（`view=summary`），不含日志等大字段"""
+    id: int
+    task_id: int
+    celery_task_id: str
+    status: str
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    duration_seconds: Optional[float] = None
+    items_scraped: Optional[int] = None
+    requests_count: Optional[int] = None
+    exit_code: Optional[int] = None
+    worker_node: Optional[str] = None
+    node_id: Optional[int] = None
+    group_id: Optional[int] = None
+    manually_stopped: bool = False
+
+
 class TaskRunLog(BaseModel):
     id: int
     log_content: str
+    offset: int = 0  # log_content 在完整日志中的起始字节偏移
+    log_size: Optional[int] = None  # 完整日志字节数
 
     class Config:
         from_attributes = True
@@ -55,4 +78,27 @@ class TaskRunExport(BaseModel):
     data: Dict[str, Any]
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class TaskRunGroupCreate(BaseModel):
+    task_id: int
+    run_mode: Optional[str] = None
+    node_count: int = 0
+
+
+class TaskRunGroupOut(BaseModel):
+    id: int
+    task_id: int
+    run_mode: Optional[str] = None
+    node_count: int
+    created_at: Optional[datetime] = None
+    status: str  # 由子记录聚合得出
+    status_counts: Dict[str, int]  # 各状态的子记录数
+    items_scraped: int = 0
+    requests_count: int = 0
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
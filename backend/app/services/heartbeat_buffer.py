@@ -0,0 +1,186 @@
+# /backend/app/services/heartbeat_buffer.py
+
+import datetime
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.core.config import settings
+from app.db.session import engine
+from app.models.node import NodeStatus
+from app.services.node_cache import online_node_cache
+
+logger = logging.getLogger(__name__)
+
+# 节点静态信息：只有发生变化时才需要写入数据库
+STATIC_FIELDS = (
+    "ip_address", "os", "os_version", "python_version", "version",
+    "cpu_cores", "memory_gb", "tags", "max_concurrency",
+    "physical_host_id", "physical_host_name", "container_id", "instance_name",
+)
+
+
+class HeartbeatBuffer:
+    """
+    节点心跳缓冲区
+
+    HTTP 心跳只写入内存，由后台线程每隔 HEARTBEAT_FLUSH_INTERVAL_MS 批量落库：
+    - 新节点或静态信息有变化的节点：一条批量 INSERT ... ON DUPLICATE KEY UPDATE
+    - 静态信息未变化的节点：一条 UPDATE ... WHERE hostname IN (...) 只刷新心跳时间，
+      另一条只命中不在线节点的 UPDATE 用于发现重新上线的节点
+    同一节点在一个周期内的多次心跳会被合并
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # hostname -> 最近一次写入数据库的静态信息
+        self._known_static: Dict[str, Dict[str, Any]] = {}
+
+    def submit(self, hostname: str, **fields: Any) -> None:
+        """接收一次心跳（值为 None 的字段视为未上报，不覆盖已有值）"""
+        with self._lock:
+            entry = self._pending.setdefault(hostname, {})
+            entry.update({k: v for k, v in fields.items() if v is not None})
+            entry["last_heartbeat"] = datetime.datetime.utcnow()
+            pending_count = len(self._pending)
+        if pending_count >= settings.HEARTBEAT_BUFFER_MAX_SIZE:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """把缓冲区中的心跳批量写入数据库，返回处理的节点数"""
+        with self._lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+
+        upserts = []
+        touches = []
+        for hostname, entry in batch.items():
+            static = {k: entry[k] for k in STATIC_FIELDS if k in entry}
+            known = self._known_static.get(hostname)
+            if known is not None and all(known.get(k) == v for k, v in static.items()):
+                touches.append(hostname)
+            else:
+                upserts.append({
+                    "hostname": hostname,
+                    **static,
+                    "status": NodeStatus.ONLINE,
+                    "last_heartbeat": entry["last_heartbeat"],
+                })
+
+        try:
+            revived, touched = self._write(upserts, touches)
+        except OperationalError as e:
+            # 数据库不可用：整批放回缓冲区，下个周期重试
+            logger.error(f"Failed to flush {len(batch)} heartbeats: {e}")
+            self._requeue(batch)
+            return 0
+        except Exception as e:
+            # 多半是个别节点的数据有问题（如标签超长）：逐个节点重试，只丢弃写入失败的节点
+            logger.warning(f"Batched heartbeat flush failed, retrying node by node: {e}")
+            try:
+                upserts, revived, touched = self._write_one_by_one(upserts, touches)
+            except OperationalError as e:
+                logger.error(f"Failed to flush {len(batch)} heartbeats: {e}")
+                self._requeue(batch)
+                return 0
+
+        if upserts or revived:
+            # 有节点注册、静态信息（如标签）变化或重新上线：调度器的在线节点缓存失效
+            online_node_cache.invalidate()
+
+        for row in upserts:
+            known = self._known_static.setdefault(row["hostname"], {})
+            known.update({k: row[k] for k in STATIC_FIELDS if k in row})
+        if touched < len(touches):
+            # 有节点已被删除：下次心跳重新走 upsert 注册
+            for hostname in touches:
+                self._known_static.pop(hostname, None)
+
+        logger.debug(f"Flushed heartbeats: {len(upserts)} upserted, {len(touches)} touched")
+        return len(batch)
+
+    def _write(self, upserts: List[Dict[str, Any]], touches: List[str]) -> Tuple[int, int]:
+        """在一个事务中写入一批心跳，返回 (重新上线的节点数, 刷新了心跳时间的节点数)"""
+        with Session(bind=engine) as db:
+            if upserts:
+                crud.node.bulk_upsert(db, rows=upserts)
+                crud.node.set_tags_by_hostname(db, tags_by_hostname={
+                    row["hostname"]: row["tags"] for row in upserts if "tags" in row
+                })
+            revived = crud.node.revive_many(db, hostnames=touches)
+            touched = crud.node.touch_many(db, hostnames=touches, at=datetime.datetime.utcnow())
+            db.commit()
+        return revived, touched
+
+    def _write_one_by_one(
+        self, upserts: List[Dict[str, Any]], touches: List[str]
+    ) -> Tuple[List[Dict[str, Any]], int, int]:
+        """
+        批量写入失败后的重试：只刷新心跳时间的节点仍为一条语句，需要 upsert 的节点逐个写入；
+        写入失败的节点记录日志后丢弃（不放回缓冲区，避免一行坏数据阻塞之后的每次落库）
+        :return: (写入成功的 upsert 行, 重新上线的节点数, 刷新了心跳时间的节点数)
+        """
+        revived, touched = self._write([], touches)
+        written = []
+        for row in upserts:
+            try:
+                self._write([row], [])
+            except OperationalError:
+                raise
+            except Exception as e:
+                logger.error(f"Dropped heartbeat of node {row['hostname']}: {e}")
+                self._known_static.pop(row["hostname"], None)
+                continue
+            written.append(row)
+        return written, revived, touched
+
+    def _requeue(self, batch: Dict[str, Dict[str, Any]]) -> None:
+        """写库失败时放回缓冲区，不覆盖期间收到的更新的心跳"""
+        with self._lock:
+            for hostname, entry in batch.items():
+                newer = self._pending.get(hostname)
+                if newer is None:
+                    self._pending[hostname] = entry
+                else:
+                    self._pending[hostname] = {**entry, **newer}
+
+    def _run(self):
+        interval = settings.HEARTBEAT_FLUSH_INTERVAL_MS / 1000
+        while not self._stopping.is_set():
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Heartbeat flusher error: {e}")
+
+    def start(self):
+        """启动后台批量写入线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="heartbeat-flusher", daemon=True)
+        self._thread.start()
+        logger.info("✅ Heartbeat buffer started.")
+
+    def shutdown(self):
+        """停止后台线程并写入剩余心跳"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self.flush()
+        logger.info("🛑 Heartbeat buffer flushed and stopped.")
+
+
+# 创建全局实例
+heartbeat_buffer = HeartbeatBuffer()
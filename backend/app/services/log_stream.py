@@ -0,0 +1,149 @@
+# /backend/app/services/log_stream.py
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.utils.log_store import LogStoreReader
+
+
+def format_sse(data: str, *, event: Optional[str] = None, event_id: Optional[int] = None) -> str:
+    """按 Server-Sent Events 格式编码一条消息（多行数据拆成多个 data 字段）"""
+    parts = []
+    if event_id is not None:
+        parts.append(f"id: {event_id}")
+    if event:
+        parts.append(f"event: {event}")
+    for line in data.split("\n"):
+        parts.append(f"data: {line}")
+    return "\n".join(parts) + "\n\n"
+
+
+async def single_log_event(content: str) -> AsyncIterator[str]:
+    """日志文件已不存在时，一次性推送数据库中的日志快照并结束"""
+    if content:
+        yield format_sse(content, event_id=len(content.encode("utf-8")))
+    yield format_sse("finished", event="end")
+
+
+async def stored_log_events(store_path: str, *, offset: int = 0) -> AsyncIterator[str]:
+    """
+    从日志存储中的压缩归档推送 offset 之后的内容并结束
+    逐块解压（只解压 offset 之后涉及的块），每个事件只包含完整的行，事件 id 为字节偏移量
+    """
+    reader = await run_in_threadpool(LogStoreReader, store_path)
+    try:
+        chunks = reader.iter_range(offset)
+        pending = b""
+        while True:
+            chunk = await run_in_threadpool(next, chunks, None)
+            if chunk is None:
+                break
+            data = pending + chunk
+            cut = data.rfind(b"\n")
+            if cut == -1:
+                pending = data
+                continue
+            payload, pending = data[:cut + 1], data[cut + 1:]
+            offset += len(payload)
+            yield format_sse(payload.decode("utf-8", errors="replace").rstrip("\n"), event_id=offset)
+        if pending:
+            offset += len(pending)
+            yield format_sse(pending.decode("utf-8", errors="replace"), event_id=offset)
+    finally:
+        reader.close()
+    yield format_sse("finished", event="end")
+
+
+async def follow_run_log(
+    log_file: str,
+    *,
+    offset: int = 0,
+    is_finished: Callable[[], Awaitable[bool]],
+    fallback: Optional[Callable[[int], AsyncIterator[str]]] = None,
+    poll_interval: Optional[float] = None,
+    chunk_size: Optional[int] = None,
+    idle_timeout: Optional[float] = None,
+    status_check_interval: Optional[float] = None,
+) -> AsyncIterator[str]:
+    """
+    基于字节偏移量跟踪一个正在写入的日志文件，以 SSE 事件的形式推送新增内容
+
+    - 每个订阅者只持有自己的文件句柄和偏移量，只读取新增字节，不会重读整个文件
+    - 只推送完整的行，未写完的半行留到下一次读取
+    - 事件 id 为已推送的字节偏移量，客户端可通过 Last-Event-ID / offset 断点续传
+    - 文件无新增内容时才通过 is_finished 检查任务是否结束，且有频率限制
+    - 任务结束时原始文件已不存在（已归档）：交给 fallback(offset) 继续推送
+    """
+    poll_interval = poll_interval or settings.LOG_STREAM_POLL_INTERVAL
+    chunk_size = chunk_size or settings.LOG_STREAM_CHUNK_SIZE
+    idle_timeout = idle_timeout or settings.LOG_STREAM_IDLE_TIMEOUT
+    status_check_interval = status_check_interval or settings.LOG_STREAM_STATUS_CHECK_INTERVAL
+
+    loop = asyncio.get_running_loop()
+    log_f = None
+    pending = b""
+    last_activity = loop.time()
+    last_status_check = 0.0
+    finished = False
+
+    try:
+        while True:
+            if log_f is None:
+                try:
+                    log_f = open(log_file, "rb")
+                except FileNotFoundError:
+                    log_f = None
+
+            chunk = b""
+            if log_f is not None:
+                log_f.seek(offset + len(pending))
+                chunk = log_f.read(chunk_size)
+
+            if chunk:
+                last_activity = loop.time()
+                data = pending + chunk
+                cut = data.rfind(b"\n")
+                if cut == -1 and len(data) < chunk_size:
+                    # 半行：等待换行符写入
+                    pending = data
+                    continue
+                if cut == -1:
+                    cut = len(data) - 1
+                payload, pending = data[:cut + 1], data[cut + 1:]
+                offset += len(payload)
+                text = payload.decode("utf-8", errors="replace").rstrip("\n")
+                yield format_sse(text, event_id=offset)
+                continue
+
+            if finished and log_f is None and fallback is not None:
+                # 原始日志已被 Worker 归档删除：从归档中继续
+                async for event in fallback(offset):
+                    yield event
+                return
+
+            if finished:
+                # 任务已结束且文件已读完：推送残留的半行后结束
+                if pending:
+                    offset += len(pending)
+                    yield format_sse(pending.decode("utf-8", errors="replace"), event_id=offset)
+                yield format_sse("finished", event="end")
+                return
+
+            now = loop.time()
+            if now - last_status_check >= status_check_interval:
+                last_status_check = now
+                if await is_finished():
+                    # 再读一轮，确保把进程退出前写入的内容推送完
+                    finished = True
+                    continue
+
+            if now - last_activity >= idle_timeout:
+                yield format_sse("idle timeout", event="end")
+                return
+
+            await asyncio.sleep(poll_interval)
+    finally:
+        if log_f is not None:
+            log_f.close()
@@ -0,0 +1,84 @@
+# /backend/app/services/node_cache.py
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.models.node import Node, NodeStatus
+
+
+@dataclass(frozen=True)
+class NodeSnapshot:
+    """
+    调度用的节点快照（与数据库会话无关，可以在线程 / 请求之间共享）
+    只包含选择目标节点和投递队列需要的字段
+    """
+    id: int
+    hostname: str
+    status: NodeStatus
+    tags: Optional[str]
+    max_concurrency: int
+    current_concurrency: int
+    cpu_usage: Optional[float]
+    memory_gb: Optional[float]
+    memory_usage: Optional[float]
+
+    @classmethod
+    def from_node(cls, node: Node) -> "NodeSnapshot":
+        return cls(
+            id=node.id,
+            hostname=node.hostname,
+            status=node.status,
+            tags=node.tags,
+            max_concurrency=node.max_concurrency,
+            current_concurrency=node.current_concurrency,
+            cpu_usage=node.cpu_usage,
+            memory_gb=node.memory_gb,
+            memory_usage=node.memory_usage,
+        )
+
+
+class OnlineNodeCache:
+    """
+    在线节点集合的进程内缓存
+
+    按分发模式 / 标签 / 节点 ID 缓存候选节点快照，整点大量定时任务同时触发时只查询一次数据库。
+    - 每个条目最多缓存 NODE_CACHE_TTL_SECONDS 秒（负载指标本身也只按巡检周期刷新）
+    - 节点上线 / 离线、注册、修改、删除以及心跳巡检同步负载后整体失效
+    - 只在本进程内失效；其他进程最迟在 TTL 到期后看到变化
+    """
+
+    def __init__(self):
+        self._entries: Dict[Hashable, Tuple[float, List[NodeSnapshot]]] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], List[Node]]) -> List[NodeSnapshot]:
+        """命中且未过期时直接返回快照，否则调用 loader 查询数据库并缓存"""
+        ttl = settings.NODE_CACHE_TTL_SECONDS
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+            generation = self._generation
+
+        nodes = [NodeSnapshot.from_node(node) for node in loader()]
+        if ttl > 0:
+            with self._lock:
+                # 查询期间发生过失效：结果可能已过时，不写入缓存
+                if generation == self._generation:
+                    self._entries[key] = (now + ttl, nodes)
+        return nodes
+
+    def invalidate(self) -> None:
+        """节点状态发生变化时清空全部条目"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+# 创建全局实例
+online_node_cache = OnlineNodeCache()
@@ -0,0 +1,101 @@
+# /backend/app/services/placement.py
+
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.models.task import Task
+from app.utils.tools import parse_tags
+
+
+class PlacementEngine:
+    """
+    负载感知的节点选择
+
+    在候选节点中优先选择：空闲槽位多、近期 CPU / 内存占用低、标签匹配度高的节点。
+    节点负载数据来自心跳巡检写入的 Node.cpu_usage / memory_usage / current_concurrency。
+    两次巡检之间投递到节点的任务还没有体现在 current_concurrency 中，
+    由进程内的预留计数（node.id -> 任务数）补上，下一次巡检同步负载后清零。
+    """
+
+    # 打分权重：空闲槽位比例最重要，其次是 CPU 和内存压力，标签匹配作为加分项
+    SLOT_WEIGHT = 1.0
+    CPU_WEIGHT = 0.5
+    MEMORY_WEIGHT = 0.3
+    TAG_WEIGHT = 0.2
+
+    def __init__(self):
+        self._reserved: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def free_slots(self, node, reserved: int = 0) -> int:
+        """节点剩余可用槽位"""
+        max_concurrency = node.max_concurrency or 0
+        running = (node.current_concurrency or 0) + reserved
+        return max(max_concurrency - running, 0)
+
+    def score(self, node, wanted_tags: Set[str], reserved: int = 0) -> float:
+        """节点得分，越高越优先"""
+        max_concurrency = node.max_concurrency or 0
+        slot_ratio = self.free_slots(node, reserved) / max_concurrency if max_concurrency else 0.0
+        cpu_ratio = min((node.cpu_usage or 0.0) / 100, 1.0)
+        if node.memory_gb and node.memory_usage is not None:
+            memory_ratio = min(node.memory_usage / node.memory_gb, 1.0)
+        else:
+            memory_ratio = 0.0
+        tag_ratio = len(wanted_tags & parse_tags(node.tags)) / len(wanted_tags) if wanted_tags else 0.0
+        return (
+            self.SLOT_WEIGHT * slot_ratio
+            - self.CPU_WEIGHT * cpu_ratio
+            - self.MEMORY_WEIGHT * memory_ratio
+            + self.TAG_WEIGHT * tag_ratio
+        )
+
+    def rank(self, nodes: Iterable, task: Task, reserved: Optional[Dict[int, int]] = None) -> List:
+        """
+        按得分从高到低排序候选节点
+        有空闲槽位的节点总是排在已满的节点之前
+        :param reserved: 本轮调度中已分配给各节点（node.id）的任务数，尚未体现在 current_concurrency 中
+        """
+        reserved = reserved or {}
+        wanted_tags = parse_tags(task.target_node_tags)
+
+        def sort_key(node):
+            taken = reserved.get(node.id, 0)
+            return (self.free_slots(node, taken) > 0, self.score(node, wanted_tags, taken))
+
+        return sorted(nodes, key=sort_key, reverse=True)
+
+    def pick(self, nodes: Iterable, task: Task, reserved: Optional[Dict[int, int]] = None):
+        """选出最合适的一个节点；没有候选节点时返回 None"""
+        ranked = self.rank(nodes, task, reserved)
+        return ranked[0] if ranked else None
+
+    def reserve(self, nodes: Iterable, task: Task, *, allow_full: bool = True):
+        """
+        选出最合适的节点并为其预留一个槽位（选择和预留在同一把锁内，并发调度不会选中同一个空闲槽位）
+        :param allow_full: 候选节点全部满载时是否仍选择其中最合适的一个；为 False 时返回 None
+        :return: 选中的节点；没有候选节点时返回 None
+        """
+        with self._lock:
+            node = self.pick(nodes, task, self._reserved)
+            if node is None:
+                return None
+            taken = self._reserved.get(node.id, 0)
+            if not allow_full and self.free_slots(node, taken) <= 0:
+                return None
+            self._reserved[node.id] = taken + 1
+            return node
+
+    def reservations(self) -> Dict[int, int]:
+        """当前各节点的预留任务数（副本）"""
+        with self._lock:
+            return dict(self._reserved)
+
+    def clear_reservations(self) -> None:
+        """心跳巡检同步了节点负载后清空预留计数"""
+        with self._lock:
+            self._reserved.clear()
+
+
+# 创建全局实例
+placement_engine = PlacementEngine()
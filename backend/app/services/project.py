@@ -1,4 +1,5 @@
 # /backend/app/services/project.py
+import logging
 import os
 import shutil
 import subprocess
@@ -8,10 +9,15 @@ from app.models.project import Project
 from app.schemas.project import ProjectCreate, ProjectUpdate
 from sqlalchemy.orm import Session
 from app import crud
+from app.core.celery_app import node_queue_name
+from app.utils.bundle import build_bundle
+from app.utils.delta import ensure_manifest, prune_bundles
 import tempfile
 import zipfile
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
 
 class ProjectService:
     def __init__(self):
@@ -37,6 +43,7 @@ class ProjectService:
         db.commit()
         db.refresh(project)
         
+        self._try_update_bundle(db, project)
         return project
 
     def create_project_from_git(self, db: Session, project_in: ProjectCreate, git_url: str, 
@@ -64,8 +71,6 @@ class ProjectService:
             db.add(project)
             db.commit()
             db.refresh(project)
-            
-            return project
         except Exception as e:
             # 清理失败的项目目录
             if os.path.exists(project_dir):
@@ -75,6 +80,52 @@ class ProjectService:
             db.commit()
             raise e
 
+        self._try_update_bundle(db, project)
+        return project
+
+    def update_bundle(self, db: Session, project: Project):
+        """
+        把项目目录打包为部署包，内容有变化时记录新的 bundle_hash
+        Worker 按哈希拉取并缓存部署包，哈希不变的项目不会重复传输；
+        同时生成增量传输用的清单，已缓存旧版本的 Worker 只拉取变化的文件和块
+        """
+        project_dir = os.path.join(self.projects_dir, project.name)
+        bundle = build_bundle(project_dir, settings.BUNDLES_DIR)
+        ensure_manifest(
+            settings.BUNDLES_DIR, bundle.hash, project=project.name,
+            block_size=settings.BUNDLE_DELTA_BLOCK_SIZE, min_file_size=settings.BUNDLE_DELTA_MIN_FILE_SIZE
+        )
+        if project.bundle_hash != bundle.hash:
+            project.bundle_hash = bundle.hash
+            db.add(project)
+            db.commit()
+            db.refresh(project)
+        self._try_prune_bundles(db, project.name, keep=settings.BUNDLE_KEEP_PER_PROJECT)
+        return bundle
+
+    def remove_bundles(self, db: Session, project: Project):
+        """删除项目的部署包（其他项目当前使用的相同内容的包除外）；项目记录删除后调用"""
+        self._try_prune_bundles(db, project.name, keep=0)
+
+    def _try_prune_bundles(self, db: Session, project_name: str, keep: int):
+        """清理项目较早的部署包；失败只记录日志（下次打包时会再次清理）"""
+        try:
+            removed = prune_bundles(
+                settings.BUNDLES_DIR, project_name, keep=keep, protected=crud.project.get_bundle_hashes(db)
+            )
+        except Exception as e:
+            logger.warning(f"Failed to prune bundles of project {project_name}: {e}")
+            return
+        if removed:
+            logger.info(f"Removed {len(removed)} old bundle(s) of project {project_name}")
+
+    def _try_update_bundle(self, db: Session, project: Project):
+        """创建项目后打包；失败不影响项目创建，任务会回退到读取 PROJECTS_DIR"""
+        try:
+            self.update_bundle(db, project)
+        except Exception as e:
+            logger.warning(f"Failed to build bundle for project {project.name}: {e}")
+
     def _save_uploaded_files(self, project_dir: str, files, deploy_method: str):
         """保存上传的文件"""
         if deploy_method == "zip":
@@ -153,24 +204,20 @@ class ProjectService:
             if os.path.exists(key_file_path):
                 os.remove(key_file_path)
 
-    def sync_project_to_nodes(self, project_name: str, node_hostnames: list):
+    def sync_project_to_nodes(self, db: Session, project: Project, node_hostnames: list) -> dict:
         """
-        将项目文件同步到指定节点
-        这是一个示例方法，实际实现可以根据具体需求调整
+        将项目同步到指定节点
+        重新打包项目（内容变化时更新 bundle_hash），再通知各节点预拉取部署包；
+        节点已缓存同一哈希时不会重复传输，缓存了旧版本时只拉取变化的文件和块
         """
-        project_dir = os.path.join(self.projects_dir, project_name)
-        if not os.path.exists(project_dir):
-            raise FileNotFoundError(f"Project directory not found: {project_dir}")
-        
-        # 这里可以实现具体的文件同步逻辑
-        # 例如使用rsync、scp或其他文件同步机制
-        # 为了简化，这里只是示例
+        from app.tasks.crawler_tasks import prefetch_bundle
+
+        bundle = self.update_bundle(db, project)
         for hostname in node_hostnames:
-            print(f"Syncing project {project_name} to node {hostname}")
-            # 实际实现可能如下：
-            # subprocess.run(["rsync", "-avz", project_dir, f"{hostname}:{project_dir}"])
-        
-        return True
+            prefetch_bundle.apply_async(args=[bundle.hash], queue=node_queue_name(hostname))
+            logger.info(f"Requested node {hostname} to prefetch bundle {bundle.hash[:12]} of project {project.name}")
+
+        return {"bundle_hash": bundle.hash, "size": bundle.size, "nodes": list(node_hostnames)}
 
     def get_project_files(self, project_name: str):
         """获取项目文件列表"""
@@ -2,23 +2,42 @@
 
 import threading
 import logging
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Optional, List
 
 import redis
+from celery import group as celery_group
+from celery.utils import uuid
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.jobstores.base import JobLookupError
 from sqlalchemy.orm import Session
 
-from app import crud
+from app import crud, schemas
+from app.core.celery_app import DEFAULT_QUEUE, node_queue_name, tag_queue_name
 from app.core.config import settings
 from app.db.session import engine  # 使用 engine，非 SessionLocal
 from app.tasks.crawler_tasks import run_generic_script  # ✅ 通用任务
-from app.models.task import Task, TaskDistributionMode
+from app.models.task import TagMatchMode, Task, TaskDistributionMode
 from app.models.node import NodeStatus
+from app.services.heartbeat_buffer import heartbeat_buffer
+from app.services.node_cache import NodeSnapshot, online_node_cache
+from app.services.placement import placement_engine
+from app.utils.tools import parse_tags
 
 logger = logging.getLogger(__name__)
 
+# 需要在每个目标节点上各执行一次的分发模式
+FAN_OUT_MODES = (TaskDistributionMode.MULTIPLE, TaskDistributionMode.TAG_BASED)
+
+
+@dataclass
+class DispatchResult:
+    """一次调度提交的结果"""
+    celery_task_ids: List[str]
+    run_ids: List[int] = field(default_factory=list)  # 调度时创建的 TaskRun ID，与 celery_task_ids 一一对应
+    group_id: Optional[int] = None  # 扇出执行时的 TaskRunGroup ID
+
 
 class SchedulerService:
     def __init__(self):
@@ -41,79 +60,146 @@ class SchedulerService:
                 logger.warning(f"Task {task_id} not found or disabled, skipping.")
                 return
 
-            project_name = db_task.project.name
-            entrypoint = db_task.entrypoint or "run.py"  # ✅ 支持 entrypoint
-            args = db_task.args or {}
-            env = {"RUN_MODE": "scheduled"}
-
-            # 根据任务分发模式确定目标节点
-            target_nodes = self._get_target_nodes(db, db_task)
-            
-            if not target_nodes:
+            dispatched = self.dispatch(db, db_task, run_mode="scheduled")
+            if not dispatched.celery_task_ids:
                 logger.warning(f"No target nodes available for task {task_id}, skipping.")
                 return
-
-            # 如果有多个目标节点，可以分发到多个节点并行执行
-            # 这里简化处理，只分发到第一个可用节点
-            # 在实际实现中，可以根据需求进行更复杂的分发策略
-            for node in target_nodes:
-                # 提交通用任务
-                run_generic_script.delay(
-                    original_task_id=db_task.id,
-                    project_name=project_name,
-                    entrypoint=entrypoint,
-                    args=args,
-                    env=env
-                )
-                logger.info(f"Scheduled task {task_id} via Celery to node {node.hostname}")
-                break  # 只分发到一个节点，如果需要分发到多个节点，可以移除这个break
+            logger.info(f"Scheduled task {task_id} via Celery: {len(dispatched.celery_task_ids)} run(s)")
         except Exception as e:
             logger.error(f"Error in _schedule_job for task {task_id}: {e}")
         finally:
             db.close()
 
-    def _get_target_nodes(self, db: Session, task: Task) -> List:
+    def dispatch(self, db: Session, db_task: Task, run_mode: str) -> "DispatchResult":
+        """
+        按任务的分发模式提交到 Celery
+        - MULTIPLE / TAG_BASED：扇出到每个在线目标节点各执行一次，并创建 TaskRunGroup 汇总子执行状态
+        - ANY / SPECIFIC：选择一个队列执行一次
+        投递前预先生成 Celery 任务 ID 并创建 PENDING 执行记录，Worker 只按 celery_task_id 更新这条记录
+        没有可用的目标时返回空结果
+        """
+        target_nodes = self._get_target_nodes(db, db_task)
+        kwargs = {
+            "original_task_id": db_task.id,
+            "project_name": db_task.project.name,
+            "entrypoint": db_task.entrypoint or "run.py",  # ✅ 支持 entrypoint
+            "args": db_task.args or {},
+            "env": {"RUN_MODE": run_mode}
+        }
+        if db_task.project.bundle_hash:
+            kwargs["bundle_hash"] = db_task.project.bundle_hash
+
+        if db_task.distribution_mode in FAN_OUT_MODES:
+            return self._fan_out(db, db_task, target_nodes, kwargs, run_mode)
+
+        queue = self._select_queue(db_task, target_nodes)
+        if queue is None:
+            return DispatchResult(celery_task_ids=[])
+        celery_task_id = uuid()
+        run_ids = crud.task_run.create_pending(db, task_id=db_task.id, celery_task_ids=[celery_task_id])
+        try:
+            run_generic_script.apply_async(
+                kwargs={**kwargs, "run_id": run_ids[0]}, queue=queue, task_id=celery_task_id
+            )
+        except Exception:
+            crud.task_run.remove_unstarted(db, ids=run_ids)
+            raise
+        logger.info(f"Dispatched task {db_task.id} to queue {queue}")
+        return DispatchResult(celery_task_ids=[celery_task_id], run_ids=run_ids)
+
+    def _fan_out(self, db: Session, db_task: Task, target_nodes: List, kwargs: dict, run_mode: str) -> "DispatchResult":
+        """在每个目标节点的专属队列上各投递一次，通过 Celery group 一次性发布"""
+        if not target_nodes:
+            return DispatchResult(celery_task_ids=[])
+
+        run_group = crud.task_run_group.create(db, obj_in=schemas.TaskRunGroupCreate(
+            task_id=db_task.id,
+            run_mode=run_mode,
+            node_count=len(target_nodes)
+        ))
+        celery_task_ids = [uuid() for _ in target_nodes]
+        run_ids = crud.task_run.create_pending(
+            db, task_id=db_task.id, celery_task_ids=celery_task_ids, group_id=run_group.id
+        )
+        signatures = [
+            run_generic_script.signature(
+                kwargs={**kwargs, "run_group_id": run_group.id, "run_id": run_id}
+            ).set(queue=node_queue_name(node.hostname), task_id=celery_task_id)
+            for node, celery_task_id, run_id in zip(target_nodes, celery_task_ids, run_ids)
+        ]
+        try:
+            celery_group(signatures).apply_async()
+        except Exception:
+            crud.task_run.remove_unstarted(db, ids=run_ids)
+            crud.task_run_group.remove(db, id=run_group.id)
+            raise
+        logger.info(f"Fanned out task {db_task.id} to {len(target_nodes)} nodes (group {run_group.id})")
+        return DispatchResult(celery_task_ids=celery_task_ids, run_ids=run_ids, group_id=run_group.id)
+
+    def _select_queue(self, task: Task, target_nodes: List) -> Optional[str]:
+        """
+        根据分发模式确定投递队列
+        - SPECIFIC：目标节点的专属队列
+        - MULTIPLE / TAG_BASED / ANY：按空闲槽位、CPU / 内存负载和标签匹配度选择节点，投递到其专属队列
+        - 候选节点全部满载时，TAG_BASED（单标签）退回到标签队列、ANY 退回到默认队列，
+          由第一个空闲的 Worker 领取，而不是继续堆积在某个节点上
         """
-        根据任务的分发模式获取目标节点列表
+        mode = task.distribution_mode
+        if mode == TaskDistributionMode.SPECIFIC:
+            return node_queue_name(target_nodes[0].hostname) if target_nodes else None
+
+        fallback_queue = None
+        if mode == TaskDistributionMode.TAG_BASED:
+            tags = parse_tags(task.target_node_tags)
+            if len(tags) == 1:
+                fallback_queue = tag_queue_name(tags.pop())
+        elif mode == TaskDistributionMode.ANY:
+            fallback_queue = DEFAULT_QUEUE
+
+        # 选中的节点预留一个槽位，直到下一次心跳巡检同步负载，避免两次巡检之间的调度都挤到同一个节点
+        node = placement_engine.reserve(target_nodes, task, allow_full=fallback_queue is None)
+        if node is not None:
+            return node_queue_name(node.hostname)
+        return fallback_queue
+
+    def _get_target_nodes(self, db: Session, task: Task) -> List[NodeSnapshot]:
         """
-        if task.distribution_mode == TaskDistributionMode.ANY:
-            # 任意节点模式，返回所有在线节点
-            stmt = crud.node.select().where(crud.node.model.status == NodeStatus.ONLINE)
-            result = db.execute(stmt)
-            return list(result.scalars().all())
-        elif task.distribution_mode == TaskDistributionMode.SPECIFIC:
+        根据任务的分发模式获取目标节点列表（在线节点快照）
+        结果经 online_node_cache 缓存，同一时刻触发的多个任务共用一次查询
+        """
+        mode = task.distribution_mode
+        if mode == TaskDistributionMode.SPECIFIC:
             # 指定单个节点模式
-            if task.target_node_id:
-                node = crud.node.get(db, id=task.target_node_id)
-                if node and node.status == NodeStatus.ONLINE:
-                    return [node]
-            return []
-        elif task.distribution_mode == TaskDistributionMode.MULTIPLE:
-            # 指定多个节点模式
-            if task.target_node_ids:
-                nodes = []
-                for node_id in task.target_node_ids:
-                    node = crud.node.get(db, id=node_id)
-                    if node and node.status == NodeStatus.ONLINE:
-                        nodes.append(node)
-                return nodes
-            return []
-        elif task.distribution_mode == TaskDistributionMode.TAG_BASED:
-            # 基于标签分发模式
-            if task.target_node_tags:
-                # 这里简化处理，实际实现中可以根据标签进行更复杂的匹配
-                stmt = crud.node.select().where(
-                    crud.node.model.status == NodeStatus.ONLINE,
-                    crud.node.model.tags.contains(task.target_node_tags)
-                )
-                result = db.execute(stmt)
-                return list(result.scalars().all())
-            return []
-        else:
-            # 默认返回所有在线节点
-            stmt = crud.node.select().where(crud.node.model.status == NodeStatus.ONLINE)
-            result = db.execute(stmt)
-            return list(result.scalars().all())
+            if not task.target_node_id:
+                return []
+            return online_node_cache.get_or_load(
+                (mode, task.target_node_id),
+                lambda: crud.node.get_online_by_ids(db, ids=[task.target_node_id])
+            )
+        elif mode == TaskDistributionMode.MULTIPLE:
+            # 指定多个节点模式：一条 IN 查询
+            if not task.target_node_ids:
+                return []
+            node_ids = tuple(dict.fromkeys(task.target_node_ids))
+            return online_node_cache.get_or_load(
+                (mode, node_ids),
+                lambda: crud.node.get_online_by_ids(db, ids=node_ids)
+            )
+        elif mode == TaskDistributionMode.TAG_BASED:
+            # 基于标签分发模式：通过 cp_node_tags 索引匹配（ANY 任意一个 / ALL 全部标签）
+            if not task.target_node_tags:
+                return []
+            tags = frozenset(parse_tags(task.target_node_tags))
+            match_all = task.target_tag_match != TagMatchMode.ANY
+            return online_node_cache.get_or_load(
+                (mode, tags, match_all),
+                lambda: crud.node.get_online_by_tags(db, tags=tags, match_all=match_all)
+            )
+        # 任意节点模式（及默认）：所有在线节点
+        return online_node_cache.get_or_load(
+            (TaskDistributionMode.ANY,),
+            lambda: crud.node.get_online(db)
+        )
 
     def add_task(self, db_task: Task):
         """将数据库任务添加到调度器"""
@@ -178,31 +264,71 @@ class SchedulerService:
                     self.add_task(task)
 
     def _check_node_heartbeats(self):
-        """定期检查节点心跳"""
+        """
+        定期检查节点心跳，同步节点负载
+
+        无论节点数量多少，每轮巡检的往返次数固定：
+        一次 SELECT 取全部节点状态，一个 pipeline 取全部心跳键和负载指标，
+        最多两条批量 UPDATE（上线 / 离线）、一条 executemany 负载更新和一次提交
+        """
         logger.debug("🔍 Checking node heartbeats...")
         try:
             with self._get_db() as db:
-                all_nodes = crud.node.get_multi(db)
-                updated = False
-                for node in all_nodes:
-                    heartbeat_key = f"nodes:heartbeat:{node.hostname}"
-                    try:
-                        if self.redis_client.exists(heartbeat_key):
-                            if node.status != NodeStatus.ONLINE:
-                                crud.node.heartbeat(db, hostname=node.hostname)
-                                logger.info(f"Node {node.hostname} is ONLINE")
-                        else:
-                            if node.status != NodeStatus.OFFLINE:
-                                crud.node.mark_offline(db, hostname=node.hostname)
-                                logger.info(f"Node {node.hostname} marked OFFLINE")
-                                updated = True
-                    except Exception as e:
-                        logger.warning(f"Failed to check heartbeat for {node.hostname}: {e}")
-                if updated:
-                    db.commit()
+                snapshot = crud.node.get_status_snapshot(db)
+                if not snapshot:
+                    return
+
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.mget([f"nodes:heartbeat:{hostname}" for hostname, _ in snapshot])
+                for hostname, _ in snapshot:
+                    pipe.hgetall(f"nodes:metrics:{hostname}")
+                results = pipe.execute()
+                alive_flags, metrics_list = results[0], results[1:]
+
+                to_online = []
+                to_offline = []
+                metrics_rows = []
+                for (hostname, status), alive, metrics in zip(snapshot, alive_flags, metrics_list):
+                    if alive is not None and status != NodeStatus.ONLINE:
+                        to_online.append(hostname)
+                    elif alive is None and status != NodeStatus.OFFLINE:
+                        to_offline.append(hostname)
+                    if alive is not None and metrics:
+                        metrics_rows.append(self._parse_node_metrics(hostname, metrics))
+
+                crud.node.mark_online_many(db, hostnames=to_online)
+                crud.node.mark_offline_many(db, hostnames=to_offline)
+                crud.node.update_metrics_many(db, metrics=metrics_rows)
+                db.commit()
+                if to_online or to_offline or metrics_rows:
+                    # 节点快照中的负载已过时；新负载已包含之前预留的任务，预留计数清零
+                    online_node_cache.invalidate()
+                    placement_engine.clear_reservations()
+
+                if to_online:
+                    logger.info(f"Nodes ONLINE: {', '.join(to_online)}")
+                if to_offline:
+                    logger.info(f"Nodes marked OFFLINE: {', '.join(to_offline)}")
         except Exception as e:
             logger.error(f"Error in _check_node_heartbeats: {e}")
 
+    @staticmethod
+    def _parse_node_metrics(hostname: str, metrics: dict) -> dict:
+        """解析 Worker 上报的 nodes:metrics:<hostname> 哈希"""
+        def to_float(value):
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return None
+
+        running = to_float(metrics.get("running"))
+        return {
+            "hostname": hostname,
+            "cpu_usage": to_float(metrics.get("cpu_usage")),
+            "memory_usage": to_float(metrics.get("memory_usage")),
+            "current_concurrency": int(running) if running is not None else 0,
+        }
+
     def _listen_for_node_registrations(self):
         """监听 Redis 发布/订阅，实时注册节点"""
         try:
@@ -214,8 +340,7 @@ class SchedulerService:
                     try:
                         hostname = message['data']
                         logger.info(f"Registering new node: {hostname}")
-                        with self._get_db() as db:
-                            crud.node.register_or_update(db, hostname=hostname)
+                        heartbeat_buffer.submit(hostname)
                     except Exception as e:
                         logger.error(f"Failed to register node: {e}")
         except Exception as e:
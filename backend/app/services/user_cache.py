@@ -0,0 +1,156 @@
+# /backend/app/services/user_cache.py
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.config import settings
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "user_cache:"
+# 不缓存的列：密码哈希不写入进程内缓存和共享的 Redis；merge 后该属性保持未加载，需要时按需从数据库加载
+EXCLUDED_COLUMNS = frozenset({"hashed_password"})
+
+
+class UserCache:
+    """
+    已认证用户的缓存（按用户名）
+
+    每个请求都要根据 JWT 中的用户名查询一次用户；仪表盘每 2 秒轮询多个接口时，这条 SELECT 是最频繁的查询。
+    - 进程内 LRU，最多 USER_CACHE_MAX_SIZE 个用户，每个最多缓存 USER_CACHE_TTL_SECONDS 秒
+    - 可选的 Redis 二级缓存（USER_CACHE_REDIS_ENABLED），进程重启或新进程不必回源数据库
+    - 缓存的是列值字典而不是 ORM 对象；命中后构造一个新对象，由调用方 merge(load=False) 到请求会话，不发出 SQL
+    - 启用 / 禁用、授予 / 撤销超级权限、修改、删除用户时失效（本进程 + Redis）；
+      其他进程的进程内条目最迟在 TTL 到期后失效
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.USER_CACHE_TTL_SECONDS > 0
+
+    def get(self, username: str) -> Optional[User]:
+        """命中时返回一个游离（detached）状态的新 User 对象，未命中返回 None"""
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(username)
+                    return self._build(entry[1])
+                del self._entries[username]
+            generation = self._generation
+
+        values = self._redis_get(username)
+        if values is None:
+            return None
+        self._store(username, values, generation)
+        return self._build(values)
+
+    def generation(self) -> int:
+        """回源数据库前记录当前代数，写入时据此丢弃查询期间已失效的结果"""
+        with self._lock:
+            return self._generation
+
+    def put(self, user: User, generation: int) -> None:
+        """缓存从数据库加载的用户"""
+        if not self.enabled:
+            return
+        state = inspect(user)
+        values = {
+            attr.key: state.dict[attr.key]
+            for attr in state.mapper.column_attrs
+            if attr.key in state.dict and attr.key not in EXCLUDED_COLUMNS
+        }
+        if self._store(user.username, values, generation):
+            self._redis_set(user.username, values)
+
+    def invalidate(self, username: str) -> None:
+        """用户信息发生变化时删除本进程和 Redis 中的条目"""
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(username, None)
+        self._redis_delete(username)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def _store(self, username: str, values: Dict[str, Any], generation: int) -> bool:
+        with self._lock:
+            # 加载期间发生过失效：结果可能已过时，不写入缓存
+            if generation != self._generation:
+                return False
+            self._entries[username] = (time.monotonic() + settings.USER_CACHE_TTL_SECONDS, values)
+            self._entries.move_to_end(username)
+            while len(self._entries) > settings.USER_CACHE_MAX_SIZE:
+                self._entries.popitem(last=False)
+            return True
+
+    @staticmethod
+    def _build(values: Dict[str, Any]) -> User:
+        user = User(**values)
+        make_transient_to_detached(user)
+        return user
+
+    # --- Redis 二级缓存（失败时退回数据库，不影响认证）---
+
+    def _redis_get(self, username: str) -> Optional[Dict[str, Any]]:
+        if not settings.USER_CACHE_REDIS_ENABLED:
+            return None
+        try:
+            from app.core.redis_client import get_redis
+            raw = get_redis().get(REDIS_KEY_PREFIX + username)
+        except Exception as e:
+            logger.warning(f"Failed to read user cache from Redis: {e}")
+            return None
+        if not raw:
+            return None
+        values = json.loads(raw)
+        for key in EXCLUDED_COLUMNS:
+            values.pop(key, None)  # 旧版本写入的条目
+        if values.get("created_at"):
+            values["created_at"] = datetime.fromisoformat(values["created_at"])
+        return values
+
+    def _redis_set(self, username: str, values: Dict[str, Any]) -> None:
+        if not settings.USER_CACHE_REDIS_ENABLED:
+            return
+        try:
+            from app.core.redis_client import get_redis
+            get_redis().set(
+                REDIS_KEY_PREFIX + username,
+                json.dumps(values, default=lambda v: v.isoformat()),
+                ex=max(1, int(settings.USER_CACHE_TTL_SECONDS)),
+            )
+        except Exception as e:
+            logger.warning(f"Failed to write user cache to Redis: {e}")
+
+    def _redis_delete(self, username: str) -> None:
+        if not settings.USER_CACHE_REDIS_ENABLED:
+            return
+        try:
+            from app.core.redis_client import get_redis
+            get_redis().delete(REDIS_KEY_PREFIX + username)
+        except Exception as e:
+            logger.warning(f"Failed to delete user cache from Redis: {e}")
+
+
+# 创建全局实例
+user_cache = UserCache()
@@ -0,0 +1,339 @@
+# /backend/app/tasks/bundle_cache.py
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import requests
+from loguru import logger
+
+from app.core.config import settings
+from app.utils.bundle import bundle_path, extract_bundle, is_valid_hash
+from app.utils.delta import apply_delta, load_manifest, manifest_path, save_manifest
+
+try:
+    import fcntl
+except ImportError:  # Windows：没有文件锁，淘汰时只跳过本进程正在使用的包
+    fcntl = None
+
+FICLONE = 0x40049409  # Linux ioctl：在支持写时复制的文件系统（btrfs、XFS 等）上共享数据块，不复制内容
+META_SUFFIX = ".json"
+LOCK_SUFFIX = ".lock"
+
+
+class BundleCache:
+    """
+    Worker 本地的项目包缓存（按内容哈希寻址，LRU，总大小上限 BUNDLE_CACHE_MAX_MB）
+
+    - 目录结构：<cache_dir>/<hash>/ 为解压后的项目，<hash>.json 记录大小，其修改时间即最近使用时间
+    - 命中时不发生任何传输；未命中时优先从本机的包目录（与主服务同机部署）读取，否则从主服务下载
+    - 缓存中有同一项目的旧版本时按清单增量拉取（只传输变化的文件和块），否则下载完整的包
+    - 先解压到临时目录再原子重命名，同一节点上的多个 Worker 进程并发拉取同一个包也安全
+    - 执行期间持有该包的共享锁（fcntl），淘汰时跳过被锁定的包，不会删除正在运行的项目
+    - 缓存中的包只读使用：每次执行先复制到独立的工作目录（checkout），脚本的输出不会写进缓存，
+      也不会随淘汰被删除，同一个包的并发执行互不影响
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self._cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._in_use: Dict[str, int] = {}
+
+    @property
+    def cache_dir(self) -> str:
+        return self._cache_dir or settings.BUNDLE_CACHE_DIR
+
+    def path(self, bundle_hash: str) -> str:
+        return os.path.join(self.cache_dir, bundle_hash)
+
+    def contains(self, bundle_hash: str) -> bool:
+        return os.path.exists(self._meta_path(bundle_hash))
+
+    @contextmanager
+    def use(self, bundle_hash: str) -> Iterator[str]:
+        """
+        确保包在本地（缺失时拉取），在 with 块内保证不被淘汰
+        :return: 解压后的项目目录
+        """
+        if not is_valid_hash(bundle_hash):
+            raise ValueError(f"Invalid bundle hash: {bundle_hash}")
+        with self._lease(bundle_hash):
+            self.ensure(bundle_hash)
+            yield self.path(bundle_hash)
+
+    def checkout(self, bundle_hash: str, dest_dir: str) -> Dict[str, Tuple[int, int]]:
+        """
+        把包中的项目复制到执行的工作目录（保留修改时间），复制期间保证不被淘汰
+        文件系统支持时以写时复制（reflink）克隆，不占用额外空间；不使用硬链接，脚本原地修改文件不会影响缓存
+        :return: 复制出的文件快照 {相对路径: (大小, 修改时间 ns)}，执行结束后交给 remove_unchanged
+        """
+        with self.use(bundle_hash) as project_dir:
+            shutil.copytree(project_dir, dest_dir, copy_function=_clone_file, dirs_exist_ok=True)
+        return {
+            os.path.relpath(path, dest_dir): _file_signature(path)
+            for path in _iter_files(dest_dir)
+        }
+
+    def ensure(self, bundle_hash: str) -> str:
+        """包已在本地时只刷新最近使用时间，否则拉取并解压，然后按容量淘汰"""
+        if not is_valid_hash(bundle_hash):
+            raise ValueError(f"Invalid bundle hash: {bundle_hash}")
+        meta_path = self._meta_path(bundle_hash)
+        if os.path.exists(meta_path):
+            os.utime(meta_path)
+            return self.path(bundle_hash)
+
+        size = self._fetch(bundle_hash)
+        logger.info(f"Bundle {bundle_hash[:12]} cached ({size} bytes)")
+        self.evict(keep=bundle_hash)
+        return self.path(bundle_hash)
+
+    def evict(self, keep: Optional[str] = None) -> List[str]:
+        """按最近使用时间从旧到新淘汰，直到总大小不超过上限；返回被淘汰的哈希"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(META_SUFFIX):
+                continue
+            bundle_hash = name[:-len(META_SUFFIX)]
+            if not is_valid_hash(bundle_hash):
+                continue  # 清单文件
+            meta_path = os.path.join(self.cache_dir, name)
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    size = json.load(f)["size"]
+                entries.append((os.path.getmtime(meta_path), bundle_hash, size))
+            except (OSError, ValueError, KeyError):
+                continue
+
+        total = sum(size for _, _, size in entries)
+        max_bytes = settings.BUNDLE_CACHE_MAX_MB * 1024 * 1024
+        evicted = []
+        for _, bundle_hash, size in sorted(entries):
+            if total <= max_bytes:
+                break
+            if bundle_hash == keep or bundle_hash in self._in_use:
+                continue
+            lock_file = self._acquire(bundle_hash, exclusive=True, blocking=False)
+            if fcntl is not None and lock_file is None:
+                continue  # 其他进程正在使用
+            try:
+                os.remove(self._meta_path(bundle_hash))
+                if os.path.exists(manifest_path(self.cache_dir, bundle_hash)):
+                    os.remove(manifest_path(self.cache_dir, bundle_hash))
+                shutil.rmtree(self.path(bundle_hash), ignore_errors=True)
+            finally:
+                if lock_file is not None:
+                    lock_file.close()
+            total -= size
+            evicted.append(bundle_hash)
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} bundle(s) from cache, {total} bytes remain")
+        return evicted
+
+    @contextmanager
+    def _lease(self, bundle_hash: str) -> Iterator[None]:
+        """占用一个包：本进程计数 + 共享文件锁"""
+        with self._lock:
+            self._in_use[bundle_hash] = self._in_use.get(bundle_hash, 0) + 1
+        lock_file = None
+        try:
+            lock_file = self._acquire(bundle_hash, exclusive=False, blocking=True)
+            yield
+        finally:
+            if lock_file is not None:
+                lock_file.close()
+            with self._lock:
+                self._in_use[bundle_hash] -= 1
+                if not self._in_use[bundle_hash]:
+                    del self._in_use[bundle_hash]
+
+    def _meta_path(self, bundle_hash: str) -> str:
+        return os.path.join(self.cache_dir, bundle_hash + META_SUFFIX)
+
+    def _acquire(self, bundle_hash: str, *, exclusive: bool, blocking: bool):
+        """获取包的文件锁；没有 fcntl 时返回 None"""
+        if fcntl is None:
+            return None
+        os.makedirs(self.cache_dir, exist_ok=True)
+        lock_file = open(os.path.join(self.cache_dir, bundle_hash + LOCK_SUFFIX), "a")
+        flags = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        if not blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(lock_file, flags)
+        except OSError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    def _fetch(self, bundle_hash: str) -> int:
+        """拉取并解压到临时目录，校验哈希后原子重命名为 <hash>/，返回解压后的字节数"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix=f".{bundle_hash[:12]}.")
+        try:
+            local_path = bundle_path(settings.BUNDLES_DIR, bundle_hash)
+            if os.path.exists(local_path):
+                with open(local_path, "rb") as f:
+                    size = extract_bundle(f, tmp_dir, expected_hash=bundle_hash)
+                manifest = load_manifest(settings.BUNDLES_DIR, bundle_hash)
+            else:
+                manifest = self._download_manifest(bundle_hash) if settings.BUNDLE_DELTA_ENABLED else None
+                size = self._fetch_delta(manifest, tmp_dir) if manifest else None
+                if size is None:
+                    size = self._download_bundle(bundle_hash, tmp_dir)
+
+            try:
+                os.rename(tmp_dir, self.path(bundle_hash))
+            except OSError:
+                # 另一个进程已经拉取完成
+                if not os.path.isdir(self.path(bundle_hash)):
+                    raise
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            if manifest:
+                save_manifest(self.cache_dir, manifest)  # 作为以后增量拉取的基准
+            with open(self._meta_path(bundle_hash), "w", encoding="utf-8") as f:
+                json.dump({"size": size, "project": manifest.get("project") if manifest else None}, f)
+            return size
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    def _api_url(self, path: str) -> str:
+        return f"{settings.CRAWL_PRO_API_URL.rstrip('/')}{settings.API_V1_STR}/projects{path}"
+
+    def _headers(self) -> Dict[str, str]:
+        """部署包相关接口要求携带 Worker 令牌"""
+        return {"X-Worker-Token": settings.WORKER_API_TOKEN} if settings.WORKER_API_TOKEN else {}
+
+    def _download_bundle(self, bundle_hash: str, dest_dir: str) -> int:
+        url = self._api_url(f"/bundles/{bundle_hash}")
+        with requests.get(
+            url, headers=self._headers(), stream=True, timeout=settings.BUNDLE_FETCH_TIMEOUT
+        ) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            return extract_bundle(response.raw, dest_dir, expected_hash=bundle_hash)
+
+    def _download_manifest(self, bundle_hash: str) -> Optional[dict]:
+        """下载包的清单；主服务不支持或出错时返回 None（退回完整下载）"""
+        try:
+            response = requests.get(
+                self._api_url(f"/bundles/{bundle_hash}/manifest"), headers=self._headers(),
+                timeout=settings.BUNDLE_FETCH_TIMEOUT
+            )
+            response.raise_for_status()
+            manifest = response.json()
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"Failed to download manifest of bundle {bundle_hash[:12]}: {e}")
+            return None
+        return manifest if manifest.get("bundle_hash") == bundle_hash else None
+
+    def _read_ranges(self, ranges) -> Iterator[bytes]:
+        with requests.post(
+            self._api_url("/objects/ranges"), json={"ranges": ranges}, headers=self._headers(),
+            stream=True, timeout=settings.BUNDLE_FETCH_TIMEOUT
+        ) as response:
+            response.raise_for_status()
+            yield from response.iter_content(chunk_size=64 * 1024)
+
+    def _find_basis(self, project: Optional[str]) -> Optional[str]:
+        """缓存中同一项目最近使用的版本"""
+        if not project:
+            return None
+        best = None
+        for name in os.listdir(self.cache_dir):
+            bundle_hash = name[:-len(META_SUFFIX)]
+            if not name.endswith(META_SUFFIX) or not is_valid_hash(bundle_hash):
+                continue
+            meta_path = os.path.join(self.cache_dir, name)
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    if json.load(f).get("project") != project:
+                        continue
+                mtime = os.path.getmtime(meta_path)
+            except (OSError, ValueError):
+                continue
+            if best is None or mtime > best[0]:
+                best = (mtime, bundle_hash)
+        return best[1] if best else None
+
+    def _fetch_delta(self, manifest: dict, dest_dir: str) -> Optional[int]:
+        """以旧版本为基准增量组装；没有旧版本或失败时返回 None"""
+        bundle_hash = manifest["bundle_hash"]
+        basis = self._find_basis(manifest.get("project"))
+        if basis is None:
+            return None
+        try:
+            with self._lease(basis):
+                if not self.contains(basis):
+                    return None  # 刚被淘汰
+                basis_manifest = load_manifest(self.cache_dir, basis)
+                basis_files = (
+                    {entry["sha256"]: entry["path"] for entry in basis_manifest["files"]}
+                    if basis_manifest else None
+                )
+                stats = apply_delta(
+                    manifest, dest_dir, self._read_ranges,
+                    basis_dir=self.path(basis), basis_files=basis_files,
+                    batch_bytes=settings.BUNDLE_DELTA_BATCH_MB * 1024 * 1024
+                )
+        except Exception as e:
+            logger.warning(f"Delta fetch of bundle {bundle_hash[:12]} failed, downloading full bundle: {e}")
+            shutil.rmtree(dest_dir, ignore_errors=True)
+            os.makedirs(dest_dir)
+            return None
+        logger.info(f"Bundle {bundle_hash[:12]} assembled from {basis[:12]}: {stats.summary()}")
+        return stats.total_bytes
+
+
+def _clone_file(src: str, dst: str) -> str:
+    """优先以 reflink 克隆文件，不支持时退回普通复制"""
+    if fcntl is not None and sys.platform.startswith("linux"):
+        try:
+            with open(src, "rb") as source, open(dst, "wb") as target:
+                fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+            shutil.copystat(src, dst)
+            return dst
+        except OSError:
+            pass
+    return shutil.copy2(src, dst)
+
+
+def _iter_files(root: str) -> Iterator[str]:
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            yield os.path.join(dirpath, filename)
+
+
+def _file_signature(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def remove_unchanged(work_dir: str, snapshot: Dict[str, Tuple[int, int]]) -> int:
+    """
+    执行结束后删除工作目录中从包复制来、且未被修改的文件以及空目录，只保留脚本的输出
+    :return: 删除的文件数
+    """
+    removed = 0
+    for path in _iter_files(work_dir):
+        try:
+            if snapshot.get(os.path.relpath(path, work_dir)) == _file_signature(path):
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+    for dirpath, _, _ in os.walk(work_dir, topdown=False):
+        try:
+            os.rmdir(dirpath)  # 只删除空目录
+        except OSError:
+            pass
+    return removed
+
+
+# 创建全局实例
+bundle_cache = BundleCache()
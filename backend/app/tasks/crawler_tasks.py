@@ -3,16 +3,30 @@ import json
 import os
 import subprocess
 import datetime
-import time
-from typing import Dict, Any
+from contextlib import ExitStack
+from typing import Dict, Any, Optional, Tuple
+
+import requests
 from celery import Task
 from sqlalchemy.orm import Session
 
 from app.core.celery_app import celery
 from app.core.config import settings
+from app.core.redis_client import get_redis
 from app.db.session import SessionLocal
-from app import crud, schemas
-from app.models.task_run import TaskRunStatus
+from app import crud
+from app.models.task_run import TaskRun, TaskRunStatus
+from app.tasks import work_dirs
+from app.tasks.bundle_cache import bundle_cache, remove_unchanged
+from app.tasks.output_stats import OutputTee, SpiderStatsParser
+from app.tasks.supervisor import ProcessSupervisor
+from app.utils import log_store
+from app.utils.log_store import LogStoreReader, archive_log_file, get_outgoing_path, get_store_path
+from app.utils.run_logs import get_run_log_path, get_run_work_dir, read_log_tail
+
+
+# 子进程退出后等待读取线程读完剩余输出的最长时间（秒）
+OUTPUT_DRAIN_TIMEOUT = 5
 
 
 class GenericTask(Task):
@@ -104,42 +118,116 @@ def _build_command(entrypoint: str, args: dict = None, worker_os: str = "LINUX")
         raise ValueError(f"Unsupported script type: {entrypoint}")
 
 
-def _read_log_tail(log_file: str, lines: int = 100) -> str:
-    """读取日志末尾 N 行，限制总长度"""
-    try:
-        with open(log_file, "r", encoding="utf-8") as f:
-            content = "".join(f.readlines()[-lines:])
-            # 限制总长度为 64KB
-            if len(content) > 65535:
-                content = content[-65535:]
-            return content
-    except Exception as e:
-        return f"[Log read failed: {str(e)}]"
-
-
-def _update_task_run_status(
+def _finish_task_run(
     db: Session,
-    db_task_run,
+    run: TaskRun,
     status: TaskRunStatus,
-    log_output: str,
-    end_time: datetime.datetime = None
+    log_output: Optional[str],
+    manually_stopped: bool = False,
+    log_path: str = None,
+    log_size: int = None,
+    metrics: Dict[str, Any] = None
 ):
-    """统一更新任务执行状态"""
-    if not db_task_run:
+    """
+    统一更新任务执行的结束状态：按 celery_task_id 一条 UPDATE，首次结束时计入任务统计汇总
+    :param run: Worker 本地持有的执行记录（不绑定会话，只用于计入统计）
+    :param log_output: 日志末尾；归档已上传到主服务时为 None（完整日志见 log_path）
+    :param metrics: 退出码、执行时长、CPU / 内存等执行指标
+    """
+    if not run:
         return
 
-    end_time = end_time or datetime.datetime.utcnow()
-    
     # 限制日志输出长度，避免超出数据库字段限制
     if log_output and len(log_output) > 65535:
         log_output = log_output[:65532] + "..."
-    
-    update_data = schemas.TaskRunUpdate(
-        status=status,
-        end_time=end_time,
-        log_output=log_output
-    )
-    crud.task_run.update(db, db_obj=db_task_run, obj_in=update_data)
+
+    values = {
+        "status": status,
+        "end_time": datetime.datetime.utcnow(),
+        "log_output": log_output,
+        "manually_stopped": manually_stopped,
+    }
+    if log_path:
+        values["log_path"] = log_path
+        values["log_size"] = log_size
+    if metrics:
+        values.update(metrics)
+    if not crud.task_run.finish_run(db, celery_task_id=run.celery_task_id, values=values):
+        return
+
+    # 执行首次结束时计入任务统计汇总
+    for key, value in values.items():
+        setattr(run, key, value)
+    try:
+        crud.task_run_stats.record_run(db, task_run=run)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"[CELERY TASK ERROR] Failed to update task run stats: {e}")
+
+
+def _output_stats(parser: SpiderStatsParser) -> Dict[str, int]:
+    """从输出中解析到的抓取条数 / 请求数；没有识别到的保持默认值"""
+    stats = {"items_scraped": parser.items_scraped, "requests_count": parser.requests_count}
+    return {key: value for key, value in stats.items() if value is not None}
+
+
+def _archive_run_log(log_file: str, run_id: int) -> Tuple[Optional[str], Optional[str], Optional[int]]:
+    """
+    把原始日志压缩归档、上传到主服务的日志存储，然后删除原始文件
+    :return: (日志末尾, 归档路径, 原始字节数)
+        - 上传成功：日志末尾为 None，主服务从日志存储读取完整日志，数据库只记录归档路径
+        - 上传失败：归档保留在 Worker 本地的日志存储中，日志末尾写入数据库
+          （主服务与 Worker 不在同一台机器时只能读到这部分）
+        - 归档失败：保留原始文件，返回 (日志末尾, None, None)
+    """
+    store_path, outgoing_path = get_store_path(run_id), get_outgoing_path(run_id)
+    try:
+        log_size = archive_log_file(log_file, outgoing_path)
+    except Exception as e:
+        print(f"[CELERY TASK ERROR] Failed to archive log {log_file}: {e}")
+        return read_log_tail(log_file), None, None
+
+    log_output = None
+    try:
+        if _upload_run_log(outgoing_path, run_id):
+            log_store.remove(outgoing_path)
+        else:
+            log_store.move(outgoing_path, store_path)
+            with LogStoreReader(store_path) as reader:
+                log_output = reader.read_tail()
+    except Exception as e:
+        print(f"[CELERY TASK ERROR] Failed to store log archive of run {run_id}: {e}")
+        try:
+            log_store.remove(outgoing_path)
+        except OSError:
+            pass
+        return read_log_tail(log_file), None, None
+
+    # 归档就位后再删除原始文件：正在跟踪的订阅者持有已打开的文件句柄，删除后仍可读完；新的订阅改为读取归档
+    try:
+        os.remove(log_file)
+    except OSError as e:
+        print(f"[CELERY TASK ERROR] Failed to remove log {log_file} after archiving: {e}")
+    return log_output, store_path, log_size
+
+
+def _upload_run_log(store_path: str, run_id: int) -> bool:
+    """把日志归档上传到主服务；未配置 WORKER_API_TOKEN 或上传失败时返回 False"""
+    if not settings.WORKER_API_TOKEN:
+        return False
+    url = f"{settings.CRAWL_PRO_API_URL.rstrip('/')}{settings.API_V1_STR}/task-runs/{run_id}/log/archive"
+    try:
+        with log_store.open_archive(store_path) as f:
+            response = requests.put(
+                url, data=f, headers={"X-Worker-Token": settings.WORKER_API_TOKEN},
+                timeout=settings.LOG_UPLOAD_TIMEOUT
+            )
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"[CELERY TASK ERROR] Failed to upload log archive of run {run_id}: {e}")
+        return False
+    return True
 
 
 @celery.task(base=GenericTask, bind=True, name="tasks.run_generic_script")
@@ -149,30 +237,59 @@ def run_generic_script(
     project_name: str,
     entrypoint: str = "run.py",
     args: Dict[str, Any] = None,
-    env: Dict[str, str] = None
+    env: Dict[str, str] = None,
+    run_group_id: Optional[int] = None,
+    run_id: Optional[int] = None,
+    bundle_hash: Optional[str] = None
 ):
     """
     在 Celery Worker 中运行任意脚本（Python, Shell, Node.js 等）
     支持中断、日志记录、状态更新
+    :param run_group_id: 扇出执行时所属的 TaskRunGroup ID
+    :param run_id: 调度时创建的 TaskRun ID
+    :param bundle_hash: 项目部署包的内容哈希；为空时使用 PROJECTS_DIR 下的项目目录
     """
     db_task_run = None
     log_file = None
+    work_dir = checkout = None  # 部署包复制出的工作目录及其文件快照
+    work_dir_lease = ExitStack()  # 执行期间占用工作目录，防止被同一项目的其他执行清理
 
     try:
-        # === 1. 创建任务执行记录 ===
+        # === 1. 执行记录推进到 RUNNING（调度时已创建，这里只更新） ===
+        start_time = datetime.datetime.utcnow()
         with SessionLocal() as db:
-            task_run_in = schemas.TaskRunCreate(
-                task_id=original_task_id,
+            run_id = crud.task_run.start_run(
+                db,
                 celery_task_id=self.request.id,
-                status="PENDING",
-                worker_node=self.request.hostname
+                task_id=original_task_id,
+                worker_node=self.request.hostname,
+                start_time=start_time,
+                group_id=run_group_id,
+                run_id=run_id
             )
-            db_task_run = crud.task_run.create(db, obj_in=task_run_in)
-            db.commit()
-            db.refresh(db_task_run)
-
-        # === 2. 检查项目路径 ===
+        db_task_run = TaskRun(
+            id=run_id,
+            task_id=original_task_id,
+            celery_task_id=self.request.id,
+            start_time=start_time,
+            group_id=run_group_id
+        )
+
+        # === 2. 检查项目路径（按哈希从本地缓存取部署包，缺失时从主服务拉取，复制到本次执行的工作目录） ===
         project_dir = os.path.join(settings.PROJECTS_DIR, project_name)
+        if bundle_hash:
+            run_work_dir = get_run_work_dir(project_name, self.request.id)
+            try:
+                work_dir_lease.enter_context(work_dirs.hold(run_work_dir))
+                checkout = bundle_cache.checkout(bundle_hash, run_work_dir)
+                work_dir = project_dir = run_work_dir
+            except Exception as e:
+                # 拉取失败（例如未配置 WORKER_API_TOKEN）：回退到本机的项目目录
+                if not os.path.isdir(project_dir):
+                    raise
+                work_dir_lease.close()
+                work_dirs.remove(run_work_dir)
+                print(f"[CELERY TASK WARNING] Failed to fetch bundle {bundle_hash[:12]}, using {project_dir}: {e}")
         if not os.path.isdir(project_dir):
             raise FileNotFoundError(f"Project directory not found: {project_dir}")
 
@@ -202,14 +319,15 @@ def run_generic_script(
             "CRAWLPRO_WORKER_OS": detected_os,
             "PYTHONUNBUFFERED": "1",
         })
+        if work_dir:
+            exec_env["CRAWLPRO_WORK_DIR"] = os.path.abspath(work_dir)
         if args:
             exec_env["CRAWLPRO_ARGS"] = json.dumps(args)
         if env:
             exec_env.update(env)
 
         # === 6. 日志文件路径 ===
-        log_filename = f"{project_name}_{os.path.splitext(entrypoint)[0]}_{self.request.id}.log"
-        log_file = os.path.join(settings.LOGS_DIR, "runs", log_filename)
+        log_file = get_run_log_path(project_name, entrypoint, self.request.id)
         os.makedirs(os.path.dirname(log_file), exist_ok=True)
 
         # === 7. 更新状态为 RUNNING ===
@@ -220,61 +338,115 @@ def run_generic_script(
         })
 
         # === 8. 执行脚本 ===
-        with open(log_file, "w", encoding="utf-8") as log_f:
+        # 输出经管道由读取线程写入日志文件，同时增量解析抓取条数 / 请求数
+        stats_parser = SpiderStatsParser()
+        with open(log_file, "wb") as log_f:
             process = subprocess.Popen(
                 command,
                 cwd=project_dir,
                 env=exec_env,
-                stdout=log_f,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                universal_newlines=True
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT
             )
+            output_tee = OutputTee(process.stdout, log_f, stats_parser)
+            output_tee.start()
 
-            while process.poll() is None:
-                # 检查任务是否被中断（更兼容的方式）
-                if hasattr(self.request, 'called') and self.request.called:
-                    process.terminate()
-                    try:
-                        process.wait(timeout=5)
-                    except subprocess.TimeoutExpired:
-                        process.kill()
-                    break
-                time.sleep(0.5)
-
-            return_code = process.poll()
-
-        # === 9. 更新最终状态 ===
+            # 阻塞等待子进程退出；取消信号通过 Redis 送达
+            supervisor = ProcessSupervisor(
+                process,
+                redis_client=get_redis(),
+                celery_task_id=self.request.id,
+                sample_interval=settings.WORKER_RESOURCE_SAMPLE_INTERVAL
+            )
+            return_code = supervisor.wait()
+            output_tee.join(timeout=OUTPUT_DRAIN_TIMEOUT)
+
+        # === 9. 追加结束信息并归档日志 ===
+        if supervisor.cancelled:
+            status, note = TaskRunStatus.FAILURE, "[INFO] Task was manually stopped."
+        elif return_code == 0:
+            status, note = TaskRunStatus.SUCCESS, None
+        else:
+            status, note = TaskRunStatus.FAILURE, f"[ERROR] Script exited with code {return_code}"
+        usage = supervisor.usage
+        trailer = [note] if note else []
+        if usage.samples:
+            trailer.append(f"[INFO] Resource usage: {usage.summary()}")
+        if trailer:
+            with open(log_file, "a", encoding="utf-8") as log_f:
+                log_f.write("\n" + "\n".join(trailer) + "\n")
+
+        # 归档上传到主服务后数据库只记录归档路径；上传失败时另存日志末尾
+        log_output, log_path, log_size = _archive_run_log(log_file, db_task_run.id)
+
+        # === 10. 更新最终状态 ===
         with SessionLocal() as db:
-            log_content = _read_log_tail(log_file)
-
-            if return_code == 0:
-                _update_task_run_status(db, db_task_run, TaskRunStatus.SUCCESS, log_content)
-                return {"status": "success", "return_code": 0}
-            elif hasattr(self.request, 'called') and self.request.called:
-                _update_task_run_status(
-                    db, db_task_run, TaskRunStatus.FAILURE,
-                    f"{log_content}\n[INFO] Task was manually stopped."
-                )
-                return {"status": "stopped"}
-            else:
-                error_msg = f"Script exited with code {return_code}"
-                _update_task_run_status(
-                    db, db_task_run, TaskRunStatus.FAILURE,
-                    f"{log_content}\n[ERROR] {error_msg}"
-                )
-                return {"status": "failure", "return_code": return_code}
+            _finish_task_run(
+                db, db_task_run, status, log_output,
+                manually_stopped=supervisor.cancelled,
+                log_path=log_path,
+                log_size=log_size,
+                metrics={
+                    "exit_code": return_code,
+                    "duration_seconds": supervisor.duration,
+                    "cpu_usage": usage.cpu_mean,
+                    "memory_usage_mb": usage.memory_peak_mb,
+                    **_output_stats(stats_parser),
+                }
+            )
+
+        if supervisor.cancelled:
+            return {"status": "stopped"}
+        elif return_code == 0:
+            return {"status": "success", "return_code": 0}
+        else:
+            return {"status": "failure", "return_code": return_code}
 
     except Exception as e:
         error_msg = f"Task execution failed: {type(e).__name__}: {str(e)}"
         print(f"[CELERY TASK ERROR] {error_msg}")
 
         try:
+            log_path = log_size = None
+            log_output = error_msg
+            if db_task_run and log_file and os.path.exists(log_file):
+                with open(log_file, "a", encoding="utf-8") as log_f:
+                    log_f.write(f"\n[ERROR] {error_msg}\n")
+                tail, log_path, log_size = _archive_run_log(log_file, db_task_run.id)
+                log_output = tail or error_msg  # 归档已上传时只保存简短的错误信息
             with SessionLocal() as db:
                 if db_task_run:
-                    _update_task_run_status(db, db_task_run, TaskRunStatus.FAILURE, error_msg)
+                    _finish_task_run(
+                        db, db_task_run, TaskRunStatus.FAILURE, log_output,
+                        log_path=log_path, log_size=log_size
+                    )
         except Exception as db_err:
             print(f"[CELERY TASK ERROR] Failed to update DB status: {db_err}")
 
-        raise
\ No newline at end of file
+        raise
+    finally:
+        # 工作目录中只保留脚本的输出（及被脚本修改过的文件）
+        if checkout is not None:
+            try:
+                remove_unchanged(work_dir, checkout)
+            except OSError as e:
+                print(f"[CELERY TASK ERROR] Failed to clean work dir {work_dir}: {e}")
+        work_dir_lease.close()
+        # 按个数与保留期限清理同一项目较早的工作目录
+        if work_dir:
+            try:
+                work_dirs.prune(
+                    os.path.dirname(work_dir),
+                    keep=settings.RUN_WORK_KEEP_PER_PROJECT,
+                    max_age_seconds=settings.RUN_WORK_RETENTION_HOURS * 3600
+                )
+            except OSError as e:
+                print(f"[CELERY TASK ERROR] Failed to prune work dirs of {project_name}: {e}")
+
+
+@celery.task(name="tasks.prefetch_bundle")
+def prefetch_bundle(bundle_hash: str):
+    """把项目部署包预先拉取到本节点缓存（已缓存时不传输）"""
+    cached = bundle_cache.contains(bundle_hash)
+    bundle_cache.ensure(bundle_hash)
+    return {"bundle_hash": bundle_hash, "cached": cached}
\ No newline at end of file
@@ -0,0 +1,192 @@
+# /backend/app/tasks/output_stats.py
+import json
+import re
+import threading
+from typing import BinaryIO, Optional
+
+from loguru import logger
+
+# 统计字典中代表抓取条数 / 请求数的键（Scrapy / Crawlo / --json 输出），按优先级排列
+ITEM_KEYS = ("item_scraped_count", "item_successful_count", "items_scraped")
+REQUEST_KEYS = ("downloader/request_count", "request_scheduler_count", "total_requests", "requests_count")
+
+# 周期性进度日志
+# Scrapy: Crawled 120 pages (at 60 pages/min), scraped 300 items (at 150 items/min)
+# Crawlo: Crawled 120 pages (at 60 pages/60s), Got 300 items (at 150 items/60s).
+PROGRESS_RE = re.compile(r"Crawled (\d+) pages .*?(?:scraped|Got) (\d+) items")
+# 统计字典开始：Scrapy "Dumping Scrapy stats:"，Crawlo "<spider> stats: "，字典从下一行开始
+DUMP_START_RE = re.compile(r"(?:Dumping Scrapy stats:|\sstats:)\s*$")
+# 统计字典（pformat 输出）中的一个整数项
+DUMP_ITEM_RE = re.compile(r"'([^']+)':\s*(\d+)\b")
+
+MAX_LINE_BYTES = 64 * 1024  # 超长的行只保留开头部分，内存占用有上限
+MAX_BLOCK_LINES = 1000  # 统计字典 / 多行 JSON 最多跨越的行数
+
+
+def _first(stats: dict, keys) -> Optional[int]:
+    for key in keys:
+        value = stats.get(key)
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    return None
+
+
+class SpiderStatsParser:
+    """
+    增量解析爬虫输出中的统计信息（逐行，不回读日志文件）
+
+    - 进度日志（Crawled N pages ... M items）：执行过程中实时更新
+    - 结束时的统计字典（Scrapy "Dumping Scrapy stats:" / Crawlo "<spider> stats:"）
+      以及 --json 输出的 JSON 对象：以最终统计为准，多个爬虫（crawlo run all）累加
+    - 只保留当前行和正在解析的统计块，内存占用与输出长度无关
+    """
+
+    def __init__(self):
+        self._partial = b""
+        self._mode: Optional[str] = None  # None / "dump_start" / "dump" / "json"
+        self._block: dict = {}
+        self._json_lines: list = []
+        self._block_lines = 0
+
+        self._live_items: Optional[int] = None
+        self._live_requests: Optional[int] = None
+        self._final_items: Optional[int] = None
+        self._final_requests: Optional[int] = None
+
+    @property
+    def items_scraped(self) -> Optional[int]:
+        return self._final_items if self._final_items is not None else self._live_items
+
+    @property
+    def requests_count(self) -> Optional[int]:
+        return self._final_requests if self._final_requests is not None else self._live_requests
+
+    def feed(self, chunk: bytes) -> None:
+        """输入一段原始输出（可以在行中间截断）"""
+        data = self._partial + chunk
+        lines = data.split(b"\n")
+        self._partial = lines.pop()[:MAX_LINE_BYTES]
+        for line in lines:
+            self.feed_line(line[:MAX_LINE_BYTES].decode("utf-8", "replace").rstrip("\r"))
+
+    def close(self) -> None:
+        """输出结束：处理最后一行（没有换行符时）"""
+        if self._partial:
+            self.feed_line(self._partial.decode("utf-8", "replace").rstrip("\r"))
+            self._partial = b""
+        if self._mode == "dump":
+            self._finish_dump()
+
+    def feed_line(self, line: str) -> None:
+        if self._mode == "dump_start":
+            if line.startswith("{"):
+                self._mode = "dump"
+            else:
+                self._mode = None
+        if self._mode == "dump":
+            self._dump_line(line)
+            return
+        if self._mode == "json":
+            self._json_line(line)
+            return
+
+        match = PROGRESS_RE.search(line)
+        if match:
+            self._live_requests, self._live_items = int(match.group(1)), int(match.group(2))
+            return
+        if DUMP_START_RE.search(line):
+            self._start_block("dump_start")
+            return
+        stripped = line.strip()
+        if stripped == "{":
+            self._start_block("json")
+            self._json_lines.append(line)
+        elif stripped.startswith("{") and stripped.endswith("}") and '"' in stripped:
+            self._record_json(stripped)
+
+    def _start_block(self, mode: str) -> None:
+        self._mode = mode
+        self._block = {}
+        self._json_lines = []
+        self._block_lines = 0
+
+    def _dump_line(self, line: str) -> None:
+        for key, value in DUMP_ITEM_RE.findall(line):
+            if key in ITEM_KEYS or key in REQUEST_KEYS:
+                self._block[key] = int(value)
+        self._block_lines += 1
+        if line.rstrip().endswith("}") or self._block_lines >= MAX_BLOCK_LINES:
+            self._finish_dump()
+
+    def _finish_dump(self) -> None:
+        self._mode = None
+        self._record(self._block)
+
+    def _json_line(self, line: str) -> None:
+        self._json_lines.append(line)
+        self._block_lines += 1
+        if line.rstrip() == "}":
+            self._mode = None
+            self._record_json("\n".join(self._json_lines))
+        elif self._block_lines >= MAX_BLOCK_LINES:
+            self._mode = None
+
+    def _record_json(self, text: str) -> None:
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return
+        if isinstance(data, dict):
+            # 统计可能在顶层，也可能在 "stats" 字段中
+            stats = data.get("stats") if isinstance(data.get("stats"), dict) else data
+            self._record(stats)
+
+    def _record(self, stats: dict) -> None:
+        items, requests = _first(stats, ITEM_KEYS), _first(stats, REQUEST_KEYS)
+        if items is not None:
+            self._final_items = (self._final_items or 0) + items
+        if requests is not None:
+            self._final_requests = (self._final_requests or 0) + requests
+
+
+class OutputTee:
+    """
+    读取子进程的输出管道：原样写入日志文件（实时跟踪读取的就是这个文件），同时交给统计解析器
+    每读到一块数据就写入并 flush，不按行缓冲
+    """
+
+    def __init__(self, stream: BinaryIO, log_f: BinaryIO, parser: SpiderStatsParser, chunk_size: int = 64 * 1024):
+        self.stream = stream
+        self.log_f = log_f
+        self.parser = parser
+        self.chunk_size = chunk_size
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """
+        等待输出读完
+        子进程退出后，仍持有管道的后台孙进程会让读取一直阻塞，超时后不再等待
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        read = getattr(self.stream, "read1", self.stream.read)
+        try:
+            while True:
+                chunk = read(self.chunk_size)
+                if not chunk:
+                    break
+                self.log_f.write(chunk)
+                self.log_f.flush()
+                try:
+                    self.parser.feed(chunk)
+                except Exception as e:  # 解析失败不影响日志写入
+                    logger.warning(f"Failed to parse spider output: {e}")
+            self.parser.close()
+        except Exception as e:
+            logger.warning(f"Output reader stopped: {e}")
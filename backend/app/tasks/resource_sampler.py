@@ -0,0 +1,182 @@
+# /backend/app/tasks/resource_sampler.py
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+try:
+    import psutil
+except ImportError:  # 未安装 psutil 时读取 /proc（仅 Linux）
+    psutil = None
+
+# 一次采样的结果：(进程树 CPU 累计时间（秒）, 进程树 RSS（字节）)
+Sample = Tuple[float, int]
+
+
+@dataclass
+class ResourceUsage:
+    """一次执行的资源使用汇总；CPU 使用率按单核计（多核并行时可超过 100%）"""
+    cpu_mean: Optional[float] = None  # 平均 CPU 使用率 (%)：CPU 累计时间 / 墙钟时间
+    cpu_peak: Optional[float] = None  # 相邻两次采样之间的最高 CPU 使用率 (%)
+    memory_mean_mb: Optional[float] = None  # 平均 RSS (MB)
+    memory_peak_mb: Optional[float] = None  # 峰值 RSS (MB)
+    samples: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"cpu mean {self.cpu_mean:.1f}% / peak {self.cpu_peak:.1f}%, "
+            f"memory mean {self.memory_mean_mb:.1f} MB / peak {self.memory_peak_mb:.1f} MB"
+        )
+
+
+class _ProcReader:
+    """没有 psutil 时从 /proc 读取进程树的 CPU 时间和 RSS"""
+
+    def __init__(self):
+        self.clock_ticks = os.sysconf("SC_CLK_TCK")
+        self.page_size = os.sysconf("SC_PAGE_SIZE")
+
+    @staticmethod
+    def _stat(pid: int) -> Optional[List[str]]:
+        """/proc/<pid>/stat 中进程名之后的字段（字段 3 起）"""
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                data = f.read().decode("ascii", "replace")
+        except OSError:
+            return None
+        return data[data.rfind(")") + 2:].split()
+
+    def sample(self, root_pid: int) -> Optional[Sample]:
+        stats: Dict[int, List[str]] = {}
+        children: Dict[int, List[int]] = {}
+        for name in os.listdir("/proc"):
+            if not name.isdigit():
+                continue
+            fields = self._stat(int(name))
+            if fields is None:
+                continue
+            pid = int(name)
+            stats[pid] = fields
+            children.setdefault(int(fields[1]), []).append(pid)
+        if root_pid not in stats:
+            return None
+
+        # 根进程额外计入已回收子进程的 CPU 时间（cutime / cstime），短命的子进程不会漏算
+        root = stats[root_pid]
+        ticks = int(root[13]) + int(root[14])
+        rss_pages = 0
+        stack = [root_pid]
+        while stack:
+            pid = stack.pop()
+            fields = stats[pid]
+            ticks += int(fields[11]) + int(fields[12])
+            rss_pages += int(fields[21])
+            stack.extend(children.get(pid, ()))
+        return ticks / self.clock_ticks, rss_pages * self.page_size
+
+
+def _psutil_sample(root_pid: int) -> Optional[Sample]:
+    try:
+        root = psutil.Process(root_pid)
+        times = root.cpu_times()
+        cpu = times.user + times.system + times.children_user + times.children_system
+        rss = root.memory_info().rss
+        for child in root.children(recursive=True):
+            try:
+                times = child.cpu_times()
+                cpu += times.user + times.system
+                rss += child.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return None
+    return cpu, rss
+
+
+def _get_sample_func() -> Optional[Callable[[int], Optional[Sample]]]:
+    if psutil is not None:
+        return _psutil_sample
+    if os.path.isdir("/proc"):
+        return _ProcReader().sample
+    return None
+
+
+class ResourceSampler:
+    """
+    按固定间隔采样子进程树的 CPU 与内存
+
+    - 独立的守护线程，每隔 interval 秒采样一次，子进程退出后立即停止
+    - 只累计计数 / 总和 / 峰值，内存占用与执行时长无关
+    - 平均 CPU 使用率按 (最后一次 - 第一次的 CPU 累计时间) / 墙钟时间 计算，不受采样间隔影响
+    - 既没有 psutil 也没有 /proc 的平台上不采样，结果各项为 None
+    """
+
+    def __init__(self, pid: int, *, interval: float):
+        self.pid = pid
+        self.interval = interval
+        self._sample = _get_sample_func() if interval > 0 else None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._first: Optional[Tuple[float, float]] = None  # (墙钟时间, CPU 累计时间)
+        self._last: Optional[Tuple[float, float]] = None
+        self._cpu_peak = 0.0
+        self._rss_sum = 0
+        self._rss_peak = 0
+        self._samples = 0
+
+    def start(self) -> None:
+        if self._sample is None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> ResourceUsage:
+        """停止采样并返回汇总"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(self.interval, 1.0) * 2)
+        return self.usage()
+
+    def usage(self) -> ResourceUsage:
+        if not self._samples:
+            return ResourceUsage()
+        cpu_mean = 0.0
+        elapsed = self._last[0] - self._first[0]
+        if elapsed > 0:
+            cpu_mean = (self._last[1] - self._first[1]) / elapsed * 100
+        return ResourceUsage(
+            cpu_mean=round(cpu_mean, 2),
+            cpu_peak=round(self._cpu_peak, 2),
+            memory_mean_mb=round(self._rss_sum / self._samples / 1024 / 1024, 2),
+            memory_peak_mb=round(self._rss_peak / 1024 / 1024, 2),
+            samples=self._samples,
+        )
+
+    def _run(self) -> None:
+        try:
+            while True:
+                self._record()
+                if self._stop.wait(self.interval):
+                    return
+        except Exception as e:
+            logger.warning(f"Resource sampler stopped for process {self.pid}: {e}")
+
+    def _record(self) -> None:
+        sample = self._sample(self.pid)
+        if sample is None:
+            return
+        now = time.monotonic()
+        cpu, rss = sample
+        if self._last is not None and now > self._last[0]:
+            # 子进程退出后 CPU 累计时间可能回落（孙进程被 init 接管），只统计增量
+            self._cpu_peak = max(self._cpu_peak, max(cpu - self._last[1], 0.0) / (now - self._last[0]) * 100)
+        if self._first is None:
+            self._first = (now, cpu)
+        self._last = (now, max(cpu, self._last[1]) if self._last else cpu)
+        self._rss_sum += rss
+        self._rss_peak = max(self._rss_peak, rss)
+        self._samples += 1
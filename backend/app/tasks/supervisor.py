@@ -0,0 +1,107 @@
+# /backend/app/tasks/supervisor.py
+import subprocess
+import threading
+import time
+from typing import Optional
+
+from loguru import logger
+
+from app.tasks.resource_sampler import ResourceSampler, ResourceUsage
+
+# --- Redis 取消信号 ---
+CANCEL_KEY_PREFIX = "runs:cancel:"
+CANCEL_KEY_TTL = 24 * 3600  # 取消信号保留时间（秒），覆盖任务仍在队列中的情况
+_CANCEL = "cancel"
+_EXITED = "exited"
+
+
+def get_cancel_key(celery_task_id: str) -> str:
+    return f"{CANCEL_KEY_PREFIX}{celery_task_id}"
+
+
+def request_cancel(redis_client, celery_task_id: str) -> None:
+    """向正在执行（或尚未开始）的任务发送取消信号"""
+    key = get_cancel_key(celery_task_id)
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.rpush(key, _CANCEL)
+    pipe.expire(key, CANCEL_KEY_TTL)
+    pipe.execute()
+
+
+class ProcessSupervisor:
+    """
+    事件驱动的子进程监管器
+
+    - 主线程阻塞在 process.wait() 上，子进程退出即返回，不做定时轮询
+    - 取消信号由独立线程通过 Redis BLPOP 阻塞等待，无信号时不消耗 CPU
+    - 子进程退出后向取消队列写入退出标记，唤醒并回收等待线程
+    - sample_interval > 0 时由采样线程记录子进程树的 CPU / 内存，退出后见 usage 与 duration
+    """
+
+    def __init__(
+        self,
+        process: subprocess.Popen,
+        *,
+        redis_client,
+        celery_task_id: str,
+        terminate_timeout: float = 5,
+        sample_interval: float = 0,
+    ):
+        self.process = process
+        self.redis_client = redis_client
+        self.cancel_key = get_cancel_key(celery_task_id)
+        self.terminate_timeout = terminate_timeout
+        self.cancelled = False
+        self.usage = ResourceUsage()
+        self.duration: Optional[float] = None  # 子进程运行时长（秒）
+        self._watcher: Optional[threading.Thread] = None
+        self._sampler = ResourceSampler(process.pid, interval=sample_interval)
+        self._started = time.monotonic()
+
+    def wait(self) -> int:
+        """阻塞直到子进程退出，返回退出码"""
+        if self.redis_client is not None:
+            self._watcher = threading.Thread(target=self._watch_cancel, daemon=True)
+            self._watcher.start()
+        self._sampler.start()
+
+        return_code = self.process.wait()
+        self.duration = round(time.monotonic() - self._started, 3)
+        self.usage = self._sampler.stop()
+
+        if self._watcher is not None:
+            try:
+                self.redis_client.rpush(self.cancel_key, _EXITED)
+                self._watcher.join(timeout=self.terminate_timeout)
+                self.redis_client.delete(self.cancel_key)
+            except Exception as e:
+                logger.warning(f"Failed to release cancel watcher for {self.cancel_key}: {e}")
+        return return_code
+
+    def _watch_cancel(self):
+        """等待取消信号（阻塞读取，直到收到取消或退出标记）"""
+        try:
+            while True:
+                item = self.redis_client.blpop(self.cancel_key, timeout=0)
+                if not item:
+                    continue
+                value = item[1]
+                if isinstance(value, bytes):
+                    value = value.decode()
+                if value == _EXITED:
+                    return
+                if value == _CANCEL and self.process.poll() is None:
+                    self.cancelled = True
+                    self._terminate()
+                    return
+        except Exception as e:
+            logger.warning(f"Cancel watcher stopped for {self.cancel_key}: {e}")
+
+    def _terminate(self):
+        """先 SIGTERM，超时后 SIGKILL"""
+        logger.info(f"Cancel signal received, terminating process {self.process.pid}")
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=self.terminate_timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
@@ -0,0 +1,102 @@
+# /backend/app/tasks/work_dirs.py
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Set
+
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows：没有文件锁，清理时只跳过本进程正在使用的目录
+    fcntl = None
+
+LOCK_SUFFIX = ".lock"
+
+_lock = threading.Lock()
+_in_use: Set[str] = set()
+
+
+@contextmanager
+def hold(work_dir: str) -> Iterator[None]:
+    """
+    占用一次执行的工作目录：本进程登记 + 共享文件锁（<work_dir>.lock）
+    其他执行清理同一项目的旧目录时跳过被占用的目录
+    """
+    work_dir = os.path.abspath(work_dir)
+    os.makedirs(os.path.dirname(work_dir), exist_ok=True)
+    with _lock:
+        _in_use.add(work_dir)
+    lock_file = None
+    try:
+        if fcntl is not None:
+            lock_file = open(work_dir + LOCK_SUFFIX, "a")
+            fcntl.flock(lock_file, fcntl.LOCK_SH)
+        yield
+    finally:
+        if lock_file is not None:
+            lock_file.close()
+        with _lock:
+            _in_use.discard(work_dir)
+
+
+def prune(project_root: str, *, keep: int, max_age_seconds: float) -> List[str]:
+    """
+    清理一个项目的旧工作目录：按最近修改时间只保留 keep 个，且删除超过 max_age_seconds 未修改的目录；
+    正在使用的目录不删除
+    :return: 删除的目录
+    """
+    if not os.path.isdir(project_root):
+        return []
+    entries = []
+    for name in os.listdir(project_root):
+        path = os.path.abspath(os.path.join(project_root, name))
+        if not os.path.isdir(path):
+            continue
+        try:
+            entries.append((os.path.getmtime(path), path))
+        except OSError:
+            continue
+
+    cutoff = time.time() - max_age_seconds
+    removed = []
+    for rank, (mtime, path) in enumerate(sorted(entries, reverse=True)):
+        if rank < keep and mtime >= cutoff:
+            continue
+        with _lock:
+            if path in _in_use:
+                continue
+        lock_file = _try_lock_exclusive(path)
+        if fcntl is not None and lock_file is None:
+            continue  # 其他进程正在使用
+        try:
+            remove(path)
+        finally:
+            if lock_file is not None:
+                lock_file.close()
+        removed.append(path)
+    if removed:
+        logger.info(f"Removed {len(removed)} old work dir(s) under {project_root}")
+    return removed
+
+
+def remove(work_dir: str) -> None:
+    """删除工作目录及其锁文件"""
+    shutil.rmtree(work_dir, ignore_errors=True)
+    if os.path.exists(work_dir + LOCK_SUFFIX):
+        os.remove(work_dir + LOCK_SUFFIX)
+
+
+def _try_lock_exclusive(path: str):
+    """非阻塞获取目录的独占锁；没有 fcntl 或已被占用时返回 None"""
+    if fcntl is None:
+        return None
+    lock_file = open(path + LOCK_SUFFIX, "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
@@ -4,8 +4,12 @@ import socket
 import platform
 import requests
 from loguru import logger
-from celery.signals import worker_process_init, worker_shutdown, heartbeat_sent
+from celery.signals import celeryd_after_setup, worker_process_init, worker_shutdown, heartbeat_sent
+from celery.worker import state as worker_state
+from app.core.celery_app import worker_queue_names
 from app.core.config import settings
+from app.core.redis_client import get_redis
+from app.utils.tools import parse_tags
 
 
 # --- 获取本机信息 ---
@@ -35,6 +39,7 @@ PYTHON_VERSION = platform.python_version()
 
 # --- Redis 心跳键 ---
 HEARTBEAT_KEY = f"nodes:heartbeat:{HOSTNAME}"
+METRICS_KEY = f"nodes:metrics:{HOSTNAME}"
 HEARTBEAT_TTL = getattr(settings, 'NODE_HEARTBEAT_TTL', 60)  # 默认 60 秒
 
 # --- CrawloDeployer API 注册地址 ---
@@ -42,8 +47,63 @@ HEARTBEAT_TTL = getattr(settings, 'NODE_HEARTBEAT_TTL', 60)  # 默认 60 秒
 REGISTER_URL = f"{settings.CRAWL_PRO_API_URL.rstrip('/')}/api/v1/nodes/heartbeat"
 
 
+# --- 负载指标 ---
+def collect_load_metrics() -> dict:
+    """
+    采集本机负载：CPU 使用率（1 分钟平均负载 / 核心数，%）与内存使用量（GB）
+    取不到的指标直接省略（如 Windows 无 getloadavg、非 Linux 无 /proc/meminfo）
+    """
+    metrics = {}
+    try:
+        load_1m = os.getloadavg()[0]
+        metrics["cpu_usage"] = round(min(load_1m / (os.cpu_count() or 1) * 100, 100.0), 2)
+    except (AttributeError, OSError):
+        pass
+    try:
+        meminfo = {}
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                key, value = line.split(":", 1)
+                meminfo[key] = int(value.split()[0])  # kB
+        used_kb = meminfo["MemTotal"] - meminfo.get("MemAvailable", meminfo.get("MemFree", 0))
+        metrics["memory_usage"] = round(used_kb / 1024 / 1024, 2)
+    except (OSError, KeyError, ValueError):
+        pass
+    return metrics
+
+
+def publish_heartbeat(include_running: bool = True) -> None:
+    """
+    心跳键与负载指标在同一个 pipeline 中写入，只需一次往返
+    :param include_running: 是否上报正在执行的任务数（只有 Worker 主进程掌握该数据）
+    """
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.set(HEARTBEAT_KEY, "1", ex=HEARTBEAT_TTL)
+    metrics = collect_load_metrics()
+    if include_running:
+        metrics["running"] = len(worker_state.active_requests)
+    if metrics:
+        pipe.hset(METRICS_KEY, mapping=metrics)
+        pipe.expire(METRICS_KEY, HEARTBEAT_TTL)
+    pipe.execute()
+
+
 # --- 信号处理 ---
 
+@celeryd_after_setup.connect
+def worker_queue_setup_handler(sender, instance, **kwargs):
+    """
+    Worker 主进程完成初始化后订阅专属队列（队列不存在时自动声明）
+    - node.<hostname>：调度器把指定到本节点的任务投递到这里
+    - tag.<tag>：WORKER_TAGS 中的每个标签一个队列，由带该标签的 Worker 共同消费
+    消费者运行在主进程中，因此在这里订阅，而不是在 worker_process_init（子进程）中
+    """
+    tags = parse_tags(getattr(settings, 'WORKER_TAGS', ''))
+    for queue_name in worker_queue_names(HOSTNAME, tags):
+        instance.app.amqp.queues.select_add(queue_name)
+        logger.info(f"Worker {HOSTNAME} subscribed to queue: {queue_name}")
+
+
 @worker_process_init.connect
 def worker_process_init_handler(**kwargs):
     """
@@ -55,9 +115,7 @@ def worker_process_init_handler(**kwargs):
 
     # 1. 向 Redis 上报心跳
     try:
-        from redis import from_url
-        redis_client = from_url(settings.REDIS_URL, decode_responses=True)
-        redis_client.set(HEARTBEAT_KEY, "1", ex=HEARTBEAT_TTL)
+        publish_heartbeat(include_running=False)
         logger.info(f"Heartbeat key set in Redis: {HEARTBEAT_KEY}")
     except Exception as e:
         logger.warning(f"Failed to connect to Redis: {e}")
@@ -73,7 +131,7 @@ def worker_process_init_handler(**kwargs):
                 "os_version": WORKER_OS_VERSION,
                 "python_version": PYTHON_VERSION,
                 "version": getattr(settings, 'WORKER_VERSION', '1.0.0'),
-                "cpu_cores": platform.processor(),  # 简单标识
+                "cpu_cores": os.cpu_count(),
                 "memory_gb": getattr(settings, 'WORKER_MEMORY_GB', None),
                 "tags": getattr(settings, 'WORKER_TAGS', ''),
                 "max_concurrency": getattr(settings, 'WORKER_CONCURRENCY', 4)
@@ -95,9 +153,7 @@ def heartbeat_sent_handler(**kwargs):
     用于维持 Redis 心跳键的存活
     """
     try:
-        from redis import from_url
-        redis_client = from_url(settings.REDIS_URL, decode_responses=True)
-        redis_client.set(HEARTBEAT_KEY, "1", ex=HEARTBEAT_TTL)
+        publish_heartbeat()
         logger.debug(f"Heartbeat updated for {HOSTNAME}")
     except Exception as e:
         logger.warning(f"Heartbeat update failed: {e}")
@@ -112,9 +168,7 @@ def worker_shutdown_handler(**kwargs):
 
     # 1. 清理 Redis 心跳
     try:
-        from redis import from_url
-        redis_client = from_url(settings.REDIS_URL, decode_responses=True)
-        redis_client.delete(HEARTBEAT_KEY)
+        get_redis().delete(HEARTBEAT_KEY, METRICS_KEY)
         logger.info(f"Heartbeat key deleted: {HEARTBEAT_KEY}")
     except Exception as e:
         logger.warning(f"Failed to delete heartbeat key: {e}")
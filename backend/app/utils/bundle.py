@@ -0,0 +1,162 @@
+# /app/utils/bundle.py
+"""
+项目部署包（bundle）
+
+把项目目录打包为确定性的 tar.gz：文件按路径排序，时间戳 / 属主清零，权限只保留可执行位，
+相同内容无论何时、在哪台机器上打包都得到相同的哈希。
+哈希取未压缩 tar 流的 SHA-256（与压缩库版本无关），同时作为包的版本号和文件名。
+
+打包时跳过版本库、虚拟环境和缓存目录（IGNORED_DIRS，以及任何包含 pyvenv.cfg 的目录）。
+"""
+import gzip
+import hashlib
+import os
+import shutil
+import stat
+import tarfile
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, List, Optional
+
+IGNORED_DIRS = frozenset({
+    ".git", ".hg", ".svn",
+    "__pycache__", ".pytest_cache", ".mypy_cache", ".ruff_cache", ".tox",
+    ".venv", "venv", "env", "node_modules", ".idea", ".vscode",
+})
+IGNORED_SUFFIXES = (".pyc", ".pyo")
+BUNDLE_SUFFIX = ".tar.gz"
+HASH_LENGTH = 64
+
+
+@dataclass
+class BundleInfo:
+    hash: str
+    path: str  # 包文件的绝对路径
+    size: int  # 压缩后的字节数
+    file_count: int
+
+
+def is_valid_hash(value: str) -> bool:
+    return len(value) == HASH_LENGTH and all(c in "0123456789abcdef" for c in value)
+
+
+def bundle_path(bundles_dir: str, bundle_hash: str) -> str:
+    return os.path.join(bundles_dir, bundle_hash + BUNDLE_SUFFIX)
+
+
+def iter_bundle_files(project_dir: str) -> List[str]:
+    """需要打包的文件（相对路径，'/' 分隔，已排序）；不跟随符号链接"""
+    files = []
+    for root, dirs, filenames in os.walk(project_dir):
+        dirs[:] = [
+            d for d in dirs
+            if d not in IGNORED_DIRS and not os.path.exists(os.path.join(root, d, "pyvenv.cfg"))
+        ]
+        for filename in filenames:
+            if filename.endswith(IGNORED_SUFFIXES):
+                continue
+            full_path = os.path.join(root, filename)
+            if os.path.islink(full_path) or not os.path.isfile(full_path):
+                continue
+            files.append(os.path.relpath(full_path, project_dir).replace(os.sep, "/"))
+    return sorted(files)
+
+
+class _HashingWriter:
+    """写入下游文件的同时计算 SHA-256"""
+
+    def __init__(self, fileobj: BinaryIO):
+        self.fileobj = fileobj
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data: bytes) -> int:
+        self.sha256.update(data)
+        return self.fileobj.write(data)
+
+
+def _tar_info(project_dir: str, name: str) -> tarfile.TarInfo:
+    st = os.stat(os.path.join(project_dir, name))
+    info = tarfile.TarInfo(name)
+    info.size = st.st_size
+    info.mode = 0o755 if st.st_mode & stat.S_IXUSR else 0o644
+    info.mtime = 0
+    info.uid = info.gid = 0
+    info.uname = info.gname = ""
+    return info
+
+
+def build_bundle(project_dir: str, bundles_dir: str) -> BundleInfo:
+    """
+    打包项目目录，写入 bundles_dir/<hash>.tar.gz
+    内容未变化时包文件已存在，直接复用（只在临时文件上重新计算一次哈希，并刷新包文件的修改时间）
+    """
+    if not os.path.isdir(project_dir):
+        raise FileNotFoundError(f"Project directory not found: {project_dir}")
+    os.makedirs(bundles_dir, exist_ok=True)
+
+    files = iter_bundle_files(project_dir)
+    fd, tmp_path = tempfile.mkstemp(dir=bundles_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as gz:
+                writer = _HashingWriter(gz)
+                with tarfile.open(fileobj=writer, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+                    for name in files:
+                        with open(os.path.join(project_dir, name), "rb") as f:
+                            tar.addfile(_tar_info(project_dir, name), f)
+        bundle_hash = writer.sha256.hexdigest()
+        path = bundle_path(bundles_dir, bundle_hash)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            os.utime(path)  # 记为最近一次打包，清理旧包时按修改时间保留最近的版本
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return BundleInfo(hash=bundle_hash, path=path, size=os.path.getsize(path), file_count=len(files))
+
+
+def _safe_members(tar: tarfile.TarFile, dest_dir: str) -> Iterator[tarfile.TarInfo]:
+    """只解压普通文件和目录，拒绝绝对路径和 .. 跳出目标目录"""
+    dest = os.path.realpath(dest_dir)
+    for member in tar:
+        target = os.path.realpath(os.path.join(dest, member.name))
+        if not (member.isfile() or member.isdir()) or os.path.commonpath([dest, target]) != dest:
+            raise ValueError(f"Unsafe path in bundle: {member.name}")
+        yield member
+
+
+def extract_bundle(fileobj: BinaryIO, dest_dir: str, expected_hash: Optional[str] = None) -> int:
+    """
+    解压包到 dest_dir，边解压边校验内容哈希
+    :return: 解压出的文件总字节数
+    :raises ValueError: 哈希不匹配或包含不安全的路径
+    """
+    sha256 = hashlib.sha256()
+
+    class _HashingReader:
+        def read(self, size: int = -1) -> bytes:
+            data = gz.read(size)
+            sha256.update(data)
+            return data
+
+    total = 0
+    with gzip.GzipFile(fileobj=fileobj, mode="rb") as gz:
+        with tarfile.open(fileobj=_HashingReader(), mode="r|") as tar:
+            for member in _safe_members(tar, dest_dir):
+                tar.extract(member, dest_dir, set_attrs=False)
+                if member.isfile():
+                    os.chmod(os.path.join(dest_dir, member.name), member.mode)
+                    total += member.size
+        # tar 流末尾的填充块也计入哈希
+        shutil.copyfileobj(_HashingReader(), _Discard())
+    if expected_hash is not None and sha256.hexdigest() != expected_hash:
+        raise ValueError(f"Bundle hash mismatch: expected {expected_hash}, got {sha256.hexdigest()}")
+    return total
+
+
+class _Discard:
+    def write(self, data: bytes) -> int:
+        return len(data)
@@ -0,0 +1,105 @@
+# /app/utils/keyset.py
+"""
+键集（游标）分页
+
+按 (排序列, id) 倒序翻页，下一页的条件是 (排序列, id) < 上一页最后一行。
+配合 (过滤列, 排序列, id) 复合索引，无论翻到第几页都只扫描 limit 行，
+不像 OFFSET 那样先扫描再丢弃前面所有的行。
+
+排序列允许为空（例如还在排队的执行没有 start_time）。MySQL / SQLite 倒序时 NULL 排在最后，
+所以先翻完非空部分，再按 id 倒序翻 NULL 部分；两段各自都是索引范围扫描。
+"""
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, List, Mapping, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import ColumnElement, Select
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+@dataclass
+class Cursor:
+    value: Any  # 上一页最后一行的排序列值
+    id: int  # 上一页最后一行的 id
+
+
+def encode_cursor(value: Any, id: int) -> str:
+    """编码为不透明的游标字符串（URL 安全）"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Cursor:
+    """
+    解析游标字符串
+    :raises ValueError: 游标格式不正确
+    """
+    try:
+        value, id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        return Cursor(value=value, id=int(id))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
+
+
+def keyset_statements(
+    stmt: Select,
+    *,
+    sort_column: ColumnElement,
+    id_column: ColumnElement,
+    cursor: Optional[Cursor],
+    limit: int,
+    nullable: bool,
+) -> List[Select]:
+    """
+    生成一页数据的查询语句（1 或 2 条），每条多取 1 行用于判断是否还有下一页
+    调用方依次执行，凑够 limit + 1 行即可停止
+    """
+    fetch = limit + 1
+    statements = []
+    if cursor is None or cursor.value is not None:
+        condition = sort_column.isnot(None) if nullable else None
+        if cursor is not None:
+            after = or_(
+                sort_column < cursor.value,
+                and_(sort_column == cursor.value, id_column < cursor.id)
+            )
+            condition = after if condition is None else and_(condition, after)
+        page = stmt if condition is None else stmt.where(condition)
+        statements.append(page.order_by(sort_column.desc(), id_column.desc()).limit(fetch))
+    if nullable:
+        condition = sort_column.is_(None)
+        if cursor is not None and cursor.value is None:
+            condition = and_(condition, id_column < cursor.id)
+        statements.append(stmt.where(condition).order_by(id_column.desc()).limit(fetch))
+    return statements
+
+
+def keyset_order_by(sort_column: ColumnElement, id_column: ColumnElement, *, nullable: bool) -> List[ColumnElement]:
+    """
+    与 keyset_statements 翻页顺序一致的 ORDER BY，供兼容旧客户端的 OFFSET 分页使用：
+    先是非空部分按 (排序列, id) 倒序，再是 NULL 部分按 id 倒序
+    """
+    order = [sort_column.desc(), id_column.desc()]
+    if nullable:
+        order.insert(0, sort_column.is_(None))
+    return order
+
+
+def _get(row: Any, key: str) -> Any:
+    return row[key] if isinstance(row, Mapping) else getattr(row, key)
+
+
+def build_page(rows: List[Any], *, limit: int, sort_key: str) -> Tuple[List[Any], Optional[str]]:
+    """截取一页数据，还有下一页时返回指向本页最后一行的游标"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(_get(rows[-1], sort_key), _get(rows[-1], "id"))
@@ -0,0 +1,251 @@
+# /app/utils/log_store.py
+"""
+运行日志压缩存储
+
+每次执行的日志归档为一个文件（按 run_id 命名），格式：
+
+    [压缩块 0][压缩块 1]...[索引 JSON][8 字节索引长度][4 字节魔数 CPLG]
+
+- 原始日志按固定大小（LOG_STORE_CHUNK_SIZE）切块，每块独立压缩
+- 索引记录每块的原始偏移和压缩后的位置，读取任意字节范围只需解压涉及的块
+- 优先使用 zstd（需安装 zstandard），未安装时退回标准库 zlib；编码方式记录在索引中
+- Worker 先归档到本地的待上传目录（outgoing/），再上传到主服务的日志存储（LogStoreImport 校验后落盘）
+"""
+import bisect
+import json
+import os
+import struct
+import tempfile
+import zlib
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # 未安装 zstandard 时使用 zlib
+    zstandard = None
+
+from app.core.config import settings
+from app.utils.run_logs import trim_log_tail
+
+MAGIC = b"CPLG"
+FOOTER = struct.Struct("<Q4s")
+CODEC_ZSTD = "zstd"
+CODEC_ZLIB = "zlib"
+OUTGOING_DIR = "outgoing"
+
+
+def get_store_path(run_id: int) -> str:
+    """日志归档路径（相对 LOG_STORE_DIR），按 run_id 分散到 256 个子目录"""
+    return os.path.join(f"{run_id % 256:02x}", f"{run_id}.log.z")
+
+
+def get_outgoing_path(run_id: int) -> str:
+    """Worker 上待上传的日志归档路径（相对 LOG_STORE_DIR），与主服务同机部署时也不会与正式归档冲突"""
+    return os.path.join(OUTGOING_DIR, f"{run_id}.log.z")
+
+
+def _full_path(store_path: str) -> str:
+    return os.path.join(settings.LOG_STORE_DIR, store_path)
+
+
+def _compressor(codec: str, level: int):
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=level).compress
+    return lambda data: zlib.compress(data, level)
+
+
+def _decompressor(codec: str):
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Log archive is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress
+    return zlib.decompress
+
+
+class LogStoreWriter:
+    """流式写入日志归档，内存占用不超过一个块"""
+
+    def __init__(self, store_path: str, *, chunk_size: Optional[int] = None, level: Optional[int] = None):
+        self.store_path = store_path
+        self.chunk_size = chunk_size or settings.LOG_STORE_CHUNK_SIZE
+        self.codec = CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+        default_level = 3 if self.codec == CODEC_ZSTD else 6
+        self._compress = _compressor(self.codec, level or default_level)
+        self._buffer = bytearray()
+        self._chunks: List[Tuple[int, int, int]] = []  # (原始偏移, 压缩偏移, 压缩长度)
+        self._raw_size = 0
+        self._written = 0
+
+        full_path = _full_path(store_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        self._tmp_path = full_path + ".tmp"
+        self._full_path = full_path
+        self._file = open(self._tmp_path, "wb")
+
+    def write(self, data: bytes) -> None:
+        self._buffer.extend(data)
+        while len(self._buffer) >= self.chunk_size:
+            self._flush_chunk(bytes(self._buffer[:self.chunk_size]))
+            del self._buffer[:self.chunk_size]
+
+    def _flush_chunk(self, raw: bytes) -> None:
+        compressed = self._compress(raw)
+        self._chunks.append((self._raw_size, self._written, len(compressed)))
+        self._file.write(compressed)
+        self._raw_size += len(raw)
+        self._written += len(compressed)
+
+    def close(self) -> int:
+        """写入索引并原子地替换为正式文件，返回原始日志字节数"""
+        if self._buffer:
+            self._flush_chunk(bytes(self._buffer))
+            self._buffer.clear()
+        index = json.dumps({
+            "codec": self.codec,
+            "chunk_size": self.chunk_size,
+            "size": self._raw_size,
+            "chunks": self._chunks,
+        }).encode("utf-8")
+        self._file.write(index)
+        self._file.write(FOOTER.pack(len(index), MAGIC))
+        self._file.close()
+        os.replace(self._tmp_path, self._full_path)
+        return self._raw_size
+
+    def abort(self) -> None:
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+def archive_log_file(log_file: str, store_path: str) -> int:
+    """把原始日志文件流式压缩进日志存储，返回原始字节数"""
+    writer = LogStoreWriter(store_path)
+    try:
+        with open(log_file, "rb") as f:
+            while True:
+                block = f.read(writer.chunk_size)
+                if not block:
+                    break
+                writer.write(block)
+    except Exception:
+        writer.abort()
+        raise
+    return writer.close()
+
+
+def _read_index(f, name: str) -> dict:
+    """读取归档末尾的索引；不是日志归档时抛出 ValueError"""
+    f.seek(0, os.SEEK_END)
+    if f.tell() < FOOTER.size:
+        raise ValueError(f"Not a log archive: {name}")
+    f.seek(-FOOTER.size, os.SEEK_END)
+    index_length, magic = FOOTER.unpack(f.read(FOOTER.size))
+    if magic != MAGIC or index_length > f.tell() - FOOTER.size:
+        raise ValueError(f"Not a log archive: {name}")
+    f.seek(-(FOOTER.size + index_length), os.SEEK_END)
+    return json.loads(f.read(index_length))
+
+
+class LogStoreImport:
+    """
+    接收上传的日志归档（主服务）：写入临时文件，校验格式后原子替换为正式文件
+    """
+
+    def __init__(self, store_path: str):
+        self.store_path = store_path
+        self._full_path = _full_path(store_path)
+        os.makedirs(os.path.dirname(self._full_path), exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(dir=os.path.dirname(self._full_path), suffix=".tmp")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+
+    def commit(self) -> int:
+        """
+        校验并保存归档，返回原始日志字节数
+        :raises ValueError: 上传的内容不是完整的日志归档
+        """
+        self._file.close()
+        try:
+            with open(self._tmp_path, "rb") as f:
+                index = _read_index(f, self.store_path)
+            size = index["size"]
+            _decompressor(index["codec"])
+        except (ValueError, KeyError, TypeError, RuntimeError) as e:
+            os.remove(self._tmp_path)
+            raise ValueError(f"Invalid log archive {self.store_path}: {e}") from e
+        os.replace(self._tmp_path, self._full_path)
+        return size
+
+    def abort(self) -> None:
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class LogStoreReader:
+    """按字节范围读取日志归档"""
+
+    def __init__(self, store_path: str):
+        self._file = open(_full_path(store_path), "rb")
+        try:
+            index = _read_index(self._file, store_path)
+        except Exception:
+            self._file.close()
+            raise
+        self.size: int = index["size"]
+        self._decompress = _decompressor(index["codec"])
+        self._chunks: List[List[int]] = index["chunks"]
+        self._raw_offsets = [chunk[0] for chunk in self._chunks]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def iter_range(self, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """逐块产出 [start, end) 范围内的原始字节，只解压涉及的块"""
+        end = self.size if end is None else min(end, self.size)
+        start = max(start, 0)
+        if start >= end:
+            return
+        index = max(bisect.bisect_right(self._raw_offsets, start) - 1, 0)
+        while index < len(self._chunks) and self._chunks[index][0] < end:
+            raw_offset, compressed_offset, compressed_length = self._chunks[index]
+            self._file.seek(compressed_offset)
+            raw = self._decompress(self._file.read(compressed_length))
+            yield raw[max(start - raw_offset, 0):end - raw_offset]
+            index += 1
+
+    def read_range(self, start: int = 0, end: Optional[int] = None) -> bytes:
+        return b"".join(self.iter_range(start, end))
+
+    def read_tail(self, lines: int = 100, max_bytes: int = 65535) -> str:
+        """读取末尾 N 行（最多 max_bytes 字节）"""
+        return trim_log_tail(self.read_range(max(self.size - max_bytes, 0), self.size), lines)
+
+
+def store_exists(store_path: Optional[str]) -> bool:
+    return bool(store_path) and os.path.exists(_full_path(store_path))
+
+
+def move(src_store_path: str, dst_store_path: str) -> None:
+    """在日志存储内移动归档（例如上传失败时把待上传的归档转为本地正式归档）"""
+    dst = _full_path(dst_store_path)
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    os.replace(_full_path(src_store_path), dst)
+
+
+def open_archive(store_path: str):
+    """以二进制方式打开归档文件（上传用）"""
+    return open(_full_path(store_path), "rb")
+
+
+def remove(store_path: str) -> None:
+    os.remove(_full_path(store_path))
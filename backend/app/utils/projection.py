@@ -0,0 +1,50 @@
+# /app/utils/projection.py
+"""
+列表接口的字段投影
+
+列表页只需要少量列时，直接 SELECT 这些列并把结果行编码为 JSON，
+不加载完整 ORM 对象，也不为每一行构造 Pydantic 模型。
+"""
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+SUMMARY_VIEW = "summary"
+
+
+def parse_fields(
+    fields: Optional[str],
+    view: Optional[str],
+    *,
+    allowed: Iterable[str],
+    summary: Sequence[str],
+) -> Optional[List[str]]:
+    """
+    解析 `fields`（逗号分隔）/ `view=summary` 查询参数
+    :return: 需要查询的列名（总是包含 id）；返回 None 表示按完整对象返回
+    :raises ValueError: 包含不允许的字段
+    """
+    if fields:
+        names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+        unknown = [name for name in names if name not in set(allowed)]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        if "id" not in names:
+            names.insert(0, "id")
+        return names
+    if view == SUMMARY_VIEW:
+        return list(summary)
+    return None
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def encode_rows(rows: Iterable[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    """把 SELECT 列的结果行转换为可直接 JSON 序列化的字典"""
+    return [{key: _jsonable(value) for key, value in row.items()} for row in rows]
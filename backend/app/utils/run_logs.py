@@ -0,0 +1,69 @@
+# /app/utils/run_logs.py
+import os
+
+from app.core.config import settings
+
+
+def get_run_log_path(project_name: str, entrypoint: str, celery_task_id: str) -> str:
+    """
+    返回某次任务执行的原始日志文件路径
+    Worker 写入与 API 读取（实时跟踪）共用同一规则
+    """
+    log_filename = f"{project_name}_{os.path.splitext(entrypoint)[0]}_{celery_task_id}.log"
+    return os.path.join(settings.LOGS_DIR, "runs", log_filename)
+
+
+def get_run_work_dir(project_name: str, celery_task_id: str) -> str:
+    """返回某次任务执行的工作目录（项目包复制到这里后运行，输出文件保留在其中）"""
+    return os.path.join(settings.RUN_WORK_DIR, project_name, celery_task_id)
+
+
+def read_log_tail(log_file: str, lines: int = 100, max_bytes: int = 65535, block_size: int = 64 * 1024) -> str:
+    """
+    读取日志末尾 N 行，限制总长度
+    从文件末尾按块向前读取，内存占用只与 max_bytes 有关，与日志文件大小无关
+    """
+    try:
+        with open(log_file, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            # 末尾换行符不算作一行的分隔
+            wanted = lines + 1
+            blocks = []
+            collected = 0
+            newlines = 0
+            while position > 0 and collected < max_bytes and newlines < wanted:
+                read_size = min(block_size, position, max_bytes - collected)
+                position -= read_size
+                f.seek(position)
+                block = f.read(read_size)
+                blocks.append(block)
+                collected += len(block)
+                newlines += block.count(b"\n")
+    except Exception as e:
+        return f"[Log read failed: {str(e)}]"
+
+    return trim_log_tail(b"".join(reversed(blocks)), lines)
+
+
+def trim_log_tail(data: bytes, lines: int) -> str:
+    """
+    把日志末尾的一段字节整理为最后 N 行文本（原始日志文件与日志归档共用）
+    末尾换行符不算作一行的分隔；按字节截断可能切断多字节字符，丢弃开头残缺的 UTF-8 续字节
+    """
+    if data.endswith(b"\n"):
+        body, trailer = data[:-1], b"\n"
+    else:
+        body, trailer = data, b""
+    parts = body.split(b"\n")
+    if len(parts) > lines:
+        body = b"\n".join(parts[-lines:])
+    body = body.lstrip(bytes(range(0x80, 0xC0)))
+    return (body + trailer).decode("utf-8", errors="replace")
+
+
+def read_log_range(log_file: str, start: int, end: int) -> bytes:
+    """读取原始日志文件 [start, end) 字节范围"""
+    with open(log_file, "rb") as f:
+        f.seek(max(start, 0))
+        return f.read(max(end - start, 0))
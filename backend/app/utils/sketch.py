@@ -0,0 +1,73 @@
+# /backend/app/utils/sketch.py
+import math
+from typing import Any, Dict, Optional
+
+
+class DurationSketch:
+    """
+    可合并的分位数草图（对数分桶直方图）
+
+    数值 v 落入编号为 ceil(log_gamma(v)) 的桶，每个桶只记录计数：
+    - 任意分位数的相对误差不超过 (gamma - 1) / (gamma + 1)，gamma=1.05 时约 2.4%
+    - 两个草图按桶相加即可合并，可以增量维护，也可以跨任务汇总
+    - 桶数量只与数值范围有关（0.001 秒 ~ 30 天约 350 个桶），与样本数无关
+    """
+
+    GAMMA = 1.05
+    MIN_VALUE = 0.001  # 小于该值的样本计入零桶
+
+    def __init__(self, buckets: Optional[Dict[int, int]] = None, zero_count: int = 0):
+        self.buckets: Dict[int, int] = dict(buckets or {})
+        self.zero_count = zero_count
+        self._log_gamma = math.log(self.GAMMA)
+
+    @property
+    def count(self) -> int:
+        return self.zero_count + sum(self.buckets.values())
+
+    def add(self, value: float, count: int = 1) -> None:
+        """加入一个样本"""
+        if value is None or count <= 0:
+            return
+        if value < self.MIN_VALUE:
+            self.zero_count += count
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def merge(self, other: "DurationSketch") -> None:
+        """合并另一个草图"""
+        self.zero_count += other.zero_count
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """估算分位数（q ∈ [0, 1]），没有样本时返回 None"""
+        total = self.count
+        if total == 0:
+            return None
+        rank = q * (total - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                # 桶 (gamma^(i-1), gamma^i] 的代表值，使相对误差最小
+                return 2 * self.GAMMA ** index / (self.GAMMA + 1)
+        return 2 * self.GAMMA ** max(self.buckets) / (self.GAMMA + 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为 JSON 兼容的字典（JSON 对象的键必须是字符串）"""
+        return {
+            "gamma": self.GAMMA,
+            "zero": self.zero_count,
+            "buckets": {str(index): count for index, count in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "DurationSketch":
+        if not data:
+            return cls()
+        buckets = {int(index): int(count) for index, count in (data.get("buckets") or {}).items()}
+        return cls(buckets=buckets, zero_count=int(data.get("zero", 0)))
@@ -1,6 +1,7 @@
 import os
 import sys
 import subprocess
+from typing import Optional, Set
 
 def install_requirements(project_dir: str):
     req_file = os.path.join(project_dir, "requirements.txt")
@@ -17,4 +18,11 @@ def detect_entrypoint(project_dir: str) -> str:
     for f in candidates:
         if os.path.exists(os.path.join(project_dir, f)):
             return f
-    return "run.py"  # 默认
\ No newline at end of file
+    return "run.py"  # 默认
+
+
+def parse_tags(tags: Optional[str]) -> Set[str]:
+    """把逗号分隔的标签字符串解析为集合（去空格、忽略空值、统一小写）"""
+    if not tags:
+        return set()
+    return {tag.strip().lower() for tag in tags.split(",") if tag.strip()}
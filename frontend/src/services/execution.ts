@@ -1,7 +1,9 @@
 // /Users/oscar/projects/CrawloDeployer/frontend/src/services/execution.ts
 
 import request from '../utils/request'
+import api from './api'
 import {
+  Execution,
   ExecutionDetail,
   ExecutionResult,
   ExecutionMetrics,
@@ -9,10 +11,11 @@ import {
 } from '../types/execution'
 
 export class ExecutionService {
-  // 获取执行记录列表
+  // 获取执行记录列表（游标分页：cursor 取自上一页响应头 X-Next-Cursor）
   static async getList(params: {
     page: number
     size: number
+    cursor?: string
     taskName?: string
     status?: string
     startDate?: string
@@ -20,11 +23,15 @@ export class ExecutionService {
     sortBy?: string
     sortOrder?: string
   }) {
-    // 转换参数以匹配后端API
+    // 转换参数以匹配后端API：有游标时按游标翻页，没有游标时（如直接跳到某一页）才退回到 skip
     const backendParams: any = {
-      skip: (params.page - 1) * params.size,
       limit: params.size
     };
+    if (params.cursor) {
+      backendParams.cursor = params.cursor;
+    } else if (params.page > 1) {
+      backendParams.skip = (params.page - 1) * params.size;
+    }
     
     // 添加其他过滤参数
     if (params.taskName) backendParams.task_name = params.taskName;
@@ -32,15 +39,17 @@ export class ExecutionService {
     if (params.startDate) backendParams.start_date = params.startDate;
     if (params.endDate) backendParams.end_date = params.endDate;
     
-    return request<{
-      data: ExecutionListResponse
-      message: string
-      success: boolean
-    }>({
-      url: '/task-runs',
-      method: 'GET',
-      params: backendParams
-    })
+    const response = await api.get<Execution[]>('/task-runs/', { params: backendParams })
+    const items = response.data
+    const nextCursor: string | null = response.headers['x-next-cursor'] ?? null
+    const data: ExecutionListResponse = {
+      items,
+      // 游标分页没有总数：还有下一页时多算一条，让分页组件显示下一页
+      total: (params.page - 1) * params.size + items.length + (nextCursor ? 1 : 0),
+      page: params.page,
+      size: params.size
+    }
+    return { data, nextCursor, message: '', success: true }
   }
 
   // 获取执行记录详情
@@ -2,14 +2,15 @@ import api from './api'
 import type { Node, NodeCreate, NodeUpdate } from '../types/node'
 import type { ApiResponse } from '../types/api'
 
-// 获取节点列表
+// 获取节点列表（游标分页：cursor 取自上一页响应头 X-Next-Cursor，skip 仅用于直接跳页）
 export const getNodes = async (params?: {
+  cursor?: string
   skip?: number
   limit?: number
-}): Promise<ApiResponse<Node[]>> => {
+}): Promise<ApiResponse<Node[]> & { nextCursor: string | null }> => {
   // 修复API路径，确保使用正确的路径
   const response = await api.get<ApiResponse<Node[]>>('/nodes/', { params })
-  return response.data
+  return { ...response.data, nextCursor: response.headers['x-next-cursor'] ?? null }
 }
 
 // 获取节点详情
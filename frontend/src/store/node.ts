@@ -18,6 +18,7 @@ interface NodeState {
   nodes: Node[]
   currentNode: Node | null
   nodeCount: number
+  nextCursor: string | null  // 下一页的游标，没有下一页时为 null
   loading: boolean
   error: string | null
 }
@@ -27,6 +28,7 @@ export const useNodeStore = defineStore('node', {
     nodes: [],
     currentNode: null,
     nodeCount: 0,
+    nextCursor: null,
     loading: false,
     error: null
   }),
@@ -37,7 +39,7 @@ export const useNodeStore = defineStore('node', {
   },
 
   actions: {
-    async fetchNodes(params?: { skip?: number; limit?: number }) {
+    async fetchNodes(params?: { cursor?: string; skip?: number; limit?: number }) {
       this.loading = true
       this.error = null
       try {
@@ -45,6 +47,7 @@ export const useNodeStore = defineStore('node', {
         if (response.success) {
           this.nodes = response.data || []
           this.nodeCount = response.total || this.nodes.length
+          this.nextCursor = response.nextCursor
         } else {
           this.error = response.message || '获取节点列表失败'
           ElMessage.error(this.error || '获取节点列表失败')
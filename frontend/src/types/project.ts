@@ -10,6 +10,7 @@ export interface Project {
   entrypoint: string
   has_requirements: boolean
   env_template: Record<string, string> | null
+  bundle_hash: string | null
 }
 
 export interface ProjectCreate {
@@ -22,6 +22,7 @@ export interface Task {
   target_node_id: number | null
   target_node_ids: number[] | null
   target_node_tags: string | null
+  target_tag_match: 'ANY' | 'ALL'
 }
 
 export interface TaskCreate {
@@ -42,6 +43,7 @@ export interface TaskCreate {
   target_node_id?: number
   target_node_ids?: number[]
   target_node_tags?: string
+  target_tag_match?: 'ANY' | 'ALL'
 }
 
 export interface TaskUpdate {
@@ -64,6 +66,7 @@ export interface TaskUpdate {
   target_node_id?: number | null
   target_node_ids?: number[] | null
   target_node_tags?: string | null
+  target_tag_match?: 'ANY' | 'ALL'
 }
 
 export interface TaskRun {
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+项目部署包增量传输基准测试
+
+生成一个大型爬虫项目（默认 300 MB：几千个源码文件 + 若干大数据文件），节点缓存中已有旧版本，
+对每种单文件修改（包括大文件整体重写）分别测量：服务端打包与生成清单的耗时、节点组装新版本的耗时、
+实际传输的字节数，并与下载完整部署包比较。
+片段直接从本地对象目录读取（不经过网络），传输字节数即请求的文件内容字节数。
+
+用法：
+    python tests/scripts/bench_delta_sync.py [--size-mb 300] [--small-files 2000]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# 添加项目路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+from app.utils import delta
+from app.utils.bundle import build_bundle, extract_bundle
+
+LARGE_FILES = 4  # 大数据文件个数
+SMALL_FILE_BYTES = 4096
+
+
+def make_project(root: str, size_mb: int, small_files: int):
+    """源码文件为文本，大文件为随机数据（不可压缩，完整包的大小接近原始大小）"""
+    for i in range(small_files):
+        path = os.path.join(root, "spiders", f"mod_{i // 100}", f"spider_{i}.py")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        line = f"# spider {i}\nSTART_URLS = ['https://example.com/{i}/page']\n"
+        with open(path, "w") as f:
+            f.write(line * (SMALL_FILE_BYTES // len(line)))
+    large_bytes = max(size_mb * 1024 ** 2 - small_files * SMALL_FILE_BYTES, LARGE_FILES) // LARGE_FILES
+    os.makedirs(os.path.join(root, "data"), exist_ok=True)
+    for i in range(LARGE_FILES):
+        with open(os.path.join(root, "data", f"part_{i}.bin"), "wb") as f:
+            remaining = large_bytes
+            while remaining > 0:
+                chunk = os.urandom(min(remaining, 16 * 1024 ** 2))
+                f.write(chunk)
+                remaining -= len(chunk)
+
+
+def edit_small_file(root: str):
+    with open(os.path.join(root, "spiders", "mod_0", "spider_7.py"), "a") as f:
+        f.write("CONCURRENCY = 16\n")
+
+
+def overwrite_in_large_file(root: str):
+    path = os.path.join(root, "data", "part_1.bin")
+    with open(path, "r+b") as f:
+        f.seek(os.path.getsize(path) // 2)
+        f.write(b"\0" * 100)
+
+
+def insert_into_large_file(root: str):
+    """在大文件中间插入 1 KB，其后的内容整体偏移（按固定位置分块无法复用）"""
+    path = os.path.join(root, "data", "part_2.bin")
+    middle = os.path.getsize(path) // 2
+    tmp_path = path + ".tmp"
+    with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+        dst.write(src.read(middle))
+        dst.write(os.urandom(1024))
+        shutil.copyfileobj(src, dst, 16 * 1024 ** 2)
+    os.replace(tmp_path, path)
+
+
+def rewrite_large_file(root: str):
+    """大文件整体重写（例如重新生成的数据文件）：没有可复用的块，扫描不应比下载慢"""
+    path = os.path.join(root, "data", "part_3.bin")
+    size = os.path.getsize(path)
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining > 0:
+            chunk = os.urandom(min(remaining, 16 * 1024 ** 2))
+            f.write(chunk)
+            remaining -= len(chunk)
+
+
+SCENARIOS = [
+    ("修改一个源码文件", edit_small_file),
+    ("大文件中间覆盖 100 B", overwrite_in_large_file),
+    ("大文件中间插入 1 KB", insert_into_large_file),
+    ("大文件整体重写", rewrite_large_file),
+]
+
+
+def publish(project_dir: str, bundles_dir: str):
+    started = time.perf_counter()
+    bundle = build_bundle(project_dir, bundles_dir)
+    manifest = delta.ensure_manifest(bundles_dir, bundle.hash, project="bench")
+    return bundle, manifest, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="部署包增量传输基准测试")
+    parser.add_argument("--size-mb", type=int, default=300, help="项目大小（MB）")
+    parser.add_argument("--small-files", type=int, default=2000, help="源码文件个数")
+    opts = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base_dir = os.path.join(temp_dir, "v1")
+        bundles_dir = os.path.join(temp_dir, "bundles")
+        objects_root = delta.objects_dir(bundles_dir)
+        print(f"生成 {opts.size_mb} MB 的测试项目（{opts.small_files} 个源码文件 + {LARGE_FILES} 个大文件）...")
+        make_project(base_dir, opts.size_mb, opts.small_files)
+        v1, v1_manifest, elapsed = publish(base_dir, bundles_dir)
+        print(f"旧版本打包: {elapsed:.2f}s，完整包 {v1.size / 1024 ** 2:.1f} MB")
+
+        # 节点缓存中的旧版本
+        basis_dir = os.path.join(temp_dir, "node_v1")
+        with open(v1.path, "rb") as f:
+            extract_bundle(f, basis_dir, expected_hash=v1.hash)
+        basis_files = {entry["sha256"]: entry["path"] for entry in v1_manifest["files"]}
+
+        def read_ranges(ranges):
+            return delta.iter_object_ranges(objects_root, ranges)
+
+        print()
+        print(f"{'场景':<22} {'服务端打包(s)':>12} {'节点组装(s)':>10} {'传输量':>12} {'完整包':>10} {'节省':>8}")
+        failed = False
+        for name, edit in SCENARIOS:
+            project_dir = os.path.join(temp_dir, "v2")
+            shutil.copytree(base_dir, project_dir)
+            edit(project_dir)
+            v2, manifest, publish_seconds = publish(project_dir, bundles_dir)
+
+            dest_dir = os.path.join(temp_dir, "node_v2")
+            started = time.perf_counter()
+            stats = delta.apply_delta(manifest, dest_dir, read_ranges, basis_dir=basis_dir, basis_files=basis_files)
+            apply_seconds = time.perf_counter() - started
+
+            # 组装结果与新版本的包完全一致
+            if build_bundle(dest_dir, os.path.join(temp_dir, "check")).hash != v2.hash:
+                print(f"✗ {name}: 组装结果与新版本不一致")
+                failed = True
+            print(f"{name:<22} {publish_seconds:>12.2f} {apply_seconds:>10.2f} "
+                  f"{stats.fetched_bytes / 1024:>10.1f}KB {v2.size / 1024 ** 2:>8.1f}MB "
+                  f"{100 * (1 - stats.fetched_bytes / v2.size):>7.2f}%")
+            for path in (project_dir, dest_dir, os.path.join(temp_dir, "check")):
+                shutil.rmtree(path, ignore_errors=True)
+
+    if failed:
+        sys.exit(1)
+    print("✓ 所有场景组装结果正确")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+运行日志尾部读取基准测试
+
+生成一个 5 GB 的日志文件（稀疏文件 + 末尾写入真实日志行，不占用实际磁盘空间），
+测量 read_log_tail 的耗时和内存峰值，验证内存占用与日志文件大小无关。
+
+用法：
+    python tests/scripts/bench_log_tail.py [--size-gb 5] [--lines 100]
+"""
+
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# 添加项目路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+from app.utils.run_logs import read_log_tail
+
+TAIL_LINES = 10000  # 文件末尾写入的真实日志行数
+
+
+def make_log(path: str, size_bytes: int):
+    """创建指定大小的日志文件：前部为稀疏空洞，末尾为真实日志行"""
+    tail = "".join(
+        f"2025-01-01 00:00:00 [scrapy.core.engine] INFO: Crawled (200) <GET https://example.com/{i}>\n"
+        for i in range(TAIL_LINES)
+    ).encode("utf-8")
+    with open(path, "wb") as f:
+        f.truncate(size_bytes - len(tail))
+        f.seek(size_bytes - len(tail))
+        f.write(tail)
+
+
+def bench(path: str, lines: int) -> dict:
+    tracemalloc.start()
+    started = time.perf_counter()
+    content = read_log_tail(path, lines=lines)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "elapsed_ms": elapsed * 1000,
+        "peak_kb": peak / 1024,
+        "returned_lines": content.count("\n"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="read_log_tail 基准测试")
+    parser.add_argument("--size-gb", type=float, default=5.0, help="最大日志文件大小（GB）")
+    parser.add_argument("--lines", type=int, default=100, help="读取末尾行数")
+    opts = parser.parse_args()
+
+    print("=== read_log_tail 基准测试 ===")
+    print(f"{'文件大小':>12} {'耗时(ms)':>10} {'内存峰值(KB)':>14} {'返回行数':>8}")
+
+    peaks = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        log_file = os.path.join(temp_dir, "run.log")
+        sizes = [10 * 1024 ** 2, 1024 ** 3, int(opts.size_gb * 1024 ** 3)]
+        for size in sizes:
+            make_log(log_file, size)
+            result = bench(log_file, opts.lines)
+            peaks.append(result["peak_kb"])
+            print(f"{size / 1024 ** 3:>10.2f}GB {result['elapsed_ms']:>10.2f} "
+                  f"{result['peak_kb']:>14.1f} {result['returned_lines']:>8}")
+            os.remove(log_file)
+
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"进程常驻内存峰值: {max_rss_mb:.1f} MB")
+
+    # 内存峰值不随文件大小增长（允许少量波动）
+    if max(peaks) > min(peaks) * 1.5 + 64:
+        print("✗ 内存占用随文件大小增长")
+        sys.exit(1)
+    print("✓ 内存占用与日志文件大小无关")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+任务统计接口基准测试
+
+向数据库写入 100 万条执行记录（每条带 2 KB 日志），然后测量：
+- 首次读取时根据执行记录重建统计汇总（cp_task_run_stats）的耗时（一次性）
+- 单任务统计 get_summary 与用户概览统计 get_overview_async（只读汇总行）的耗时，目标为 100 ms 以内
+
+默认使用临时 SQLite 文件；传入 --url 可以对 MySQL 测试库压测（会建表并写入数据，请勿指向生产库）。
+
+用法：
+    python tests/scripts/bench_task_stats.py [--runs 1000000] [--tasks 10] [--url mysql+pymysql://...]
+"""
+
+import argparse
+import asyncio
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+# 添加项目路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from app import models
+from app.crud import task_run_stats as crud_task_run_stats
+from app.db.base_class import Base
+from app.models.task_run import TaskRunStatus
+
+BATCH_SIZE = 20000
+LOG_OUTPUT = ("2025-09-01 12:00:00 [INFO] scraped item\n" * 50)[:2048]
+STATUSES = [TaskRunStatus.SUCCESS] * 8 + [TaskRunStatus.FAILURE] + [TaskRunStatus.RUNNING]
+
+# 同步驱动 -> 异步驱动
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "mysql+pymysql": "mysql+asyncmy",
+    "mysql": "mysql+asyncmy",
+}
+
+
+def to_async_url(url: str) -> str:
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
+
+def seed(engine, runs: int, tasks: int) -> int:
+    """写入一个用户、一个项目、若干任务和 runs 条执行记录，返回用户 ID"""
+    with Session(engine) as db:
+        user = models.User(username=f"bench_{int(time.time())}", email=None, hashed_password="x", is_active=True)
+        db.add(user)
+        db.flush()
+        project = models.Project(name=f"bench_project_{user.id}", owner_id=user.id)
+        db.add(project)
+        db.flush()
+        task_objs = [
+            models.Task(name=f"bench_task_{i}", project_id=project.id, spider_name="bench")
+            for i in range(tasks)
+        ]
+        db.add_all(task_objs)
+        db.commit()
+        task_ids = [t.id for t in task_objs]
+        user_id = user.id
+
+    started = datetime.datetime(2025, 1, 1)
+    with engine.begin() as conn:
+        for offset in range(0, runs, BATCH_SIZE):
+            rows = []
+            for i in range(offset, min(offset + BATCH_SIZE, runs)):
+                start_time = started + datetime.timedelta(seconds=i)
+                rows.append({
+                    "task_id": task_ids[i % tasks],
+                    "celery_task_id": f"bench-{user_id}-{i}",
+                    "status": random.choice(STATUSES),
+                    "start_time": start_time,
+                    "end_time": start_time + datetime.timedelta(seconds=random.randint(5, 600)),
+                    "log_output": LOG_OUTPUT,
+                    "worker_node": "bench-node",
+                    "manually_stopped": False,
+                })
+            conn.execute(insert(models.TaskRun), rows)
+            print(f"\r已写入 {min(offset + BATCH_SIZE, runs):,} / {runs:,}", end="", flush=True)
+    print()
+    return user_id
+
+
+def timed(fn, repeat: int):
+    """执行 repeat 次，返回 (最后一次结果, 各次耗时毫秒)"""
+    result, durations = None, []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        durations.append((time.perf_counter() - started) * 1000)
+    return result, sorted(durations)
+
+
+def report(name: str, durations):
+    p50 = durations[len(durations) // 2]
+    p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+    verdict = "✅" if p95 < 100 else "❌"
+    print(f"{verdict} {name}: p50 {p50:.1f} ms, p95 {p95:.1f} ms, max {durations[-1]:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="任务统计接口基准测试")
+    parser.add_argument("--runs", type=int, default=1_000_000, help="写入的执行记录数")
+    parser.add_argument("--tasks", type=int, default=10, help="执行记录平均分布到的任务数")
+    parser.add_argument("--repeat", type=int, default=20, help="每个查询重复执行次数")
+    parser.add_argument("--url", default=None, help="同步数据库连接地址（默认临时 SQLite 文件）")
+    opts = parser.parse_args()
+
+    url = opts.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_task_stats.db')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+
+    print(f"数据库: {engine.url.render_as_string(hide_password=True)}")
+    print(f"写入 {opts.runs:,} 条执行记录，分布在 {opts.tasks} 个任务上")
+    print("=" * 50)
+    seed_started = time.time()
+    user_id = seed(engine, opts.runs, opts.tasks)
+    print(f"写入耗时: {time.time() - seed_started:.1f} s")
+
+    with Session(engine) as db:
+        task_ids = db.scalars(
+            select(models.Task.id).join(models.Project).where(models.Project.owner_id == user_id)
+        ).all()
+        rebuild_started = time.perf_counter()
+        crud_task_run_stats.rebuild(db, task_ids=task_ids)
+        db.commit()
+        print(f"重建统计汇总耗时（一次性）: {(time.perf_counter() - rebuild_started) * 1000:.0f} ms")
+
+        stats, durations = timed(lambda: crud_task_run_stats.get_summary(db, task_id=task_ids[0]), opts.repeat)
+    print(f"单任务统计结果: {stats}")
+    report("get_summary", durations)
+
+    async def run_overview():
+        async_engine = create_async_engine(to_async_url(url))
+        try:
+            async with AsyncSession(async_engine) as db:
+                result, samples = None, []
+                for _ in range(opts.repeat):
+                    started = time.perf_counter()
+                    result = await crud_task_run_stats.get_overview_async(db, owner_id=user_id)
+                    samples.append((time.perf_counter() - started) * 1000)
+                return result, sorted(samples)
+        finally:
+            await async_engine.dispose()
+
+    overview, durations = asyncio.run(run_overview())
+    print(f"概览统计结果: {overview}")
+    report("get_overview_async", durations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# 配置
+BASE_URL = "http://127.0.0.1:8000/api/v1"
+NUM_NODES = 2000
+HEARTBEAT_INTERVAL = 30  # 心跳间隔（秒）
+DURATION = 120  # 压测时长（秒）
+
+NODE_OSES = ["LINUX", "WINDOWS", "MACOS"]
+NODE_TAGS = ["gpu", "proxy", "chrome", "high-memory", "ssd", ""]
+
+
+def build_node(index):
+    """生成一个模拟节点的静态信息（压测期间保持不变）"""
+    return {
+        "hostname": f"load-node-{index:05d}",
+        "ip": f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}",
+        "os": random.choice(NODE_OSES),
+        "tags": random.choice(NODE_TAGS),
+        "max_concurrency": random.choice([2, 4, 8]),
+        "physical_host_name": f"host-{index // 10:04d}",
+    }
+
+
+def send_heartbeat(session, node):
+    """发送心跳请求，返回 (是否成功, 耗时毫秒)"""
+    started = time.perf_counter()
+    try:
+        response = session.post(f"{BASE_URL}/nodes/heartbeat", data=node, timeout=10)
+        ok = response.status_code == 200 and response.json().get("success")
+    except Exception:
+        ok = False
+    return ok, (time.perf_counter() - started) * 1000
+
+
+def simulate_node(node, deadline, interval, stats):
+    """模拟单个节点：随机错开首次心跳，然后按固定间隔上报"""
+    session = requests.Session()
+    time.sleep(random.uniform(0, interval))
+    while time.time() < deadline:
+        ok, latency = send_heartbeat(session, node)
+        stats.append((ok, latency))
+        time.sleep(interval)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(len(values) * pct / 100))
+    return values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="节点心跳写入压测")
+    parser.add_argument("--nodes", type=int, default=NUM_NODES, help="模拟节点数量")
+    parser.add_argument("--interval", type=float, default=HEARTBEAT_INTERVAL, help="心跳间隔（秒）")
+    parser.add_argument("--duration", type=float, default=DURATION, help="压测时长（秒）")
+    opts = parser.parse_args()
+
+    print(f"开始压测：{opts.nodes} 个节点，心跳间隔 {opts.interval} 秒，持续 {opts.duration} 秒")
+    print(f"预期请求速率: {opts.nodes / opts.interval:.1f} req/s")
+    print("=" * 50)
+
+    nodes = [build_node(i) for i in range(opts.nodes)]
+    deadline = time.time() + opts.duration
+    stats = []
+
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=opts.nodes) as executor:
+        for node in nodes:
+            executor.submit(simulate_node, node, deadline, opts.interval, stats)
+    elapsed = time.time() - started
+
+    latencies = [latency for _, latency in stats]
+    failures = len([ok for ok, _ in stats if not ok])
+    print(f"总请求数: {len(stats)}，失败: {failures}，实际速率: {len(stats) / elapsed:.1f} req/s")
+    print(f"延迟 p50: {percentile(latencies, 50):.1f} ms  "
+          f"p95: {percentile(latencies, 95):.1f} ms  "
+          f"p99: {percentile(latencies, 99):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
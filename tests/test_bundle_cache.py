@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+测试项目部署包：确定性打包、Worker 本地缓存命中与 LRU 淘汰
+"""
+
+import sys
+import os
+import io
+import time
+
+import pytest
+from fastapi import HTTPException
+
+# 添加项目路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.core.config import settings
+from app.deps import verify_worker_token
+from app.tasks import bundle_cache as bundle_cache_module
+from app.tasks import work_dirs
+from app.tasks.bundle_cache import BundleCache, remove_unchanged
+from app.utils.bundle import build_bundle, extract_bundle
+
+
+def _make_project(root, files):
+    for name, content in files.items():
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+    return root
+
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "BUNDLES_DIR", str(tmp_path / "bundles"))
+    monkeypatch.setattr(settings, "BUNDLE_CACHE_DIR", str(tmp_path / "cache"))
+    return tmp_path
+
+
+def test_bundle_is_deterministic_and_skips_ignored_dirs(dirs):
+    files = {"run.py": "print(1)\n", "spiders/books.py": "x = 1\n"}
+    a = _make_project(str(dirs / "a"), files)
+    b = _make_project(str(dirs / "b"), {
+        **files,
+        ".git/HEAD": "ref: refs/heads/main\n",
+        "__pycache__/run.cpython-311.pyc": "",
+        "env/pyvenv.cfg": "home = /usr\n",
+        "env/lib/site.py": "",
+    })
+    os.utime(os.path.join(b, "run.py"), (0, 0))
+
+    first, second = build_bundle(a, settings.BUNDLES_DIR), build_bundle(b, settings.BUNDLES_DIR)
+    assert first.hash == second.hash
+    assert second.file_count == 2
+
+    out = dirs / "out"
+    with open(first.path, "rb") as f:
+        assert extract_bundle(f, str(out), expected_hash=first.hash) == len("print(1)\n") + len("x = 1\n")
+    assert (out / "spiders" / "books.py").read_text() == "x = 1\n"
+
+    with open(first.path, "rb") as f, pytest.raises(ValueError):
+        extract_bundle(io.BytesIO(f.read()), str(dirs / "out2"), expected_hash="0" * 64)
+
+
+def test_cache_hit_does_not_fetch_again(dirs, monkeypatch):
+    bundle = build_bundle(_make_project(str(dirs / "p"), {"run.py": "print(1)\n"}), settings.BUNDLES_DIR)
+    cache = BundleCache()
+    fetch = cache._fetch
+    calls = []
+    monkeypatch.setattr(cache, "_fetch", lambda h: calls.append(h) or fetch(h))
+
+    with cache.use(bundle.hash) as project_dir:
+        assert open(os.path.join(project_dir, "run.py")).read() == "print(1)\n"
+    with cache.use(bundle.hash):
+        pass
+    assert calls == [bundle.hash]
+
+
+def test_checkout_keeps_outputs_out_of_the_cache(dirs):
+    bundle = build_bundle(
+        _make_project(str(dirs / "p"), {"run.py": "print(1)\n", "conf/settings.py": "A = 1\n"}),
+        settings.BUNDLES_DIR
+    )
+    cache = BundleCache()
+    work_dir = str(dirs / "run" / "c1")
+    snapshot = cache.checkout(bundle.hash, work_dir)
+    assert set(snapshot) == {"run.py", os.path.join("conf", "settings.py")}
+
+    # 脚本在工作目录中写输出、修改项目文件
+    (dirs / "run" / "c1" / "items.json").write_text("[]")
+    (dirs / "run" / "c1" / "run.py").write_text("print(2)\n")
+    remove_unchanged(work_dir, snapshot)
+
+    assert sorted(os.listdir(work_dir)) == ["items.json", "run.py"]
+    assert open(os.path.join(cache.path(bundle.hash), "run.py")).read() == "print(1)\n"
+    assert not os.path.exists(os.path.join(cache.path(bundle.hash), "items.json"))
+
+
+def test_prunes_old_work_dirs_but_not_ones_in_use(tmp_path):
+    root = tmp_path / "run_work" / "demo"
+    now = time.time()
+    for i, age_hours in enumerate([0, 1, 2, 3, 100]):
+        (root / f"c{i}").mkdir(parents=True)
+        (root / f"c{i}" / "items.json").write_text("[]")
+        os.utime(root / f"c{i}", (now - age_hours * 3600, now - age_hours * 3600))
+
+    with work_dirs.hold(str(root / "c3")):
+        removed = work_dirs.prune(str(root), keep=2, max_age_seconds=48 * 3600)
+
+    # 最近的两个保留，正在执行的 c3 不删除
+    assert sorted(os.path.basename(path) for path in removed) == ["c2", "c4"]
+    assert sorted(p for p in os.listdir(root) if not p.endswith(".lock")) == ["c0", "c1", "c3"]
+
+    removed = work_dirs.prune(str(root), keep=5, max_age_seconds=2.5 * 3600)
+    assert [os.path.basename(path) for path in removed] == ["c3"]
+    assert sorted(os.listdir(root)) == ["c0", "c1"]
+
+
+def test_evicts_least_recently_used_but_not_bundles_in_use(dirs, monkeypatch):
+    monkeypatch.setattr(settings, "BUNDLE_CACHE_MAX_MB", 1.5)
+    cache = BundleCache()
+    hashes = []
+    for i in range(3):
+        project = _make_project(str(dirs / f"p{i}"), {"data.bin": str(i) * (1024 * 1024)})
+        hashes.append(build_bundle(project, settings.BUNDLES_DIR).hash)
+
+    cache.ensure(hashes[0])
+    os.utime(cache._meta_path(hashes[0]), (time.time() - 10, time.time() - 10))
+    with cache.use(hashes[0]):
+        # 最旧的包正在使用、新拉取的包需要保留，暂时超出上限
+        cache.ensure(hashes[1])
+        assert cache.contains(hashes[0]) and cache.contains(hashes[1])
+
+    cache.ensure(hashes[2])
+    assert [h for h in hashes if cache.contains(h)] == [hashes[2]]
+    assert not os.path.exists(cache.path(hashes[0]))
+
+
+def test_fetch_from_server_when_not_available_locally(dirs, monkeypatch):
+    bundle = build_bundle(_make_project(str(dirs / "p"), {"run.py": "print(1)\n"}), settings.BUNDLES_DIR)
+    monkeypatch.setattr(settings, "BUNDLES_DIR", str(dirs / "elsewhere"))
+    requested = []
+
+    class FakeResponse:
+        def __init__(self, url):
+            requested.append(url)
+            self.url = url
+            self.raw = open(bundle.path, "rb")
+
+        def raise_for_status(self):
+            if self.url.endswith("/manifest"):
+                raise bundle_cache_module.requests.HTTPError("404 Not Found")
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self.raw.close()
+
+    monkeypatch.setattr(bundle_cache_module.requests, "get", lambda url, **kwargs: FakeResponse(url))
+    cache = BundleCache()
+    cache.ensure(bundle.hash)
+
+    # 主服务没有清单时退回下载完整的包
+    assert requested[-1].endswith(f"/projects/bundles/{bundle.hash}")
+    assert os.path.isfile(os.path.join(cache.path(bundle.hash), "run.py"))
+
+
+def test_bundle_download_requires_worker_token(monkeypatch):
+    # 未配置令牌时一律拒绝
+    monkeypatch.setattr(settings, "WORKER_API_TOKEN", None)
+    with pytest.raises(HTTPException):
+        verify_worker_token("anything")
+
+    monkeypatch.setattr(settings, "WORKER_API_TOKEN", "worker-secret")
+    for token in (None, "", "wrong"):
+        with pytest.raises(HTTPException) as exc_info:
+            verify_worker_token(token)
+        assert exc_info.value.status_code == 401
+    verify_worker_token("worker-secret")
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+测试项目部署包增量传输：滚动校验找块、节点以旧版本为基准只拉取变化的文件和块
+"""
+
+import sys
+import os
+import hashlib
+import io
+import json
+import random
+
+import pytest
+
+# 添加项目路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.core.config import settings
+from app.tasks import bundle_cache as bundle_cache_module
+from app.tasks.bundle_cache import BundleCache
+from app.utils import delta
+from app.utils.bundle import build_bundle
+
+BLOCK_SIZE = 1024
+
+
+def _random_bytes(size, seed):
+    return random.Random(seed).randbytes(size)
+
+
+def _write(root, files):
+    for name, content in files.items():
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+    return root
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _signatures(data):
+    return [
+        [delta.weak_checksum(data[i:i + BLOCK_SIZE]), delta.strong_checksum(data[i:i + BLOCK_SIZE])]
+        for i in range(0, len(data), BLOCK_SIZE)
+    ]
+
+
+@pytest.mark.parametrize("edit", ["insert", "replace", "delete"])
+def test_match_blocks_after_edit(tmp_path, edit):
+    old = _random_bytes(64 * BLOCK_SIZE + 100, seed=1)
+    at = 10 * BLOCK_SIZE + 300
+    new = {
+        "insert": old[:at] + b"x" * 77 + old[at:],
+        "replace": old[:at] + b"x" * 77 + old[at + 77:],
+        "delete": old[:at] + old[at + 77:],
+    }[edit]
+    (tmp_path / "old.bin").write_bytes(old)
+
+    found = delta.match_blocks(str(tmp_path / "old.bin"), _signatures(new), BLOCK_SIZE, len(new))
+
+    block_count = -(-len(new) // BLOCK_SIZE)
+    assert block_count - len(found) <= 2  # 只有被编辑的块（可能跨两块）需要拉取
+    for index, offset in found.items():
+        length = min(BLOCK_SIZE, len(new) - index * BLOCK_SIZE)
+        assert old[offset:offset + length] == new[index * BLOCK_SIZE:index * BLOCK_SIZE + length]
+
+
+def test_match_blocks_stops_sliding_when_budget_runs_out(tmp_path):
+    old = _random_bytes(64 * BLOCK_SIZE, seed=3)
+    # 前半部分整体重写，后半部分只在原位置覆盖了几个字节（块边界不变）
+    new = _random_bytes(32 * BLOCK_SIZE, seed=4) + old[32 * BLOCK_SIZE:40 * BLOCK_SIZE] + b"x" * 10 \
+        + old[40 * BLOCK_SIZE + 10:]
+    (tmp_path / "old.bin").write_bytes(old)
+
+    found = delta.match_blocks(
+        str(tmp_path / "old.bin"), _signatures(new), BLOCK_SIZE, len(new), max_slide_bytes=2 * BLOCK_SIZE + 100
+    )
+
+    # 预算用完后仍按块边界找到未变化的块
+    assert set(found) == set(range(32, 64)) - {40}
+    assert all(offset == index * BLOCK_SIZE for index, offset in found.items())
+
+
+def test_modified_basis_file_is_fetched_again(tmp_path):
+    server_dir = str(tmp_path / "server")
+    files = {"run.py": b"print(1)\n", "spiders/books.py": b"x = 1\n" * 100}
+    bundle = build_bundle(_write(str(tmp_path / "v1"), files), server_dir)
+    manifest = delta.ensure_manifest(server_dir, bundle.hash, project="books")
+
+    # 节点上的旧版本被改动过，大小不变
+    basis_dir = _write(str(tmp_path / "basis"), {**files, "spiders/books.py": b"y = 2\n" * 100})
+    basis_files = {entry["sha256"]: entry["path"] for entry in manifest["files"]}
+    root = delta.objects_dir(server_dir)
+    stats = delta.apply_delta(
+        manifest, str(tmp_path / "out"), lambda ranges: delta.iter_object_ranges(root, ranges),
+        basis_dir=basis_dir, basis_files=basis_files
+    )
+
+    assert (stats.reused_files, stats.fetched_files) == (1, 1)
+    assert (tmp_path / "out" / "spiders" / "books.py").read_bytes() == files["spiders/books.py"]
+
+
+def test_worker_fetches_only_changed_files_and_blocks(tmp_path, monkeypatch):
+    server_dir, project = str(tmp_path / "server"), "books"
+    monkeypatch.setattr(settings, "BUNDLES_DIR", server_dir)
+    monkeypatch.setattr(settings, "BUNDLE_CACHE_DIR", str(tmp_path / "cache"))
+    big = _random_bytes(200 * BLOCK_SIZE, seed=2)
+    files = {
+        "run.py": b"print(1)\n",
+        "spiders/books.py": b"x = 1\n" * 100,
+        "data/model.bin": big,
+    }
+
+    def publish(name, content):
+        bundle = build_bundle(_write(str(tmp_path / name), content), server_dir)
+        delta.ensure_manifest(server_dir, bundle.hash, project=project, block_size=BLOCK_SIZE, min_file_size=BLOCK_SIZE)
+        return bundle.hash
+
+    v1 = publish("v1", files)
+    v2 = publish("v2", {
+        **files,
+        "run.py": b"print(2)\n",
+        "data/model.bin": big[:5000] + b"new" + big[5000:],
+    })
+
+    # Worker 与主服务不在同一台机器：包只能通过 HTTP 接口获取
+    requested = []
+
+    class FakeResponse:
+        def __init__(self, body):
+            self.body = body
+            self.raw = io.BytesIO(body)
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return json.loads(self.body)
+
+        def iter_content(self, chunk_size):
+            return iter([self.body[i:i + chunk_size] for i in range(0, len(self.body), chunk_size)])
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            pass
+
+    def fake_get(url, **kwargs):
+        assert kwargs["headers"] == {"X-Worker-Token": "worker-secret"}
+        bundle_hash = url.split("/bundles/")[1].split("/")[0]
+        if url.endswith("/manifest"):
+            return FakeResponse(json.dumps(delta.load_manifest(server_dir, bundle_hash)).encode())
+        with open(os.path.join(server_dir, bundle_hash + ".tar.gz"), "rb") as f:
+            requested.append(("bundle", bundle_hash))
+            return FakeResponse(f.read())
+
+    def fake_post(url, **kwargs):
+        assert kwargs["headers"] == {"X-Worker-Token": "worker-secret"}
+        ranges = [tuple(r) for r in kwargs["json"]["ranges"]]
+        root = delta.objects_dir(server_dir)
+        delta.validate_ranges(root, ranges)
+        requested.append(("ranges", sum(length for _, _, length in ranges)))
+        return FakeResponse(b"".join(delta.iter_object_ranges(root, ranges)))
+
+    monkeypatch.setattr(settings, "BUNDLES_DIR", str(tmp_path / "not-on-this-node"))
+    monkeypatch.setattr(settings, "WORKER_API_TOKEN", "worker-secret")
+    monkeypatch.setattr(bundle_cache_module.requests, "get", fake_get)
+    monkeypatch.setattr(bundle_cache_module.requests, "post", fake_post)
+    cache = BundleCache()
+
+    cache.ensure(v1)
+    assert requested == [("bundle", v1)]
+    cache.ensure(v2)
+
+    # 只传输了 run.py 和 model.bin 中被插入内容的块
+    assert requested[1][0] == "ranges"
+    assert requested[1][1] <= len(b"print(2)\n") + 2 * BLOCK_SIZE
+    for name in ("run.py", "spiders/books.py", "data/model.bin"):
+        with open(os.path.join(tmp_path, "v2", name), "rb") as expected, \
+                open(os.path.join(cache.path(v2), name), "rb") as actual:
+            assert actual.read() == expected.read()
+    assert build_bundle(cache.path(v2), str(tmp_path / "check")).hash == v2
+
+
+def test_prune_keeps_recent_bundles_and_referenced_objects(tmp_path):
+    server_dir = str(tmp_path / "server")
+    hashes = []
+    for i in range(4):
+        bundle = build_bundle(_write(str(tmp_path / f"v{i}"), {
+            "run.py": b"print(1)\n",  # 各版本共用的对象
+            "version.txt": str(i).encode(),
+        }), server_dir)
+        delta.ensure_manifest(server_dir, bundle.hash, project="books")
+        os.utime(bundle.path, (1000 + i, 1000 + i))
+        hashes.append(bundle.hash)
+    other = build_bundle(_write(str(tmp_path / "other"), {"main.py": b"x\n"}), server_dir)
+    delta.ensure_manifest(server_dir, other.hash, project="other")
+    objects_root = delta.objects_dir(server_dir)
+    for dirpath, _, filenames in os.walk(objects_root):
+        for name in filenames:
+            os.utime(os.path.join(dirpath, name), (0, 0))
+
+    removed = delta.prune_bundles(server_dir, "books", keep=2, protected={hashes[0]})
+
+    # 最近的两个版本和受保护的包保留，其他项目不受影响
+    assert removed == [hashes[1]]
+    for bundle_hash in (hashes[0], hashes[2], hashes[3], other.hash):
+        assert delta.load_manifest(server_dir, bundle_hash) is not None
+    assert not os.path.exists(os.path.join(server_dir, hashes[1] + ".tar.gz"))
+    assert delta.load_manifest(server_dir, hashes[1]) is None
+    assert not os.path.exists(delta.object_path(objects_root, _sha256(b"1")))
+    for data in (b"print(1)\n", b"0", b"2", b"3", b"x\n"):
+        assert os.path.exists(delta.object_path(objects_root, _sha256(data)))
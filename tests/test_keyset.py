@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+测试键集（游标）分页：翻完所有页不重复、不遗漏，start_time 为空的执行排在最后
+"""
+
+import sys
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+# 添加项目路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import app.models  # noqa: F401  注册所有模型
+from app.crud import task_run as crud_task_run
+from app.db.base_class import Base
+from app.models.project import Project
+from app.models.task import Task
+from app.models.task_run import TaskRun, TaskRunStatus
+from app.models.user import User
+from app.utils.keyset import decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id=1, username="u", email="u@example.com", hashed_password="x"))
+        session.add(Project(id=1, name="p", owner_id=1))
+        session.add(Task(id=1, name="t", project_id=1, spider_name="s"))
+        for i in range(37):
+            session.add(TaskRun(
+                task_id=1,
+                celery_task_id=f"run-{i}",
+                status=TaskRunStatus.SUCCESS,
+                # 大量相同的 start_time，以及部分尚未开始（为空）的执行
+                start_time=None if i % 6 == 0 else datetime(2026, 1, 1, 0, i % 4),
+            ))
+        session.commit()
+        yield session
+
+
+def test_cursor_round_trip():
+    cursor = decode_cursor(encode_cursor(datetime(2026, 1, 1, 8, 30), 42))
+    assert (cursor.value, cursor.id) == (datetime(2026, 1, 1, 8, 30), 42)
+    assert decode_cursor(encode_cursor(None, 7)).value is None
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+@pytest.mark.parametrize("limit", [1, 5, 36, 37, 100])
+def test_pages_cover_all_rows_in_order(db, limit):
+    seen, cursor = [], None
+    while True:
+        rows, cursor = crud_task_run.get_page_by_task(db, task_id=1, cursor=cursor, limit=limit)
+        seen.extend(rows)
+        if cursor is None:
+            break
+
+    started = sorted((r for r in seen if r.start_time), key=lambda r: (r.start_time, r.id), reverse=True)
+    not_started = sorted((r for r in seen if not r.start_time), key=lambda r: r.id, reverse=True)
+    assert [r.id for r in seen] == [r.id for r in started + not_started]
+    assert len(seen) == 37
+
+
+def test_projected_page_includes_sort_column(db):
+    rows, cursor = crud_task_run.get_page_by_task(db, task_id=1, limit=3, fields=["status"])
+    assert set(rows[0]) == {"status", "start_time", "id"}
+    assert decode_cursor(cursor).id == rows[-1]["id"]
+
+
+def test_offset_pages_follow_cursor_order(db):
+    # 兼容旧客户端的 skip 分页与游标分页顺序一致，翻页不重复、不遗漏
+    rows, _ = crud_task_run.get_page(db, sort="start_time", limit=100)
+    offset_rows = [
+        row
+        for skip in range(0, 37, 5)
+        for row in crud_task_run.get_offset_page(db, sort="start_time", skip=skip, limit=5)
+    ]
+    assert [r.id for r in offset_rows] == [r.id for r in rows]
+    by_task = crud_task_run.get_multi_by_task(db, task_id=1, skip=5, limit=5)
+    assert [r.id for r in by_task] == [r.id for r in rows[5:10]]
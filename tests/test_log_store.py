@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+测试运行日志压缩存储（分块压缩 + 按字节范围读取）
+"""
+
+import asyncio
+import sys
+import os
+
+# 添加项目路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.core.config import settings
+from app.services.log_stream import stored_log_events
+from app.utils.log_store import LogStoreReader, LogStoreWriter, archive_log_file, get_store_path, store_exists
+
+
+def _content() -> bytes:
+    return "".join(f"第 {i} 行日志 item={i * 7}\n" for i in range(20000)).encode("utf-8")
+
+
+def test_archive_and_read_ranges(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "LOG_STORE_DIR", str(tmp_path / "store"))
+    monkeypatch.setattr(settings, "LOG_STORE_CHUNK_SIZE", 4096)
+    content = _content()
+    log_file = tmp_path / "run.log"
+    log_file.write_bytes(content)
+
+    store_path = get_store_path(12345)
+    assert archive_log_file(str(log_file), store_path) == len(content)
+    assert store_exists(store_path)
+
+    with LogStoreReader(store_path) as reader:
+        assert reader.size == len(content)
+        assert reader.read_range() == content
+        for start, end in [(0, 1), (4095, 4097), (10000, 30000), (len(content) - 5, len(content) + 100)]:
+            assert reader.read_range(start, end) == content[start:end]
+        assert reader.read_range(len(content), len(content) + 10) == b""
+        assert reader.read_tail(lines=2) == "第 19998 行日志 item=139986\n第 19999 行日志 item=139993\n"
+
+
+def test_empty_log(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "LOG_STORE_DIR", str(tmp_path / "store"))
+    writer = LogStoreWriter("empty.log.z")
+    assert writer.close() == 0
+
+    with LogStoreReader("empty.log.z") as reader:
+        assert reader.size == 0
+        assert reader.read_range() == b""
+        assert reader.read_tail() == ""
+
+
+def test_stored_log_events_resume_from_offset(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "LOG_STORE_DIR", str(tmp_path / "store"))
+    monkeypatch.setattr(settings, "LOG_STORE_CHUNK_SIZE", 1000)
+    content = _content()
+    content = content[:content.index(b"\n", 50000) + 1]
+    writer = LogStoreWriter("run.log.z")
+    writer.write(content)
+    writer.close()
+
+    async def collect(offset):
+        return [event async for event in stored_log_events("run.log.z", offset=offset)]
+
+    events = asyncio.run(collect(0))
+    assert events[-1] == "event: end\ndata: finished\n\n"
+    last_id = int(events[-2].split("\n")[0][len("id: "):])
+    assert last_id == len(content)
+
+    # 从中间某个事件的偏移量继续，拼接结果与原文一致
+    resume_at = int(events[len(events) // 2].split("\n")[0][len("id: "):])
+    resumed = asyncio.run(collect(resume_at))
+    data = "\n".join(
+        line[len("data: "):]
+        for event in resumed[:-1]
+        for line in event.strip("\n").split("\n")
+        if line.startswith("data: ")
+    )
+    assert data + "\n" == content[resume_at:].decode("utf-8")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+测试实时日志跟踪（SSE）：只推送完整的行、按偏移量 / Last-Event-ID 续传、归档后切换到 fallback
+"""
+
+import asyncio
+import sys
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+# 添加项目路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.services.log_stream import follow_run_log, format_sse
+
+FAST = {"poll_interval": 0.01, "status_check_interval": 0.01, "idle_timeout": 5}
+
+
+def _parse(events):
+    """[(事件 id, 事件类型, 数据)]"""
+    parsed = []
+    for event in events:
+        event_id = event_type = None
+        data = []
+        for line in event.strip("\n").split("\n"):
+            if line.startswith("id: "):
+                event_id = int(line[len("id: "):])
+            elif line.startswith("event: "):
+                event_type = line[len("event: "):]
+            elif line.startswith("data: "):
+                data.append(line[len("data: "):])
+        parsed.append((event_id, event_type, "\n".join(data)))
+    return parsed
+
+
+def _follow(log_file, is_finished, **kwargs):
+    async def collect():
+        return [event async for event in follow_run_log(str(log_file), is_finished=is_finished, **FAST, **kwargs)]
+    return _parse(asyncio.run(collect()))
+
+
+def test_partial_line_is_held_back_until_complete(tmp_path):
+    log_file = tmp_path / "run.log"
+    log_file.write_bytes(b"line 1\npart")
+    checks = []
+
+    async def is_finished():
+        checks.append(1)
+        if len(checks) == 1:
+            # 第一次检查时半行还没写完；随后写入剩余部分，任务结束
+            with open(log_file, "ab") as f:
+                f.write(b"ial\ntrailing")
+            return False
+        return True
+
+    events = _follow(log_file, is_finished)
+
+    assert events == [
+        (7, None, "line 1"),
+        (15, None, "partial"),
+        (23, None, "trailing"),  # 任务结束后推送残留的半行
+        (None, "end", "finished"),
+    ]
+
+
+def test_resume_from_offset(tmp_path):
+    log_file = tmp_path / "run.log"
+    log_file.write_bytes("第一行\n第二行\n第三行\n".encode("utf-8"))
+
+    async def is_finished():
+        return True
+
+    offset = len("第一行\n".encode("utf-8"))
+    events = _follow(log_file, is_finished, offset=offset)
+
+    assert events[0] == (log_file.stat().st_size, None, "第二行\n第三行")
+    assert events[-1] == (None, "end", "finished")
+
+
+def test_switches_to_fallback_after_log_is_archived(tmp_path):
+    log_file = tmp_path / "run.log"
+    fallback_offsets = []
+
+    async def is_finished():
+        return True
+
+    async def fallback(offset):
+        fallback_offsets.append(offset)
+        yield format_sse("from archive", event_id=offset + 1)
+        yield format_sse("finished", event="end")
+
+    # 订阅时原始日志已被 Worker 归档删除：从请求的偏移量开始读取归档
+    events = _follow(log_file, is_finished, offset=2, fallback=fallback)
+    assert fallback_offsets == [2]
+    assert events == [(3, None, "from archive"), (None, "end", "finished")]
+
+
+def test_open_log_is_read_to_the_end_after_archiving(tmp_path):
+    log_file = tmp_path / "run.log"
+    log_file.write_bytes(b"x\ny")
+
+    async def is_finished():
+        # Worker 结束并归档：原始日志被删除
+        if log_file.exists():
+            log_file.unlink()
+        return True
+
+    async def fallback(offset):
+        raise AssertionError("the open file handle should be read to the end")
+        yield
+
+    # 已打开的文件句柄在删除后仍可读完，包括没有换行的最后半行
+    events = _follow(log_file, is_finished, fallback=fallback)
+    assert events == [(2, None, "x"), (3, None, "y"), (None, "end", "finished")]
+
+
+def test_stream_endpoint_resumes_from_last_event_id(tmp_path, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    import app.models  # noqa: F401  注册所有模型
+    from app import deps
+    from app.api.v1.endpoints import task_runs
+    from app.core.config import settings
+    from app.db.base_class import Base
+    from app.models.project import Project
+    from app.models.task import Task
+    from app.models.task_run import TaskRun, TaskRunStatus
+    from app.models.user import User
+    from app.utils.run_logs import get_run_log_path
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'runs.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(User(id=1, username="u", email="u@example.com", hashed_password="x"))
+        db.add(Project(id=1, name="demo", owner_id=1))
+        db.add(Task(id=1, name="t", project_id=1, spider_name="s", entrypoint="run.py"))
+        db.add(TaskRun(id=1, task_id=1, celery_task_id="c1", status=TaskRunStatus.SUCCESS))
+        db.commit()
+    monkeypatch.setattr(settings, "LOGS_DIR", str(tmp_path / "logs"))
+    log_file = get_run_log_path("demo", "run.py", "c1")
+    os.makedirs(os.path.dirname(log_file))
+    with open(log_file, "wb") as f:
+        f.write(b"a\nb\nc\n")
+
+    def get_db():
+        with Session(engine) as db:
+            yield db
+
+    api = FastAPI()
+    api.include_router(task_runs.router, prefix="/task-runs")
+    api.dependency_overrides[deps.get_db] = get_db
+    api.dependency_overrides[deps.get_current_active_user] = lambda: User(id=1, username="u")
+    client = TestClient(api)
+
+    response = client.get("/task-runs/1/log/stream", headers={"Last-Event-ID": "2"}, params={"offset": 0})
+    events = _parse(event + "\n\n" for event in response.text.strip("\n").split("\n\n"))
+    assert events == [(6, None, "b\nc"), (None, "end", "finished")]
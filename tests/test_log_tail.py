@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+测试运行日志尾部读取（按块从文件末尾向前读取）
+"""
+
+import sys
+import os
+
+# 添加项目路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.utils.run_logs import read_log_tail
+
+
+def _write(path, content: bytes):
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def test_tail_returns_last_lines(tmp_path):
+    log_file = tmp_path / "run.log"
+    _write(log_file, b"".join(f"line {i}\n".encode() for i in range(1000)))
+
+    tail = read_log_tail(str(log_file), lines=3)
+    assert tail == "line 997\nline 998\nline 999\n"
+
+
+def test_tail_without_trailing_newline(tmp_path):
+    log_file = tmp_path / "run.log"
+    _write(log_file, b"a\nb\nc")
+
+    assert read_log_tail(str(log_file), lines=2) == "b\nc"
+    assert read_log_tail(str(log_file), lines=10) == "a\nb\nc"
+
+
+def test_tail_small_blocks_match_full_read(tmp_path):
+    log_file = tmp_path / "run.log"
+    content = "".join(f"第 {i} 行日志\n" for i in range(500))
+    _write(log_file, content.encode("utf-8"))
+
+    expected = "".join(content.splitlines(keepends=True)[-100:])
+    assert read_log_tail(str(log_file), block_size=7) == expected
+
+
+def test_tail_respects_max_bytes(tmp_path):
+    log_file = tmp_path / "run.log"
+    # 单行超长日志，不应整行读入内存
+    _write(log_file, "中".encode("utf-8") * 100000)
+
+    tail = read_log_tail(str(log_file), max_bytes=1000)
+    assert len(tail.encode("utf-8")) <= 1000
+    assert "�" not in tail
+
+
+def test_tail_missing_file(tmp_path):
+    tail = read_log_tail(str(tmp_path / "missing.log"))
+    assert tail.startswith("[Log read failed:")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+测试调度器目标节点查询：MULTIPLE 模式一条 IN 查询，在线节点集合缓存及其失效
+"""
+
+import sys
+import os
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+# 添加项目路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import app.models  # noqa: F401  注册所有模型
+from app.core.config import settings
+from app.db.base_class import Base
+from app.models.node import Node, NodeOS, NodeStatus
+from app.models.task import Task, TaskDistributionMode
+from app.services import heartbeat_buffer as heartbeat_buffer_module
+from app.services.heartbeat_buffer import HeartbeatBuffer
+from app.services.node_cache import online_node_cache
+from app.services.scheduler import scheduler_service
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        for i in range(1, 51):
+            db.add(Node(
+                id=i, hostname=f"node-{i}", os=NodeOS.LINUX,
+                status=NodeStatus.OFFLINE if i % 10 == 0 else NodeStatus.ONLINE
+            ))
+        db.commit()
+    monkeypatch.setattr(settings, "NODE_CACHE_TTL_SECONDS", 60)
+    online_node_cache.invalidate()
+    yield engine
+    online_node_cache.invalidate()
+
+
+def _count_selects(engine):
+    selects = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    return selects
+
+
+def _multiple_task():
+    # 倒序 + 重复的 ID：结果按给定顺序返回且去重
+    return Task(distribution_mode=TaskDistributionMode.MULTIPLE, target_node_ids=list(range(50, 0, -1)) + [1])
+
+
+def test_multiple_mode_single_query_and_cache(engine):
+    selects = _count_selects(engine)
+    with Session(engine) as db:
+        nodes = scheduler_service._get_target_nodes(db, _multiple_task())
+        assert len(selects) == 1
+        assert [n.id for n in nodes] == [i for i in range(50, 0, -1) if i % 10]
+
+        # 缓存命中：不再查询数据库
+        assert scheduler_service._get_target_nodes(db, _multiple_task()) == nodes
+        assert len(selects) == 1
+
+        online_node_cache.invalidate()
+        scheduler_service._get_target_nodes(db, _multiple_task())
+        assert len(selects) == 2
+
+
+def test_cache_disabled_with_zero_ttl(engine, monkeypatch):
+    monkeypatch.setattr(settings, "NODE_CACHE_TTL_SECONDS", 0)
+    selects = _count_selects(engine)
+    task = Task(distribution_mode=TaskDistributionMode.ANY)
+    with Session(engine) as db:
+        scheduler_service._get_target_nodes(db, task)
+        scheduler_service._get_target_nodes(db, task)
+    assert len(selects) == 2
+
+
+def test_heartbeat_revival_invalidates_cache(engine, monkeypatch):
+    monkeypatch.setattr(heartbeat_buffer_module, "engine", engine)
+    task = Task(distribution_mode=TaskDistributionMode.ANY)
+    with Session(engine) as db:
+        assert len(scheduler_service._get_target_nodes(db, task)) == 45
+
+    buffer = HeartbeatBuffer()
+    buffer._known_static = {f"node-{i}": {} for i in range(1, 51)}  # 静态信息未变化：只走 touch 路径
+
+    # 在线节点的普通心跳不影响缓存
+    buffer.submit("node-1")
+    buffer.flush()
+    with Session(engine) as db:
+        assert len(scheduler_service._get_target_nodes(db, task)) == 45
+
+    # 离线节点重新上线：缓存失效
+    buffer.submit("node-10")
+    buffer.flush()
+    with Session(engine) as db:
+        assert len(scheduler_service._get_target_nodes(db, task)) == 46
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+测试节点标签表：按集合语义匹配（ANY / ALL），随节点创建、修改和心跳落库同步维护
+"""
+
+import sys
+import os
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+# 添加项目路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import app.models  # noqa: F401  注册所有模型
+from app import crud
+from app.db.base_class import Base
+from app.models.node import NodeOS, NodeTag
+from app.schemas.node import NodeCreate, NodeUpdate
+from app.services import heartbeat_buffer as heartbeat_buffer_module
+from app.services.heartbeat_buffer import HeartbeatBuffer
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(heartbeat_buffer_module, "engine", engine)
+    buffer = HeartbeatBuffer()
+    for hostname, tags in [
+        ("gpu-node", "gpu,proxy"),
+        ("large-node", "GPU-large, proxy"),
+        ("proxy-node", "proxy"),
+        ("bare-node", None),
+    ]:
+        buffer.submit(hostname, os=NodeOS.LINUX, tags=tags)
+    buffer.flush()
+    return engine
+
+
+def _hostnames(db, tags, match_all):
+    return sorted(n.hostname for n in crud.node.get_online_by_tags(db, tags=tags, match_all=match_all))
+
+
+def test_tag_matching_uses_set_semantics(engine):
+    with Session(engine) as db:
+        # gpu 不再误匹配 gpu-large
+        assert _hostnames(db, {"gpu"}, match_all=True) == ["gpu-node"]
+        assert _hostnames(db, {"gpu-large"}, match_all=True) == ["large-node"]
+        assert _hostnames(db, {"gpu", "proxy"}, match_all=True) == ["gpu-node"]
+        assert _hostnames(db, {"gpu", "gpu-large"}, match_all=False) == ["gpu-node", "large-node"]
+        assert _hostnames(db, {"proxy"}, match_all=False) == ["gpu-node", "large-node", "proxy-node"]
+        assert _hostnames(db, set(), match_all=False) == []
+
+
+def test_tags_follow_node_changes(engine):
+    with Session(engine) as db:
+        node = crud.node.get_by_hostname(db, hostname="bare-node")
+        crud.node.update(db, db_obj=node, obj_in=NodeUpdate(tags="chrome"))
+        assert _hostnames(db, {"chrome"}, match_all=True) == ["bare-node"]
+
+        node = crud.node.create(db, obj_in=NodeCreate(hostname="new-node", os=NodeOS.LINUX))
+        assert db.execute(select(NodeTag).where(NodeTag.node_id == node.id)).first() is None
+
+        crud.node.remove(db, id=crud.node.get_by_hostname(db, hostname="gpu-node").id)
+        assert _hostnames(db, {"gpu"}, match_all=False) == []
+
+    # 心跳上报的标签变化后重新同步
+    buffer = HeartbeatBuffer()
+    buffer.submit("proxy-node", tags="gpu")
+    buffer.flush()
+    with Session(engine) as db:
+        assert _hostnames(db, {"gpu"}, match_all=True) == ["proxy-node"]
+        assert _hostnames(db, {"proxy"}, match_all=True) == ["large-node"]
+
+
+def test_bad_heartbeat_row_does_not_block_the_batch(engine, monkeypatch):
+    from sqlalchemy.exc import DataError
+
+    set_tags = crud.node.set_tags_by_hostname
+
+    def strict_set_tags(db, *, tags_by_hostname):
+        # 模拟 MySQL 严格模式：tags 超过 String(100) 时报错
+        if any(tags and len(tags) > 100 for tags in tags_by_hostname.values()):
+            raise DataError("UPDATE cp_nodes", {}, Exception("Data too long for column 'tags'"))
+        set_tags(db, tags_by_hostname=tags_by_hostname)
+
+    monkeypatch.setattr(crud.node, "set_tags_by_hostname", strict_set_tags)
+    buffer = HeartbeatBuffer()
+    buffer.submit("bad-node", os=NodeOS.LINUX, tags="x" * 101)
+    buffer.submit("chrome-node", os=NodeOS.LINUX, tags="chrome")
+    assert buffer.flush() == 2
+
+    # 坏数据被丢弃而不是放回缓冲区，其他节点正常写入
+    assert buffer._pending == {}
+    with Session(engine) as db:
+        assert _hostnames(db, {"chrome"}, match_all=True) == ["chrome-node"]
+        assert crud.node.get_by_hostname(db, hostname="bad-node") is None
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+测试爬虫输出统计解析：Scrapy / Crawlo 的进度日志、结束统计字典与 --json 输出
+"""
+
+import sys
+import os
+
+import pytest
+
+# 添加项目路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.tasks.output_stats import SpiderStatsParser
+
+SCRAPY_OUTPUT = """\
+2026-01-01 08:00:00 [scrapy.extensions.logstats] INFO: Crawled 0 pages (at 0 pages/min), scraped 0 items (at 0 items/min)
+2026-01-01 08:01:00 [scrapy.extensions.logstats] INFO: Crawled 57 pages (at 57 pages/min), scraped 40 items (at 40 items/min)
+2026-01-01 08:01:30 [scrapy.statscollectors] INFO: Dumping Scrapy stats:
+{'downloader/request_bytes': 23050,
+ 'downloader/request_count': 61,
+ 'downloader/response_count': 61,
+ 'finish_reason': 'finished',
+ 'item_scraped_count': 52,
+ 'start_time': datetime.datetime(2026, 1, 1, 8, 0, 0, 12345)}
+2026-01-01 08:01:30 [scrapy.core.engine] INFO: Spider closed (finished)
+"""
+
+CRAWLO_OUTPUT = """\
+2026-01-01 08:00:00 - [LogIntervalExtension] - INFO: Crawled 10 pages (at 10 pages/60s), Got 8 items (at 8 items/60s).
+2026-01-01 08:00:30 - [StatsCollector] - INFO: books stats:
+{'item_successful_count': 30,
+ 'reason': 'finished',
+ 'request_scheduler_count': 35,
+ 'response_received_count': 35,
+ 'spider_name': 'books'}
+2026-01-01 08:00:31 - [StatsCollector] - INFO: news stats:
+{'item_successful_count': 12, 'request_scheduler_count': 20, 'spider_name': 'news'}
+{
+  "success": true,
+  "spider": "books"
+}
+"""
+
+
+def _parse(text, chunk_size):
+    parser = SpiderStatsParser()
+    data = text.encode("utf-8")
+    for i in range(0, len(data), chunk_size):
+        parser.feed(data[i:i + chunk_size])
+    parser.close()
+    return parser.items_scraped, parser.requests_count
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_scrapy_stats_dump(chunk_size):
+    assert _parse(SCRAPY_OUTPUT, chunk_size) == (52, 61)
+
+
+@pytest.mark.parametrize("chunk_size", [3, 4096])
+def test_crawlo_stats_of_all_spiders_are_summed(chunk_size):
+    assert _parse(CRAWLO_OUTPUT, chunk_size) == (42, 55)
+
+
+def test_progress_updates_counters_while_running():
+    parser = SpiderStatsParser()
+    assert (parser.items_scraped, parser.requests_count) == (None, None)
+    # 统计字典输出之前，以最近一条进度日志为准
+    parser.feed(SCRAPY_OUTPUT.split("Dumping")[0].encode("utf-8"))
+    assert (parser.items_scraped, parser.requests_count) == (40, 57)
+
+
+def test_json_output():
+    text = '{"success": true, "stats": {"items_scraped": 7, "total_requests": 9}}\n{\n  "item_successful_count": 3\n}'
+    assert _parse(text, 5) == (10, 9)
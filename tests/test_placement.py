@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+测试负载感知的节点选择：空闲槽位优先、负载与标签打分，以及两次心跳巡检之间的槽位预留
+"""
+
+import sys
+import os
+
+# 添加项目路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.core.celery_app import DEFAULT_QUEUE, node_queue_name
+from app.models.node import NodeStatus
+from app.models.task import Task, TaskDistributionMode
+from app.services.node_cache import NodeSnapshot
+from app.services.placement import PlacementEngine, placement_engine
+from app.services.scheduler import scheduler_service
+
+
+def _node(id, *, max_concurrency=2, running=0, cpu=0.0, memory=None, tags=None):
+    return NodeSnapshot(
+        id=id, hostname=f"node-{id}", status=NodeStatus.ONLINE, tags=tags,
+        max_concurrency=max_concurrency, current_concurrency=running,
+        cpu_usage=cpu, memory_gb=8.0, memory_usage=memory,
+    )
+
+
+def _hostnames(nodes):
+    return [node.hostname for node in nodes]
+
+
+def test_rank_prefers_free_slots_then_load_and_tags():
+    engine = PlacementEngine()
+    task = Task(target_node_tags="gpu")
+    full = _node(1, running=2)
+    busy = _node(2, cpu=90.0, memory=7.0)
+    idle = _node(3)
+    tagged = _node(4, tags="gpu")
+    assert _hostnames(engine.rank([full, busy, idle, tagged], task)) == ["node-4", "node-3", "node-2", "node-1"]
+
+    # 已满的节点即使负载最低也排在有空闲槽位的节点之后
+    assert engine.pick([_node(5, running=3, max_concurrency=3), busy], task) is busy
+    assert engine.pick([], task) is None
+
+
+def test_reservations_spread_dispatches_between_sweeps():
+    engine = PlacementEngine()
+    task = Task()
+    nodes = [_node(1), _node(2)]
+
+    # 快照中的 current_concurrency 不变，预留计数让后续调度看到已投递的任务
+    picked = [engine.reserve(nodes, task, allow_full=False) for _ in range(4)]
+    assert sorted(_hostnames(picked)) == ["node-1", "node-1", "node-2", "node-2"]
+    assert engine.reservations() == {1: 2, 2: 2}
+
+    # 全部满载：不允许满载时返回 None，否则选择最合适的节点
+    assert engine.reserve(nodes, task, allow_full=False) is None
+    assert engine.reserve(nodes, task) is not None
+
+    # 心跳巡检同步负载后清零
+    engine.clear_reservations()
+    assert engine.reservations() == {}
+    assert engine.reserve(nodes, task, allow_full=False) is not None
+
+
+def test_select_queue_falls_back_to_default_queue_when_nodes_are_full(monkeypatch):
+    monkeypatch.setattr(placement_engine, "_reserved", {})
+    task = Task(distribution_mode=TaskDistributionMode.ANY)
+    nodes = [_node(1, max_concurrency=1)]
+
+    assert scheduler_service._select_queue(task, nodes) == node_queue_name("node-1")
+    # 同一快照再次调度：槽位已被预留，退回默认队列
+    assert scheduler_service._select_queue(task, nodes) == DEFAULT_QUEUE
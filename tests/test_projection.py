@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+测试列表接口的字段投影参数解析和结果编码
+"""
+
+import sys
+import os
+from datetime import datetime
+
+import pytest
+
+# 添加项目路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import schemas
+from app.models.task_run import TaskRunStatus
+from app.utils.projection import encode_rows, parse_fields
+
+ALLOWED = schemas.TaskRunOut.model_fields
+SUMMARY = list(schemas.TaskRunSummary.model_fields)
+
+
+def test_full_view_by_default():
+    assert parse_fields(None, None, allowed=ALLOWED, summary=SUMMARY) is None
+
+
+def test_summary_view_excludes_log():
+    columns = parse_fields(None, "summary", allowed=ALLOWED, summary=SUMMARY)
+    assert "log_output" not in columns
+    assert set(columns) <= set(ALLOWED)
+
+
+def test_fields_always_include_id():
+    assert parse_fields("status, start_time,status", None, allowed=ALLOWED, summary=SUMMARY) == [
+        "id", "status", "start_time"
+    ]
+
+
+def test_unknown_field_rejected():
+    with pytest.raises(ValueError):
+        parse_fields("status,hashed_password", None, allowed=ALLOWED, summary=SUMMARY)
+
+
+def test_encode_rows():
+    rows = [{"id": 1, "status": TaskRunStatus.SUCCESS, "start_time": datetime(2026, 1, 1, 8, 30)}]
+    assert encode_rows(rows) == [{"id": 1, "status": "SUCCESS", "start_time": "2026-01-01T08:30:00"}]
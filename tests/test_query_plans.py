@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+查询计划回归测试：热点查询路径必须走索引
+
+在内存 SQLite 中执行各个热点代码路径，记录它们发出的 SELECT，
+逐条 EXPLAIN QUERY PLAN，涉及 cp_task_runs / cp_nodes / cp_node_tags 的步骤出现全表扫描（SCAN）即失败。
+"""
+
+import sys
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session
+
+# 添加项目路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import app.models  # noqa: F401  注册所有模型
+from app import crud
+from app.crud.crud_task_run_stats import ACTIVE_STATUSES
+from app.db.base_class import Base
+from app.models.node import Node, NodeOS, NodeStatus, NodeTag
+from app.models.project import Project
+from app.models.task import TagMatchMode, Task, TaskDistributionMode
+from app.models.task_run import TaskRun, TaskRunGroup, TaskRunStatus
+from app.models.user import User
+from app.services.node_cache import online_node_cache
+from app.services.scheduler import scheduler_service
+
+HOT_TABLES = ("cp_task_runs", "cp_nodes", "cp_node_tags")
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(User(id=1, username="u", email="u@example.com", hashed_password="x"))
+        db.add(Project(id=1, name="p", owner_id=1))
+        db.add(Task(id=1, name="t", project_id=1, spider_name="s", distribution_mode=TaskDistributionMode.ANY))
+        db.add(Task(
+            id=2, name="t2", project_id=1, spider_name="s", distribution_mode=TaskDistributionMode.TAG_BASED,
+            target_node_tags="gpu,proxy", target_tag_match=TagMatchMode.ALL
+        ))
+        db.add(TaskRunGroup(id=1, task_id=1, node_count=2))
+        for i in range(4):
+            db.add(Node(
+                id=i + 1, hostname=f"node-{i}", os=NodeOS.LINUX, physical_host_name=f"host-{i % 2}",
+                status=NodeStatus.ONLINE if i % 2 else NodeStatus.OFFLINE
+            ))
+            db.add(NodeTag(node_id=i + 1, tag="gpu"))
+        for i in range(20):
+            db.add(TaskRun(
+                task_id=1, celery_task_id=f"run-{i}", group_id=1 if i < 2 else None,
+                status=TaskRunStatus.SUCCESS if i % 3 else TaskRunStatus.RUNNING,
+                start_time=datetime(2026, 1, 1, 0, i)
+            ))
+        db.commit()
+    # 每个用例使用新的数据库，调度器的在线节点缓存不能跨用例命中
+    online_node_cache.invalidate()
+    return engine
+
+
+def _plans(engine, call):
+    """执行 call(db)，返回其间每条 SELECT 的 (SQL, 查询计划明细)"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        with Session(engine) as db:
+            call(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    assert statements, "code path issued no SELECT"
+    with engine.connect() as conn:
+        return [
+            (sql, [row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, params)])
+            for sql, params in statements
+        ]
+
+
+def _full_scans(plans):
+    return [
+        (sql, detail)
+        for sql, details in plans
+        for detail in details
+        if detail.startswith("SCAN") and any(table in detail for table in HOT_TABLES)
+    ]
+
+
+HOT_PATHS = {
+    "task_stats": lambda db: crud.task_run_stats.get_summary(db, task_id=1),
+    "task_stats_rebuild": lambda db: crud.task_run_stats.rebuild(db, task_ids=[1]),
+    "run_group_summary": lambda db: crud.task_run_group.get_summary(db, group=db.get(TaskRunGroup, 1)),
+    "runs_by_task_page": lambda db: crud.task_run.get_page_by_task(db, task_id=1, limit=5),
+    "runs_page": lambda db: crud.task_run.get_page(db, sort="start_time", limit=5),
+    "runs_by_celery_id": lambda db: crud.task_run.get_by_celery_id(db, celery_task_id="run-3"),
+    "active_runs": lambda db: db.execute(
+        select(TaskRun).where(TaskRun.status.in_(ACTIVE_STATUSES)).order_by(TaskRun.start_time.desc())
+    ).all(),
+    "scheduler_online_nodes": lambda db: scheduler_service._get_target_nodes(db, db.get(Task, 1)),
+    "scheduler_tagged_nodes": lambda db: scheduler_service._get_target_nodes(db, db.get(Task, 2)),
+    "physical_host_resources": lambda db: crud.node.check_resources_available(db, "host-1"),
+    "physical_host_inventory": lambda db: crud.node.get_physical_host_inventory(db),
+}
+
+
+@pytest.mark.parametrize("name", sorted(HOT_PATHS))
+def test_hot_path_uses_indexes(engine, name):
+    plans = _plans(engine, HOT_PATHS[name])
+    assert _full_scans(plans) == []
+
+
+def test_detects_full_scan(engine):
+    # 没有索引的列（duration_seconds）必须被判定为全表扫描，保证上面的断言确实有效
+    plans = _plans(engine, lambda db: db.execute(select(TaskRun).where(TaskRun.duration_seconds > 1)).all())
+    assert _full_scans(plans)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+测试执行资源采样：统计整个子进程树（含孙进程）的 CPU 与内存
+"""
+
+import sys
+import os
+import subprocess
+
+import pytest
+
+# 添加项目路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.tasks import resource_sampler
+from app.tasks.resource_sampler import ResourceSampler
+from app.tasks.supervisor import ProcessSupervisor
+
+# 子进程再启动一个孙进程：占用 64 MB 内存并持续计算约 1 秒
+CHILD = (
+    "import subprocess, sys; subprocess.run([sys.executable, '-c', "
+    "'import time\\nx = bytearray(64 * 1024 * 1024)\\nt = time.time()\\nwhile time.time() - t < 1: pass'])"
+)
+
+pytestmark = pytest.mark.skipif(
+    resource_sampler._get_sample_func() is None, reason="no psutil or /proc on this platform"
+)
+
+
+def test_samples_process_tree():
+    process = subprocess.Popen([sys.executable, "-c", CHILD])
+    supervisor = ProcessSupervisor(process, redis_client=None, celery_task_id="t", sample_interval=0.1)
+    assert supervisor.wait() == 0
+
+    usage = supervisor.usage
+    assert usage.samples >= 5
+    assert usage.memory_peak_mb >= 64
+    assert usage.memory_mean_mb <= usage.memory_peak_mb
+    assert 20 < usage.cpu_mean <= usage.cpu_peak
+    assert supervisor.duration >= 1
+
+
+def test_disabled_with_zero_interval():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    sampler = ResourceSampler(process.pid, interval=0)
+    sampler.start()
+    process.wait()
+    assert sampler.stop().cpu_mean is None
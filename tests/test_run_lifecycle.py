@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+测试执行记录的生命周期：调度时创建一条 PENDING 记录，Worker 只按 celery_task_id 更新，不再重复插入
+"""
+
+import sys
+import os
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+# 添加项目路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import app.models  # noqa: F401  注册所有模型
+from app.core.config import settings
+from app.db.base_class import Base
+from app.models.node import Node, NodeOS, NodeStatus
+from app.models.project import Project
+from app.models.task import Task, TaskDistributionMode
+from app.models.task_run import TaskRun, TaskRunStatus
+from app.models.task_run_stats import TaskRunStats
+from app.models.user import User
+from app.services.node_cache import online_node_cache
+from app.services.scheduler import scheduler_service
+from app.tasks import crawler_tasks
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'runs.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(User(id=1, username="u", email="u@example.com", hashed_password="x"))
+        db.add(Project(id=1, name="demo", owner_id=1))
+        db.add(Task(id=1, name="t", project_id=1, spider_name="s", entrypoint="run.sh",
+                    distribution_mode=TaskDistributionMode.MULTIPLE, target_node_ids=[1, 2]))
+        for i in (1, 2):
+            db.add(Node(id=i, hostname=f"node-{i}", os=NodeOS.LINUX, status=NodeStatus.ONLINE))
+        db.commit()
+
+    project_dir = tmp_path / "projects" / "demo"
+    project_dir.mkdir(parents=True)
+    (project_dir / "run.sh").write_text(
+        "echo 'INFO: demo stats:'\n"
+        "echo \"{'item_successful_count': 5, 'request_scheduler_count': 6}\"\n"
+    )
+    monkeypatch.setattr(settings, "PROJECTS_DIR", str(tmp_path / "projects"))
+    monkeypatch.setattr(settings, "LOGS_DIR", str(tmp_path / "logs"))
+    monkeypatch.setattr(settings, "LOG_STORE_DIR", str(tmp_path / "store"))
+    monkeypatch.setattr(crawler_tasks, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(crawler_tasks, "get_redis", lambda: None)
+    monkeypatch.setattr(crawler_tasks.run_generic_script, "update_state", lambda *args, **kwargs: None)
+    online_node_cache.invalidate()
+    yield engine
+    online_node_cache.invalidate()
+
+
+def test_dispatch_creates_one_row_per_run(engine, monkeypatch):
+    published = []
+
+    class FakeGroup:
+        def __init__(self, signatures):
+            self.signatures = signatures
+
+        def apply_async(self):
+            published.extend(self.signatures)
+
+    monkeypatch.setattr("app.services.scheduler.celery_group", FakeGroup)
+    with Session(engine) as db:
+        dispatched = scheduler_service.dispatch(db, db.get(Task, 1), run_mode="manual")
+
+    assert len(published) == 2
+    assert [sig.options["task_id"] for sig in published] == dispatched.celery_task_ids
+    assert [sig.kwargs["run_id"] for sig in published] == dispatched.run_ids
+
+    # 在 Worker 中执行（使用调度时预先生成的 Celery 任务 ID）
+    for sig in published:
+        crawler_tasks.run_generic_script.apply(kwargs=sig.kwargs, task_id=sig.options["task_id"])
+
+    with Session(engine) as db:
+        runs = db.execute(select(TaskRun).order_by(TaskRun.id)).scalars().all()
+        assert [run.id for run in runs] == dispatched.run_ids
+        assert {run.status for run in runs} == {TaskRunStatus.SUCCESS}
+        assert all(run.start_time and run.end_time and run.group_id == dispatched.group_id for run in runs)
+        assert db.get(TaskRunStats, 1).total_runs == 2
+
+
+def test_worker_creates_row_when_missing(engine):
+    # 未经调度器直接投递的任务：Worker 补建一条记录
+    crawler_tasks.run_generic_script.apply(
+        kwargs={"original_task_id": 1, "project_name": "demo", "entrypoint": "run.sh"}, task_id="direct"
+    )
+    with Session(engine) as db:
+        assert db.execute(select(func.count(TaskRun.id))).scalar_one() == 1
+        run = db.execute(select(TaskRun)).scalar_one()
+        assert (run.celery_task_id, run.status) == ("direct", TaskRunStatus.SUCCESS)
+        assert run.log_path
+        # 归档只在 Worker 本地：日志末尾仍保存在数据库中供主服务读取
+        assert "item_successful_count" in run.log_output
+        assert run.exit_code == 0 and run.duration_seconds is not None
+        assert (run.items_scraped, run.requests_count) == (5, 6)
+
+
+def test_log_archive_is_uploaded_to_the_api(engine, tmp_path, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.api.v1.endpoints import task_runs
+    from app.utils.log_store import LogStoreReader
+
+    api = FastAPI()
+    api.include_router(task_runs.router, prefix=f"{settings.API_V1_STR}/task-runs")
+    client = TestClient(api)
+    monkeypatch.setattr(task_runs, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(settings, "WORKER_API_TOKEN", "worker-secret")
+    worker_store, api_store = str(tmp_path / "store"), str(tmp_path / "api_store")
+
+    def fake_put(url, data, headers, timeout):
+        # 主服务在另一台机器上：使用自己的日志存储
+        monkeypatch.setattr(settings, "LOG_STORE_DIR", api_store)
+        try:
+            return client.put(url.split(settings.CRAWL_PRO_API_URL)[1], content=data.read(), headers=headers)
+        finally:
+            monkeypatch.setattr(settings, "LOG_STORE_DIR", worker_store)
+
+    monkeypatch.setattr(crawler_tasks.requests, "put", fake_put)
+    crawler_tasks.run_generic_script.apply(
+        kwargs={"original_task_id": 1, "project_name": "demo", "entrypoint": "run.sh"}, task_id="uploaded"
+    )
+
+    with Session(engine) as db:
+        run = db.execute(select(TaskRun)).scalar_one()
+        assert run.status == TaskRunStatus.SUCCESS
+        # 完整日志在主服务的日志存储中，数据库不再保存日志末尾
+        assert run.log_output is None and run.log_path
+    assert not os.path.exists(os.path.join(worker_store, run.log_path))
+    assert not os.listdir(os.path.join(worker_store, "outgoing"))
+    monkeypatch.setattr(settings, "LOG_STORE_DIR", api_store)
+    with LogStoreReader(run.log_path) as reader:
+        assert reader.size == run.log_size
+        assert "item_successful_count" in reader.read_tail()
+
+    # 不是日志归档的内容、没有令牌的请求都被拒绝
+    url = f"{settings.API_V1_STR}/task-runs/{run.id}/log/archive"
+    assert client.put(url, content=b"garbage", headers={"X-Worker-Token": "worker-secret"}).status_code == 400
+    assert client.put(url, content=b"garbage").status_code == 401
+
+
+def test_falls_back_to_project_dir_when_bundle_fetch_fails(engine, monkeypatch):
+    def refuse(bundle_hash, dest_dir):
+        raise RuntimeError("401 Client Error: Unauthorized")
+
+    monkeypatch.setattr(crawler_tasks.bundle_cache, "checkout", refuse)
+    crawler_tasks.run_generic_script.apply(
+        kwargs={"original_task_id": 1, "project_name": "demo", "entrypoint": "run.sh", "bundle_hash": "a" * 64},
+        task_id="fallback"
+    )
+    with Session(engine) as db:
+        assert db.execute(select(TaskRun)).scalar_one().status == TaskRunStatus.SUCCESS
+
+
+def test_stopping_a_queued_run_finishes_it(engine):
+    from datetime import datetime
+    from app import crud
+
+    with Session(engine) as db:
+        run_id, = crud.task_run.create_pending(db, task_id=1, celery_task_ids=["queued"])
+        run = db.get(TaskRun, run_id)
+        assert crud.task_run.stop_pending(db, run=run, end_time=datetime.utcnow())
+        db.refresh(run)
+        crud.task_run_stats.record_run(db, task_run=run)
+        db.commit()
+        assert (run.status, run.manually_stopped) == (TaskRunStatus.FAILURE, True)
+        assert db.get(TaskRunStats, 1).stopped_runs == 1
+
+        # 撤销前已被 Worker 领取：记录保持停止状态，不会回到 RUNNING
+        crud.task_run.start_run(db, celery_task_id="queued", task_id=1, worker_node="n", start_time=datetime.utcnow())
+        db.refresh(run)
+        assert run.status == TaskRunStatus.FAILURE
+        assert db.execute(select(func.count(TaskRun.id))).scalar_one() == 1
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+测试任务执行统计汇总：增量更新与完整重建结果一致，同一次执行只计入一次
+"""
+
+import sys
+import os
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+# 添加项目路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import app.models  # noqa: F401  注册所有模型
+from app import crud
+from app.db.base_class import Base
+from app.models.project import Project
+from app.models.task import Task
+from app.models.task_run import TaskRun, TaskRunStatus
+from app.models.task_run_stats import TaskRunStats
+from app.models.user import User
+from app.tasks import crawler_tasks
+
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id=1, username="u", email="u@example.com", hashed_password="x"))
+        session.add(Project(id=1, name="demo", owner_id=1))
+        session.add(Task(id=1, name="t", project_id=1, spider_name="s"))
+        session.commit()
+        yield session
+
+
+def _finished_run(db, i, rng):
+    status = TaskRunStatus.SUCCESS if rng.random() < 0.7 else TaskRunStatus.FAILURE
+    start = START + timedelta(minutes=i)
+    run = TaskRun(
+        task_id=1, celery_task_id=f"c{i}", status=status,
+        manually_stopped=status == TaskRunStatus.FAILURE and rng.random() < 0.5,
+        start_time=start, end_time=start + timedelta(seconds=rng.uniform(1, 600)),
+        # 一部分执行只有起止时间，由起止时间计算时长
+        duration_seconds=rng.uniform(1, 600) if i % 3 else None,
+        items_scraped=rng.randint(0, 100), requests_count=rng.randint(0, 200),
+    )
+    db.add(run)
+    db.flush()
+    return run
+
+
+def test_incremental_matches_rebuild(db):
+    rng = random.Random(7)
+    for i in range(300):
+        crud.task_run_stats.record_run(db, task_run=_finished_run(db, i, rng))
+    db.commit()
+    incremental = crud.task_run_stats.get_summary(db, task_id=1)
+
+    db.delete(db.get(TaskRunStats, 1))
+    db.flush()
+    crud.task_run_stats.rebuild(db, task_ids=[1])
+    db.commit()
+    db.expire_all()
+    rebuilt = crud.task_run_stats.get_summary(db, task_id=1)
+
+    assert incremental["finished_runs"] == rebuilt["finished_runs"] == 300
+    assert incremental["success_runs"] == rebuilt["success_runs"]
+    assert incremental["success_runs"] + incremental["failed_runs"] == 300
+    for key in ("stopped_runs", "items_scraped", "requests_count", "last_run_id", "last_run_status",
+                "p50_duration_seconds", "p95_duration_seconds"):
+        assert incremental[key] == rebuilt[key], key
+    assert incremental["avg_duration_seconds"] == pytest.approx(rebuilt["avg_duration_seconds"], abs=0.01)
+
+
+def test_first_run_creates_summary_row(db):
+    # 还没有执行结束过：按零值返回，读取不写入
+    summary = crud.task_run_stats.get_summary(db, task_id=1)
+    assert (summary["finished_runs"], summary["p50_duration_seconds"]) == (0, None)
+    assert db.get(TaskRunStats, 1) is None
+
+    crud.task_run_stats.record_run(db, task_run=_finished_run(db, 0, random.Random(1)))
+    db.commit()
+    assert db.get(TaskRunStats, 1).total_runs == 1
+
+    # 历史执行的回填：已有汇总行时不会被重复计入
+    db.delete(db.get(TaskRunStats, 1))
+    db.flush()
+    crud.task_run_stats.rebuild(db, task_ids=[1])
+    db.commit()
+    assert crud.task_run_stats.get_summary(db, task_id=1)["finished_runs"] == 1
+
+
+def test_run_finishing_twice_is_counted_once(db):
+    run = TaskRun(task_id=1, celery_task_id="twice", status=TaskRunStatus.RUNNING, start_time=START)
+    db.add(run)
+    db.commit()
+    local = TaskRun(id=run.id, task_id=1, celery_task_id="twice", start_time=START)
+
+    # 例如 Worker 正常结束后，异常处理路径又尝试结束一次
+    crawler_tasks._finish_task_run(db, local, TaskRunStatus.SUCCESS, "done", metrics={"duration_seconds": 5.0})
+    crawler_tasks._finish_task_run(db, local, TaskRunStatus.FAILURE, "again")
+
+    db.expire_all()
+    assert db.get(TaskRun, run.id).status == TaskRunStatus.SUCCESS
+    stats = db.get(TaskRunStats, 1)
+    assert (stats.total_runs, stats.success_runs, stats.failure_runs) == (1, 1, 0)
+
+
+def test_deleting_a_run_updates_summary(db):
+    rng = random.Random(3)
+    runs = [_finished_run(db, i, rng) for i in range(5)]
+    for run in runs:
+        crud.task_run_stats.record_run(db, task_run=run)
+    db.commit()
+
+    last = runs[-1]
+    db.delete(last)
+    db.flush()
+    crud.task_run_stats.remove_run(db, task_run=last)
+    db.commit()
+
+    db.expire_all()
+    summary = crud.task_run_stats.get_summary(db, task_id=1)
+    assert summary["finished_runs"] == 4
+    assert summary["items_scraped"] == sum(run.items_scraped for run in runs[:-1])
+    assert summary["last_run_id"] == runs[-2].id
+
+
+def test_backfill_migration_matches_rebuild(db):
+    import importlib.util
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+
+    rng = random.Random(11)
+    for i in range(50):
+        _finished_run(db, i, rng)
+    db.commit()
+    crud.task_run_stats.rebuild(db, task_ids=[1])
+    db.commit()
+    expected = crud.task_run_stats.get_summary(db, task_id=1)
+    db.delete(db.get(TaskRunStats, 1))
+    db.commit()
+
+    path = os.path.join(os.path.dirname(__file__), '..', 'backend', 'alembic', 'versions',
+                        'd3f7a1c9e842_backfill_task_run_stats.py')
+    spec = importlib.util.spec_from_file_location("backfill_task_run_stats", path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    with db.get_bind().connect() as conn:
+        with Operations.context(MigrationContext.configure(conn)):
+            migration.upgrade()
+        conn.commit()
+
+    db.expire_all()
+    assert crud.task_run_stats.get_summary(db, task_id=1) == expected
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+测试认证用户缓存：重复请求不再查询用户表，用户状态变化后立即失效
+"""
+
+import sys
+import os
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+# 添加项目路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import app.models  # noqa: F401  注册所有模型
+from app import deps
+from app.core.security import create_access_token
+from app.crud import user as crud_user
+from app.db.base_class import Base
+from app.models.user import User
+from app.services.user_cache import user_cache
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(User(id=1, username="alice", email="alice@example.com", hashed_password="x"))
+        db.commit()
+    user_cache.clear()
+    yield engine
+    user_cache.clear()
+
+
+def _authenticate(engine, token):
+    with Session(engine) as db:
+        user = deps.get_current_active_user(db=db, token=token)
+        return user.id, user.username, user.is_superuser
+
+
+def test_cached_user_skips_query_and_invalidates(engine):
+    selects = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: selects.append(statement))
+    token = create_access_token(subject="alice")
+
+    assert _authenticate(engine, token) == (1, "alice", False)
+    assert _authenticate(engine, token) == (1, "alice", False)
+    assert len(selects) == 1
+
+    with Session(engine) as db:
+        crud_user.make_superuser(db, id=1)
+    assert _authenticate(engine, token) == (1, "alice", True)
+
+    with Session(engine) as db:
+        crud_user.deactivate(db, id=1)
+    with pytest.raises(HTTPException) as exc:
+        _authenticate(engine, token)
+    assert exc.value.status_code == 403
+
+
+def test_cached_user_can_be_updated(engine):
+    token = create_access_token(subject="alice")
+    _authenticate(engine, token)
+
+    # 命中缓存的对象挂在请求会话上，可以直接修改
+    with Session(engine) as db:
+        current_user = deps.get_current_active_user(db=db, token=token)
+        crud_user.update(db, db_obj=current_user, obj_in={"email": "new@example.com"})
+
+    with Session(engine) as db:
+        assert deps.get_current_active_user(db=db, token=token).email == "new@example.com"
+
+
+def test_password_hash_is_not_cached(engine):
+    token = create_access_token(subject="alice")
+    _authenticate(engine, token)
+    assert all("hashed_password" not in values for _, values in user_cache._entries.values())
+
+    # 命中缓存时密码哈希未加载，访问时从数据库按需加载
+    with Session(engine) as db:
+        assert deps.get_current_active_user(db=db, token=token).hashed_password == "x"